@@ -0,0 +1,232 @@
+"""
+Pool of long-lived Weaviate clients and QueryAgents.
+
+Connecting to Weaviate Cloud and building a QueryAgent costs a TLS handshake
+and an is_ready() round-trip, so the API keeps a fixed number of connected
+(client, agent) slots and hands them out per request. A background thread
+connects the slots one after another after start() returns, so the server
+reports ready without waiting for Weaviate (or importing its client); a
+request that arrives first waits for the first connected slot. The same
+thread then health-checks idle slots and reconnects broken ones.
+
+Configuration (environment variables):
+    AGENT_POOL_SIZE                  number of slots (default 4)
+    AGENT_POOL_BACKEND               "weaviate" (default) or "stub"
+    AGENT_POOL_HEALTHCHECK_INTERVAL  seconds between health checks (default 30)
+    AGENT_POOL_ACQUIRE_TIMEOUT       seconds to wait for a free slot (default 30)
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import record, span
+
+
+class PoolTimeout(Exception):
+    """Raised when no healthy slot becomes free within the acquire timeout."""
+
+
+class AgentSlot:
+    """A connected client together with the agent built on top of it."""
+
+    def __init__(self, client, agent):
+        self.client = client
+        self.agent = agent
+        self.created_at = time.time()
+        self.failed = False
+
+
+def weaviate_backend():
+    """Connect to Weaviate Cloud and build the company QueryAgent."""
+    from weaviate_calibrate_companies import setup_weaviate_client, setup_agent
+
+    client = setup_weaviate_client()
+    return client, setup_agent(client)
+
+
+def stub_backend():
+    """Build an offline client/agent pair for load testing."""
+    from stub_backend import StubWeaviateClient, StubQueryAgent
+
+    client = StubWeaviateClient()
+    agent = StubQueryAgent(
+        client,
+        latency=float(os.environ.get("STUB_AGENT_LATENCY", "0.05")),
+        jitter=float(os.environ.get("STUB_AGENT_JITTER", "0.0")),
+    )
+    return client, agent
+
+
+BACKENDS = {
+    "weaviate": weaviate_backend,
+    "stub": stub_backend,
+}
+
+
+class AgentPool:
+    """Fixed-size pool of (client, agent) slots with background reconnects."""
+
+    def __init__(self, factory, size=4, health_check_interval=30.0, acquire_timeout=30.0):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.Queue()
+        self._broken = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._thread = None
+        self.reconnects = 0
+
+    def start(self, wait=False):
+        """Start the thread that connects every slot and then health-checks them.
+
+        With wait, return only once every slot has been connected (or failed to).
+        """
+        self._thread = threading.Thread(target=self._run, name="agent-pool", daemon=True)
+        self._thread.start()
+        if wait:
+            self._connected.wait()
+
+    def _run(self):
+        for _ in range(self.size):
+            if self._stop.is_set():
+                return
+            slot = self._connect()
+            if slot is None:
+                with self._lock:
+                    self._broken += 1
+            else:
+                self._idle.put(slot)
+        self._connected.set()
+        self._health_check_loop()
+
+    def close(self):
+        """Stop the health-check thread and close every idle client."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        while True:
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_slot(slot)
+
+    @contextmanager
+    def acquire_slot(self, timeout=None):
+        """Borrow a slot (client and agent) for the duration of the with-block.
+
+        If the block raises, the slot's client is probed before it goes back
+        into the pool; a client that is no longer ready is closed and left for
+        the health-check thread to reconnect.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        try:
+            slot = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No Weaviate client available after {timeout}s")
+        record("pool_acquire", time.perf_counter() - start)
+        try:
+            yield slot
+        except Exception:
+            slot.failed = True
+            raise
+        finally:
+            self._release(slot)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrow a slot's agent for the duration of the with-block."""
+        with self.acquire_slot(timeout) as slot:
+            yield slot.agent
+
+    def stats(self):
+        """Return a snapshot of the pool state."""
+        with self._lock:
+            broken = self._broken
+        return {
+            "size": self.size,
+            "connecting": not self._connected.is_set(),
+            "idle": self._idle.qsize(),
+            "broken": broken,
+            "reconnects": self.reconnects,
+        }
+
+    def _release(self, slot):
+        if slot.failed and not self._is_healthy(slot):
+            self._close_slot(slot)
+            with self._lock:
+                self._broken += 1
+        else:
+            slot.failed = False
+            self._idle.put(slot)
+
+    def _connect(self):
+        try:
+            with span("connect"):
+                client, agent = self.factory()
+        except Exception as e:
+            print(f"Agent pool: failed to connect: {e}")
+            return None
+        return AgentSlot(client, agent)
+
+    def _close_slot(self, slot):
+        try:
+            slot.client.close()
+        except Exception as e:
+            print(f"Agent pool: error closing client: {e}")
+
+    def _is_healthy(self, slot):
+        try:
+            return bool(slot.client.is_ready())
+        except Exception:
+            return False
+
+    def _health_check_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+
+    def check_health(self):
+        """Probe every idle slot once and replace broken slots."""
+        for _ in range(self._idle.qsize()):
+            try:
+                slot = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_healthy(slot):
+                self._idle.put(slot)
+            else:
+                self._close_slot(slot)
+                with self._lock:
+                    self._broken += 1
+
+        with self._lock:
+            broken = self._broken
+        for _ in range(broken):
+            slot = self._connect()
+            if slot is None:
+                break
+            with self._lock:
+                self._broken -= 1
+            self.reconnects += 1
+            self._idle.put(slot)
+
+
+def create_agent_pool():
+    """Build an AgentPool from environment configuration."""
+    backend = os.environ.get("AGENT_POOL_BACKEND", "weaviate")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown AGENT_POOL_BACKEND: {backend}")
+    return AgentPool(
+        BACKENDS[backend],
+        size=int(os.environ.get("AGENT_POOL_SIZE", "4")),
+        health_check_interval=float(os.environ.get("AGENT_POOL_HEALTHCHECK_INTERVAL", "30")),
+        acquire_timeout=float(os.environ.get("AGENT_POOL_ACQUIRE_TIMEOUT", "30")),
+    )
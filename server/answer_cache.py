@@ -0,0 +1,378 @@
+"""
+Semantic answer cache in front of QueryAgent.run.
+
+Prompts are embedded and kept in an in-memory vector index together with the
+agent's answer. A new prompt whose embedding is close enough to a cached one
+(cosine similarity >= threshold) is answered from the cache instead of paying
+for a full agent round-trip.
+
+Embeddings blur exactly the words that change an answer: "Is Canva better
+than Comet?" and "Is Comet better than Canva?" embed identically, and a long
+question about Weaviate stays close to the same question about Canva. Each
+prompt therefore also gets a match key (see match_key()): its names
+(capitalized words and numbers) and negations, in order. A cached answer is
+only considered for prompts with the same match key, and prompts without any
+name only match their own normalized text.
+
+Each answer records the generations of the collections it was computed from
+(see collection_versions). When ingestion bumps a collection, answers that
+read it stop matching on the next lookup, while answers over other
+collections stay cached.
+
+Answers to /chat questions scoped to one company (see company_layout.py) are
+stored under that company and only answer questions with the same scope.
+
+With ANSWER_CACHE_SHARED_PATH set (serve.py sets it when running several
+worker processes), answers are also written to a SQLite table shared by every
+worker. Each worker keeps its in-memory index as a replica and, before each
+lookup, pulls the rows other workers added since its last pull, so an answer
+computed by one worker is a hit on all of them.
+
+Configuration (environment variables):
+    ANSWER_CACHE_ENABLED      "1" (default) or "0"
+    ANSWER_CACHE_THRESHOLD    minimum cosine similarity for a hit (default 0.9)
+    ANSWER_CACHE_TTL          seconds an answer stays valid (default 3600)
+    ANSWER_CACHE_MAX_ENTRIES  index size (default 1000)
+    ANSWER_CACHE_EMBEDDER     "hashing" (default) or "module:factory" returning an embedder
+    ANSWER_CACHE_SHARED_PATH  SQLite file shared between worker processes (default: none)
+"""
+import hashlib
+import importlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from collection_versions import get_manifest
+from paths import server_path
+
+
+# Question words that carry no meaning for matching cached answers
+STOPWORDS = set(
+    "a an the of and or to in on for is are was were what which who whom how "
+    "do does did can could you me tell about its it their there this that with "
+    "as be by s".split()
+)
+
+
+class HashingEmbedder:
+    """Deterministic, dependency-free embedder based on feature hashing.
+
+    Content words and their character trigrams are hashed into a fixed number
+    of signed buckets, so paraphrases sharing most of their vocabulary land
+    close together. Word order is ignored and long prompts are dominated by
+    their shared words, so prompts differing in one name or a "not" can score
+    above the default threshold; the cache relies on match_key() to keep those
+    apart. Stable across runs, which makes it suitable for tests.
+    """
+
+    def __init__(self, dim=512, trigram_weight=0.3):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text):
+        words = [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+        features = [(word, 1.0) for word in words]
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(
+                (padded[i:i + 3], self.trigram_weight) for i in range(len(padded) - 2)
+            )
+        return features
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 array of L2-normalized embeddings."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                sign = 1.0 if value & 1 else -1.0
+                vectors[row, (value >> 1) % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def load_embedder(spec):
+    """Resolve an ANSWER_CACHE_EMBEDDER value to an embedder instance."""
+    if spec in (None, "", "hashing"):
+        return HashingEmbedder()
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+
+# Words that negate what follows; "isn't", "don't" etc. count as "not"
+NEGATIONS = set("not no never without except nor neither none".split())
+
+# Capitalized words that open a question or request rather than name something
+LEAD_WORDS = set(
+    "why when where would should will has have hi hello hey "
+    "tell describe give list show explain compare name summarize summarise please".split()
+)
+
+
+def match_key(prompt):
+    """Return the names and negations of a prompt in order, or its normalized text if it names nothing.
+
+    Names are capitalized words and words with digits, lowercased and
+    without a possessive 's. Prompts can only share an answer when their
+    match keys are equal.
+    """
+    key = []
+    for word in re.findall(r"\w+(?:'\w+)?", prompt):
+        lower = word.lower()
+        if lower in NEGATIONS or lower.endswith("n't"):
+            key.append("not")
+        elif word[0].isupper() or any(c.isdigit() for c in word):
+            name = re.sub(r"'s$", "", lower)
+            if name not in STOPWORDS and name not in LEAD_WORDS:
+                key.append(name)
+    if any(word != "not" for word in key):
+        return tuple(key)
+    return " ".join(re.findall(r"\w+", prompt.lower()))
+
+
+class SharedAnswerStore:
+    """SQLite table of cached answers shared by the worker processes.
+
+    Rows carry the collection version key they were computed under, so
+    workers only pull answers that are valid for the current data, and the
+    company scope of the question (NULL if unscoped).
+    """
+
+    def __init__(self, path, max_rows=10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_rows = max_rows
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cached_answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " versions TEXT NOT NULL,"
+            " prompt TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " scope TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(cached_answers)")}
+        if "scope" not in columns:
+            # Tables created before answers were scoped hold unscoped answers only
+            self._db.execute("ALTER TABLE cached_answers ADD COLUMN scope TEXT")
+        self._db.commit()
+
+    def add(self, versions, prompt, vector, answer, expires_at, scope=None):
+        self._db.execute(
+            "INSERT INTO cached_answers (versions, prompt, vector, answer, expires_at, scope)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (json.dumps(versions), prompt, np.asarray(vector, dtype=np.float32).tobytes(), answer, expires_at, scope),
+        )
+        self._db.execute(
+            "DELETE FROM cached_answers WHERE expires_at <= ? OR id <= (SELECT MAX(id) FROM cached_answers) - ?",
+            (time.time(), self.max_rows),
+        )
+        self._db.commit()
+
+    def since(self, last_id):
+        """Return unexpired (id, versions, prompt, vector, answer, expires_at, scope) rows newer than last_id."""
+        rows = self._db.execute(
+            "SELECT id, versions, prompt, vector, answer, expires_at, scope FROM cached_answers"
+            " WHERE id > ? AND expires_at > ? ORDER BY id",
+            (last_id, time.time()),
+        ).fetchall()
+        return [(i, version_key(versions), prompt, np.frombuffer(blob, dtype=np.float32), answer, expires_at, scope)
+                for i, versions, prompt, blob, answer, expires_at, scope in rows]
+
+    def discard_stale(self, is_current):
+        """Delete rows whose version key is no longer current."""
+        rows = self._db.execute("SELECT id, versions FROM cached_answers").fetchall()
+        stale = [(i,) for i, versions in rows if not is_current(version_key(versions))]
+        if stale:
+            self._db.executemany("DELETE FROM cached_answers WHERE id = ?", stale)
+            self._db.commit()
+
+    def clear(self):
+        self._db.execute("DELETE FROM cached_answers")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def version_key(encoded):
+    """Decode a JSON version key back into the tuple form of CollectionManifest.key()."""
+    return tuple((name, generation) for name, generation in json.loads(encoded))
+
+
+class SemanticAnswerCache:
+    """Bounded in-memory vector index of past prompts and their answers.
+
+    With a SharedAnswerStore, stores go through the shared table and the
+    index is a replica kept current by pulling new rows before each lookup.
+    """
+
+    def __init__(self, embedder, threshold=0.9, ttl=3600.0, max_entries=1000,
+                 manifest=None, shared=None):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.manifest = manifest or get_manifest()
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._generations = self.manifest.generations()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.pulled = 0
+        self._reset()
+
+    def _reset(self):
+        self._vectors = None
+        self._prompts = []
+        self._answers = []
+        self._versions = []
+        self._keys = []
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._last_used = np.zeros(0, dtype=np.float64)
+        self._shared_id = 0
+
+    def _check_versions(self):
+        """Expire the entries computed from a collection that has been bumped since."""
+        generations = self.manifest.generations()
+        if generations is self._generations:
+            return
+        self._generations = generations
+        for index, versions in enumerate(self._versions):
+            if self._expires[index] > 0 and not self.manifest.is_current(versions, generations):
+                self._expires[index] = 0.0
+                self.invalidations += 1
+        if self.shared is not None:
+            self.shared.discard_stale(lambda versions: self.manifest.is_current(versions, generations))
+
+    def _pull(self, now):
+        """Add the shared rows written since the last pull to the local index."""
+        for row_id, versions, prompt, vector, answer, expires_at, scope in self.shared.since(self._shared_id):
+            if self.manifest.is_current(versions, self._generations):
+                self._add(versions, prompt, vector, answer, expires_at, now, scope)
+                self.pulled += 1
+            self._shared_id = row_id
+
+    def lookup(self, prompt, scope=None):
+        """Return a cached answer for a prompt similar enough to a past one, or None.
+
+        Only past prompts with the same scope and match key are considered.
+        """
+        vector = self.embedder.embed([prompt])[0]
+        now = time.time()
+        with self._lock:
+            self._check_versions()
+            if self.shared is not None:
+                self._pull(now)
+            if not self._prompts:
+                self.misses += 1
+                return None
+            scores = self._vectors @ vector
+            scores[self._expires <= now] = -1.0
+            key = (scope, match_key(prompt))
+            scores[[index for index, entry_key in enumerate(self._keys) if entry_key != key]] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[best] = now
+            self.hits += 1
+            return self._answers[best]
+
+    def store(self, prompt, answer, collections=None, generations=None, scope=None):
+        """Add a prompt/answer pair, evicting expired or least recently used entries.
+
+        The answer is keyed to the generations of the collections it was
+        computed from (every known collection if None), as of the
+        generations() snapshot taken before the agent ran. An answer whose
+        collections were bumped in the meantime is not stored. A scoped answer
+        (a company name) only matches lookups with the same scope.
+        """
+        versions = self.manifest.key(collections, generations)
+        vector = self.embedder.embed([prompt])[0]
+        now = time.time()
+        with self._lock:
+            self._check_versions()
+            if not self.manifest.is_current(versions, self._generations):
+                return
+            if self.shared is not None:
+                # The pull adds this answer along with any other worker's new ones
+                self.shared.add(versions, prompt, vector, answer, now + self.ttl, scope)
+                self._pull(now)
+            else:
+                self._add(versions, prompt, vector, answer, now + self.ttl, now, scope)
+
+    def _add(self, versions, prompt, vector, answer, expires_at, now, scope=None):
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._expires = np.zeros(self.max_entries, dtype=np.float64)
+            self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        if len(self._prompts) < self.max_entries:
+            index = len(self._prompts)
+            self._prompts.append(prompt)
+            self._answers.append(answer)
+            self._versions.append(versions)
+            self._keys.append((scope, match_key(prompt)))
+        else:
+            # Expired entries sort first because their expiry is in the past
+            candidates = np.where(self._expires <= now, -1.0, self._last_used)
+            index = int(np.argmin(candidates))
+            self._prompts[index] = prompt
+            self._answers[index] = answer
+            self._versions[index] = versions
+            self._keys[index] = (scope, match_key(prompt))
+        self._vectors[index] = vector
+        self._expires[index] = expires_at
+        self._last_used[index] = now
+
+    def invalidate(self):
+        """Drop every cached answer, including the shared ones."""
+        with self._lock:
+            self._reset()
+            if self.shared is not None:
+                self.shared.clear()
+                self._shared_id = 0
+            self.invalidations += 1
+
+    def close(self):
+        if self.shared is not None:
+            self.shared.close()
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._prompts)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "shared": self.shared is not None,
+            "pulled": self.pulled,
+        }
+
+
+def create_answer_cache():
+    """Build a SemanticAnswerCache from environment configuration, or None if disabled."""
+    if os.environ.get("ANSWER_CACHE_ENABLED", "1") != "1":
+        return None
+    shared_path = os.environ.get("ANSWER_CACHE_SHARED_PATH")
+    return SemanticAnswerCache(
+        load_embedder(os.environ.get("ANSWER_CACHE_EMBEDDER")),
+        threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.9")),
+        ttl=float(os.environ.get("ANSWER_CACHE_TTL", "3600")),
+        max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+        shared=SharedAnswerStore(server_path(shared_path)) if shared_path else None,
+    )
@@ -0,0 +1,132 @@
+"""
+Backend-call benchmark for /chat prompt coalescing.
+
+Runs the real FastAPI app in-process against the stub agent pool with the
+answer cache and local fast path turned off, then fires a burst of concurrent
+/chat requests drawn from a few questions and their trivial rewordings. The
+same load runs once with coalescing disabled and once enabled, and the report
+compares how many agent.run calls reached the backend.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_coalescing --requests 500 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("AGENT_POOL_BACKEND", "stub")
+os.environ["ANSWER_CACHE_ENABLED"] = "0"
+os.environ["FAST_PATH_ENABLED"] = "0"
+
+from benchmarks.bench_endpoints import percentile
+
+QUESTIONS = [
+    "What does Weaviate do?",
+    "What is Canva used for by enterprise teams?",
+    "How does LlamaIndex connect data to LLMs?",
+    "What are the main features of Comet?",
+    "Which Weaviate products run in the cloud?",
+    "How do hybrid search and vector search differ in Weaviate?",
+]
+
+
+def variants(question):
+    """The question plus rewordings an identical or near-identical prompt would have."""
+    return [
+        question,
+        question.lower(),
+        f"  {question}  ",
+        question.rstrip("?"),
+        f"Please tell me: {question}",
+    ]
+
+
+def synthetic_prompts(total, seed=7):
+    rng = random.Random(seed)
+    pool = [variant for question in QUESTIONS for variant in variants(question)]
+    return [rng.choice(pool) for _ in range(total)]
+
+
+class CallCounter:
+    """Counts StubQueryAgent.run calls across every pooled agent."""
+
+    def __init__(self):
+        from stub_backend import StubQueryAgent
+
+        self.calls = 0
+        original = StubQueryAgent.run
+        counter = self
+
+        def run(agent, query, context=None):
+            counter.calls += 1
+            return original(agent, query, context)
+
+        StubQueryAgent.run = run
+
+
+async def run_mode(prompts, concurrency, coalesce, counter):
+    import httpx
+    import main
+
+    os.environ["CHAT_COALESCE_ENABLED"] = "1" if coalesce else "0"
+    counter.calls = 0
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def one(prompt):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json={"message": prompt})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(prompt) for prompt in prompts))
+            elapsed = time.perf_counter() - start
+            coalescer = main.app.state.chat_coalescer
+            stats = coalescer.stats() if coalescer else None
+    return {
+        "mode": "coalesced" if coalesce else "direct",
+        "requests": len(prompts),
+        "backend_calls": counter.calls,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(prompts) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "coalescer": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /chat backend calls with and without coalescing")
+    parser.add_argument("--requests", type=int, default=500, help="Number of /chat requests per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Client concurrency")
+    parser.add_argument("--agent-latency", type=float, default=0.2, help="Simulated agent.run latency (s)")
+    args = parser.parse_args()
+
+    os.environ["STUB_AGENT_LATENCY"] = str(args.agent_latency)
+    os.environ.setdefault("AGENT_POOL_SIZE", str(args.concurrency))
+    os.environ.setdefault("CHAT_MAX_CONCURRENCY", str(args.concurrency))
+
+    prompts = synthetic_prompts(args.requests)
+    counter = CallCounter()
+    results = [
+        asyncio.run(run_mode(prompts, args.concurrency, False, counter)),
+        asyncio.run(run_mode(prompts, args.concurrency, True, counter)),
+    ]
+    print(f"{'mode':<11}{'reqs':>6}{'calls':>7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for r in results:
+        print(f"{r['mode']:<11}{r['requests']:>6}{r['backend_calls']:>7}"
+              f"{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}")
+    direct, coalesced = results
+    print(f"Coalescer: {coalesced['coalescer']}")
+    print(f"Backend calls reduced {direct['backend_calls'] / max(1, coalesced['backend_calls']):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
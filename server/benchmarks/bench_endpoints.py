@@ -0,0 +1,113 @@
+"""
+Throughput benchmark for /chat and /company-info against the stub backend.
+
+Runs the real FastAPI app in-process (no network, no credentials) with the
+offline agent pool and a stub crew, then fires concurrent requests and reports
+requests/sec and latency percentiles. Compare a serial run (--concurrency 1)
+with a concurrent one to see how much the async request path overlaps work.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_endpoints --requests 200 --concurrency 1 16 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AGENT_POOL_BACKEND", "stub")
+# Every request sends the same prompt; measure the agent path, not the caches
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+os.environ.setdefault("CHAT_COALESCE_ENABLED", "0")
+# /company-info must use the stub crew, not probe real company websites
+os.environ.setdefault("COMPANY_DIRECT_RESOLVE_ENABLED", "0")
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(client, path, payload, total, concurrency):
+    """Send `total` requests with at most `concurrency` in flight."""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "path": path,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def main_async(args):
+    import httpx
+    import main
+    from stub_backend import StubCrew
+
+    main.build_company_crew = lambda: StubCrew(latency=args.crew_latency)
+
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for concurrency in args.concurrency:
+                results.append(await run_load(
+                    client, "/chat", {"message": "What does Weaviate do?"},
+                    args.requests, concurrency,
+                ))
+                results.append(await run_load(
+                    client, "/company-info", {"company_name": "Weaviate"},
+                    max(1, args.requests // 10), concurrency,
+                ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /chat and /company-info against stub backends")
+    parser.add_argument("--requests", type=int, default=200, help="Number of /chat requests per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64],
+                        help="Client concurrency levels to test")
+    parser.add_argument("--agent-latency", type=float, default=0.05, help="Simulated agent.run latency (s)")
+    parser.add_argument("--crew-latency", type=float, default=0.2, help="Simulated crew kickoff latency (s)")
+    args = parser.parse_args()
+
+    os.environ["STUB_AGENT_LATENCY"] = str(args.agent_latency)
+    os.environ.setdefault("AGENT_POOL_SIZE", str(max(args.concurrency)))
+    os.environ.setdefault("CHAT_MAX_CONCURRENCY", str(max(args.concurrency)))
+    os.environ.setdefault("COMPANY_INFO_MAX_CONCURRENCY", str(max(args.concurrency)))
+
+    results = asyncio.run(main_async(args))
+    print(f"{'path':<14}{'conc':>6}{'reqs':>6}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for r in results:
+        print(f"{r['path']:<14}{r['concurrency']:>6}{r['requests']:>6}{r['errors']:>5}"
+              f"{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+    serial = next(r["rps"] for r in results if r["path"] == "/chat" and r["concurrency"] == min(args.concurrency))
+    best = max(r["rps"] for r in results if r["path"] == "/chat")
+    print(f"/chat speedup over concurrency {min(args.concurrency)}: {best / serial:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Startup budget check: how long `import main` and the app's startup take.
+
+Each measurement runs in a fresh interpreter, so nothing is already imported.
+The script reports the wall time of `import main`, the time until the
+lifespan startup has finished (the point where uvicorn reports ready), how
+much of that the lifespan itself took, the
+slowest top-level imports from ``python -X importtime``, and whether any of
+the heavy modules that main.py loads lazily were imported on the startup path
+(by `import main` or the lifespan itself; the agent pool and the prewarmer
+import them on their own threads after startup). The app starts with its
+default agent pool backend, so the real Weaviate client is what must stay off
+the startup path. It exits with status 1 if the median import, startup or lifespan
+time exceeds its budget or a heavy module was imported on the startup path, so it
+can gate CI; tests/test_startup.py runs the same probe.
+
+Usage (from the server directory):
+    python -m benchmarks.bench_startup --runs 5 --import-budget-ms 1500 --startup-budget-ms 2500 --lifespan-budget-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Top-level packages main.py must not import at module load
+HEAVY_PACKAGES = ("crewai", "crewai_tools", "litellm", "weaviate", "weaviate_calibrate_companies", "company_data")
+
+PROBE = """
+import json, sys, time, asyncio, threading
+heavy = set()
+
+class HeavyImports:
+    # Records heavy imports made by the main thread before startup has finished
+    recording = True
+
+    def find_spec(self, name, path=None, target=None):
+        if self.recording and threading.current_thread() is threading.main_thread():
+            if name.partition(".")[0] in {heavy!r}:
+                heavy.add(name.partition(".")[0])
+        return None
+
+finder = HeavyImports()
+sys.meta_path.insert(0, finder)
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        finder.recording = False
+        return time.perf_counter() - start
+
+ready = asyncio.run(startup())
+print("PROBE " + json.dumps({{"import_s": imported, "ready_s": ready, "heavy": sorted(heavy)}}))
+"""
+
+
+def probe_env():
+    env = dict(os.environ)
+    env.setdefault("PYTHONWARNINGS", "ignore")
+    tmp = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"bench-startup-{os.getpid()}")
+    os.makedirs(tmp, exist_ok=True)
+    env.setdefault("DESCRIPTION_CACHE_PATH", os.path.join(tmp, "descriptions.db"))
+    env.setdefault("JOB_STORE_PATH", os.path.join(tmp, "jobs.db"))
+    return env
+
+
+def measure(env):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_PACKAGES)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    line = next(line for line in result.stdout.splitlines() if line.startswith("PROBE "))
+    return json.loads(line[len("PROBE "):])
+
+
+def slowest_imports(env, top):
+    """Return the `top` slowest imports made by `import main` as (cumulative_us, module)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # Only modules imported directly by main (one level of indentation)
+        if len(module) - len(module.lstrip()) <= 3:
+            rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure server import and startup time against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--import-budget-ms", type=float, default=1500, help="Budget for `import main`")
+    parser.add_argument("--startup-budget-ms", type=float, default=2500, help="Budget until startup completes")
+    parser.add_argument("--lifespan-budget-ms", type=float, default=500,
+                        help="Budget for the lifespan startup alone (connecting to Weaviate is not part of it)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    env = probe_env()
+    samples = [measure(env) for _ in range(args.runs)]
+    import_ms = statistics.median(s["import_s"] for s in samples) * 1000
+    ready_ms = statistics.median(s["ready_s"] for s in samples) * 1000
+    lifespan_ms = statistics.median(s["ready_s"] - s["import_s"] for s in samples) * 1000
+    heavy = sorted({name for s in samples for name in s["heavy"]})
+
+    print(f"import main: {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"startup:     {ready_ms:.0f} ms (budget {args.startup_budget_ms:.0f} ms)")
+    print(f"lifespan:    {lifespan_ms:.0f} ms (budget {args.lifespan_budget_ms:.0f} ms)")
+    print("Slowest imports by main:")
+    for cumulative_us, module in slowest_imports(env, args.top):
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {module}")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append("import time over budget")
+    if ready_ms > args.startup_budget_ms:
+        failures.append("startup time over budget")
+    if lifespan_ms > args.lifespan_budget_ms:
+        failures.append("lifespan time over budget")
+    if heavy:
+        failures.append(f"heavy modules imported on the startup path: {', '.join(heavy)}")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Offline stand-ins for the crew's LLM and the websites it visits.
+
+CannedLLM is a crewai LLM that answers in the ReAct format after a fixed
+latency: the first turn of a task calls the task's tool, the turn after an
+observation gives the final answer (a URL from the search results, or the
+scraped text). FakeWebsiteServer serves a search endpoint and one "About"
+page per company on localhost, so the real ScrapeElementFromWebsiteTool runs
+over HTTP. build_offline_crew() assembles the same agents and tasks as the
+real crew from its YAML config, wired to these fakes.
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+# Skips crewai's interactive first-run tracing prompt
+os.environ.setdefault("CREWAI_TESTING", "true")
+
+import yaml
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
+from crewai.tools import BaseTool
+from crewai_tools import ScrapeElementFromWebsiteTool
+from pydantic import BaseModel, Field
+
+CREW_CONFIG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "crew", "src", "company_description_retrieval_automation", "config",
+)
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def company_description(name):
+    return f"{name} builds software that helps teams search, organise and share their knowledge."
+
+
+class FakeWebsiteServer:
+    """Threaded localhost HTTP server with /search and per-company /sites/<slug>/ pages."""
+
+    def __init__(self, search_latency=0.0, page_latency=0.0):
+        self.search_latency = search_latency
+        self.page_latency = page_latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                url = urlparse(self.path)
+                if url.path == "/search":
+                    time.sleep(server.search_latency)
+                    query = parse_qs(url.query).get("q", [""])[0]
+                    name = re.sub(r"\s+official website$", "", query, flags=re.I).strip()
+                    body = f"{name} - official website: {server.url}/sites/{quote(slugify(name))}/\n"
+                    self._send(body, "text/plain")
+                elif url.path.startswith("/sites/"):
+                    time.sleep(server.page_latency)
+                    slug = url.path.split("/")[2]
+                    name = slug.replace("-", " ").title()
+                    body = (
+                        f"<html><head><title>{name}</title></head><body>"
+                        f"<nav>Home Products Pricing</nav>"
+                        f"<section id=\"about\"><p>{company_description(name)}</p></section>"
+                        f"</body></html>"
+                    )
+                    self._send(body, "text/html")
+                else:
+                    self.send_error(404)
+
+            def _send(self, body, content_type):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        return False
+
+
+class FakeSearchInput(BaseModel):
+    search_query: str = Field(..., description="What to search for, e.g. 'Acme official website'")
+
+
+class FakeSearchTool(BaseTool):
+    """Web search against FakeWebsiteServer's /search endpoint."""
+
+    name: str = "Search the web"
+    description: str = "Search the web and return result titles with their URLs."
+    args_schema: type[BaseModel] = FakeSearchInput
+    base_url: str = ""
+
+    def _run(self, search_query: str) -> str:
+        import requests
+
+        response = requests.get(f"{self.base_url}/search", params={"q": search_query}, timeout=10)
+        response.raise_for_status()
+        return response.text
+
+
+class CannedLLM(BaseLLM):
+    """Deterministic ReAct responder with a fixed per-call latency."""
+
+    def __init__(self, latency=0.05):
+        super().__init__(model="canned")
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        last = str(messages[-1].get("content", ""))
+        if "Observation:" in last:
+            return f"Thought: I now know the final answer\nFinal Answer: {self._final_answer(last)}"
+        if "Search the web" in text:
+            match = re.search(r"like '(.+?) official website'", text)
+            company = match.group(1).strip() if match else "the company"
+            action, arguments = "Search the web", {"search_query": f"{company} official website"}
+        else:
+            urls = re.findall(r"https?://[^\s'\"<>]+", text)
+            action = "Read a website content"
+            arguments = {"website_url": urls[-1] if urls else "", "css_element": "#about"}
+        return (
+            "Thought: I should use the tool to get this information.\n"
+            f"Action: {action}\n"
+            f"Action Input: {json.dumps(arguments)}"
+        )
+
+    def _final_answer(self, observation):
+        observation = observation.split("Observation:", 1)[1].strip()
+        url = re.search(r"https?://\S+", observation)
+        if "official website" in observation and url:
+            return url.group(0)
+        return observation.splitlines()[0].strip() if observation else "No description found."
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 128000
+
+
+def _load_config(name):
+    with open(os.path.join(CREW_CONFIG_DIR, name), encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def build_offline_crew(website_url, llm):
+    """The company description crew with its tools and LLM replaced by local fakes."""
+    agents_config = _load_config("agents.yaml")
+    tasks_config = _load_config("tasks.yaml")
+    search = FakeSearchTool(base_url=website_url)
+    scrape = ScrapeElementFromWebsiteTool()
+    website_finder = Agent(config=agents_config["website_finder"], tools=[search], llm=llm, verbose=False)
+    description_scraper = Agent(config=agents_config["description_scraper"], tools=[scrape], llm=llm, verbose=False)
+    find_website = Task(
+        config={k: v for k, v in tasks_config["find_company_website"].items() if k != "agent"},
+        agent=website_finder,
+        tools=[search],
+        name="find_company_website",
+    )
+    extract_description = Task(
+        config={k: v for k, v in tasks_config["extract_company_description"].items() if k not in ("agent", "context")},
+        agent=description_scraper,
+        tools=[scrape],
+        context=[find_website],
+        name="extract_company_description",
+    )
+    return Crew(
+        agents=[website_finder, description_scraper],
+        tasks=[find_website, extract_description],
+        process=Process.sequential,
+        verbose=False,
+    )
@@ -0,0 +1,295 @@
+"""
+Offline benchmark suite producing JSON reports that can be compared across commits.
+
+Every scenario runs locally: Weaviate is replaced by the in-process
+StubWeaviateClient/FakeCollections store, the QueryAgent by the stub agent
+pool, and the crew's LLM and websites by the fakes in benchmarks/fakes.py.
+
+Scenarios:
+    ingestion   populate_database over a synthetic company dataset (initial
+                sync and an unchanged re-sync), plus a pre-vectorized import
+                through dataset_loader.import_sources
+    chat        /chat QPS and p50/p95/p99 latency for agent-bound prompts
+                and prompts answered by the local fast path
+    crew        /company-info/batch style throughput (iter_batch) of the real
+                crew definition with a canned-latency LLM and a fake website
+
+The report is written to benchmarks/results/<commit>.json unless --output is
+given. --compare prints the change of every metric between two reports.
+
+Usage (from the server directory):
+    python -m benchmarks.run_suite
+    python -m benchmarks.run_suite --scenarios chat crew --llm-latency 0.2
+    python -m benchmarks.run_suite --compare results/old.json results/new.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("AGENT_POOL_BACKEND", "stub")
+# Measure the agent path rather than answers cached by earlier requests
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "0")
+os.environ.setdefault("CHAT_COALESCE_ENABLED", "0")
+# /company-info must use the stub crew, not probe real company websites
+os.environ.setdefault("COMPANY_DIRECT_RESOLVE_ENABLED", "0")
+
+from benchmarks.bench_endpoints import run_load
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+AGENT_PROMPT = "Compare how Weaviate and Canva approach enterprise customers"
+FAST_PATH_PROMPT = "When was Weaviate founded?"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def synthetic_company_documents(companies, products=3, use_cases=2, seed=7):
+    """Yield company documents in the company_info/products/use_cases layout."""
+    rng = random.Random(seed)
+    for i in range(companies):
+        name = f"Company {i:05d}"
+        yield {
+            "company_info": {
+                "name": name,
+                "description": f"{name} makes tools for {rng.choice(['search', 'design', 'analytics', 'storage'])}.",
+                "founded_year": rng.randint(1990, 2023),
+                "founders": [f"Founder {i}-{j}" for j in range(rng.randint(1, 3))],
+                "sources": [f"https://example.com/{i}"],
+            },
+            "products": [
+                {"name": f"{name} Product {j}", "description": f"Product {j} of {name}.", "type": "software"}
+                for j in range(products)
+            ],
+            "use_cases": [
+                {"name": f"{name} Use Case {j}", "description": f"How teams use {name} for task {j}."}
+                for j in range(use_cases)
+            ],
+        }
+
+
+def synthetic_vector_items(count, dimensions):
+    rng = random.Random(count)
+    for i in range(count):
+        yield {
+            "properties": {"name": f"Item {i}", "description": f"Synthetic item {i}."},
+            "vector": [rng.random() for _ in range(dimensions)],
+        }
+
+
+@contextlib.contextmanager
+def environ(**values):
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update({key: str(value) for key, value in values.items()})
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def bench_ingestion(args):
+    from dataset_loader import import_sources, vector_objects
+    from importer import create_importer
+    from stub_backend import StubWeaviateClient
+    from weaviate_calibrate_companies import COLLECTIONS, populate_database
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset_path = os.path.join(tmp, "companies.jsonl")
+        with open(dataset_path, "w", encoding="utf-8") as f:
+            for document in synthetic_company_documents(args.companies):
+                f.write(json.dumps(document) + "\n")
+        with environ(COMPANY_DATASET_PATH=dataset_path, COLLECTION_MANIFEST_PATH=os.path.join(tmp, "collections.json")):
+            client = StubWeaviateClient()
+            for label in ("initial_sync", "unchanged_resync"):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    populate_database(client)
+                elapsed = time.perf_counter() - start
+                objects = sum(len(client.collections.get(name)) for name in COLLECTIONS)
+                results[label] = {
+                    "companies": args.companies,
+                    "objects": objects,
+                    "elapsed_s": round(elapsed, 3),
+                    "objects_per_s": round(objects / elapsed, 1),
+                }
+
+    client = StubWeaviateClient()
+    jobs = [
+        (client.collections.get(name), vector_objects(synthetic_vector_items(args.vector_objects, args.dimensions)))
+        for name in ("Brands", "ECommerce")
+    ]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = import_sources(create_importer(), jobs)
+    elapsed = time.perf_counter() - start
+    imported = sum(s.succeeded for s in stats)
+    results["vector_import"] = {
+        "objects": imported,
+        "dimensions": args.dimensions,
+        "elapsed_s": round(elapsed, 3),
+        "objects_per_s": round(imported / elapsed, 1),
+    }
+    return results
+
+
+async def bench_chat(args):
+    import httpx
+    import main
+
+    results = {}
+    with environ(STUB_AGENT_LATENCY=args.agent_latency, FAST_PATH_ENABLED="1"):
+        async with main.app.router.lifespan_context(main.app):
+            # Measure the served path, not the first build of the index
+            main.app.state.fast_path.refresh()
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for concurrency in args.concurrency:
+                    for label, prompt in (("agent", AGENT_PROMPT), ("fast_path", FAST_PATH_PROMPT)):
+                        result = await run_load(client, "/chat", {"message": prompt}, args.requests, concurrency)
+                        results[f"{label}@{concurrency}"] = result
+    return results
+
+
+async def bench_crew(args):
+    from benchmarks.fakes import CannedLLM, FakeWebsiteServer, build_offline_crew
+    from crew.src.company_description_retrieval_automation.batch import batch_report, iter_batch
+
+    results = {}
+    with FakeWebsiteServer(search_latency=args.site_latency, page_latency=args.site_latency) as site:
+        llm = CannedLLM(latency=args.llm_latency)
+
+        async def resolve(company_name):
+            crew = build_offline_crew(site.url, llm)
+            result = await crew.kickoff_async(inputs={"company_name": company_name})
+            return str(result), {}
+
+        names = [f"Company {i:05d}" for i in range(args.crew_companies)]
+        for concurrency in args.concurrency:
+            llm.calls = 0
+            records = []
+            start = time.perf_counter()
+            async for record in iter_batch(names, resolve, concurrency=concurrency):
+                records.append(record)
+            report = batch_report(records, time.perf_counter() - start)
+            report["llm_calls"] = llm.calls
+            results[f"batch@{concurrency}"] = report
+    return results
+
+
+def run_suite(args):
+    scenarios = {}
+    if "ingestion" in args.scenarios:
+        print("Running ingestion...")
+        scenarios["ingestion"] = bench_ingestion(args)
+    if "chat" in args.scenarios:
+        print("Running chat...")
+        scenarios["chat"] = asyncio.run(bench_chat(args))
+    if "crew" in args.scenarios:
+        print("Running crew...")
+        scenarios["crew"] = asyncio.run(bench_crew(args))
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        "scenarios": scenarios,
+    }
+
+
+def flatten(value, prefix=""):
+    """Map every numeric leaf of a report to a dotted key."""
+    if isinstance(value, dict):
+        items = {}
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else str(key)))
+        return items
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare_reports(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    old_metrics = flatten(old["scenarios"])
+    new_metrics = flatten(new["scenarios"])
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'metric':<52}{'old':>12}{'new':>12}{'change':>10}")
+    for key in sorted(set(old_metrics) | set(new_metrics)):
+        before, after = old_metrics.get(key), new_metrics.get(key)
+        if before is None or after is None:
+            change = "n/a"
+        elif before == 0:
+            change = "" if after == 0 else "new"
+        else:
+            change = f"{(after - before) / before * 100:+.1f}%"
+        print(f"{key:<52}{str(before):>12}{str(after):>12}{change:>10}")
+
+
+def print_summary(report):
+    for scenario, results in report["scenarios"].items():
+        print(f"\n[{scenario}]")
+        for label, result in results.items():
+            metrics = {k: v for k, v in result.items() if not isinstance(v, (dict, list))}
+            print(f"  {label:<18} " + " ".join(f"{k}={v}" for k, v in metrics.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--scenarios", nargs="+", choices=["ingestion", "chat", "crew"],
+                        default=["ingestion", "chat", "crew"], help="Scenarios to run")
+    parser.add_argument("--companies", type=int, default=2000, help="Synthetic companies to ingest")
+    parser.add_argument("--vector-objects", type=int, default=20000, help="Pre-vectorized objects per collection")
+    parser.add_argument("--dimensions", type=int, default=256, help="Vector dimensions for the vector import")
+    parser.add_argument("--requests", type=int, default=300, help="/chat requests per prompt and concurrency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument("--agent-latency", type=float, default=0.05, help="Stub agent.run latency (s)")
+    parser.add_argument("--crew-companies", type=int, default=24, help="Companies per crew batch")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Canned LLM latency per call (s)")
+    parser.add_argument("--site-latency", type=float, default=0.01, help="Fake website latency per request (s)")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    os.environ.setdefault("AGENT_POOL_SIZE", str(max(args.concurrency)))
+    os.environ.setdefault("CHAT_MAX_CONCURRENCY", str(max(args.concurrency)))
+
+    report = run_suite(args)
+    print_summary(report)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    main()
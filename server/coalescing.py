@@ -0,0 +1,170 @@
+"""
+Coalescing and micro-batching for /chat agent calls.
+
+During bursts many users ask the same or nearly the same question. The
+PromptCoalescer sits in front of the agent:
+
+    - concurrent identical prompts (after case and whitespace normalization)
+      share one in-flight call through AsyncSingleFlight
+    - distinct prompts arriving within a short window are micro-batched: the
+      whole window is embedded in one batched call, prompts whose embeddings
+      are at least ``threshold`` similar are grouped, and each group costs a
+      single agent.run whose answer is shared by the group; like the answer
+      cache, only prompts with the same names and negations in the same order
+      (answer_cache.match_key) can be grouped
+
+The QueryAgent only exposes run(); its retrieval sub-queries are planned and
+executed server-side, so the window is batched at the prompt level rather
+than as a multi-query request to Weaviate.
+
+Configuration (environment variables):
+    CHAT_COALESCE_ENABLED    "1" (default) or "0"
+    CHAT_COALESCE_WINDOW_MS  how long a batch collects prompts (default 10)
+    CHAT_COALESCE_THRESHOLD  cosine similarity for sharing an answer (default 0.95)
+    CHAT_COALESCE_MAX_BATCH  prompts per batch before it is sent early (default 32)
+"""
+import asyncio
+import os
+import re
+
+import numpy as np
+
+from answer_cache import HashingEmbedder, match_key
+from singleflight import AsyncSingleFlight
+
+
+def normalize_prompt(prompt):
+    """Key for identical prompts: lowercased, whitespace collapsed, trailing punctuation dropped."""
+    return re.sub(r"\s+", " ", prompt.strip().lower()).rstrip("?!. ")
+
+
+class MicroBatcher:
+    """Collect submitted items for up to `window` seconds and dispatch them together.
+
+    batch_fn is ``async def batch_fn(items) -> list`` returning one result per
+    item; an exception instance in the list is raised to that item's caller.
+    """
+
+    def __init__(self, batch_fn, window=0.01, max_batch=32):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "largest": self.largest,
+            "mean_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class PromptCoalescer:
+    """Share agent calls between identical and near-identical concurrent prompts.
+
+    run is ``async def run(prompt)`` returning the agent response.
+    """
+
+    def __init__(self, run, embedder=None, window=0.01, threshold=0.95, max_batch=32):
+        self.run = run
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.flights = AsyncSingleFlight()
+        self.batcher = MicroBatcher(self._run_batch, window, max_batch)
+        self.requests = 0
+        self.agent_calls = 0
+        self.merged = 0
+
+    async def ask(self, prompt):
+        """Return the agent response for prompt, sharing work with concurrent prompts."""
+        self.requests += 1
+        return await self.flights.do(normalize_prompt(prompt), lambda: self.batcher.submit(prompt))
+
+    def group(self, prompts):
+        """Return, per prompt, the index of the prompt whose answer it will use."""
+        if len(prompts) == 1:
+            return [0]
+        vectors = self.embedder.embed(prompts)
+        similarity = vectors @ vectors.T
+        keys = [match_key(prompt) for prompt in prompts]
+        leaders = []
+        assignment = []
+        for i in range(len(prompts)):
+            candidates = [leader for leader in leaders if keys[leader] == keys[i]]
+            if candidates:
+                scores = similarity[i, candidates]
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    assignment.append(candidates[best])
+                    continue
+            leaders.append(i)
+            assignment.append(i)
+        return assignment
+
+    async def _run_batch(self, prompts):
+        assignment = self.group(prompts)
+        leaders = sorted(set(assignment))
+        self.agent_calls += len(leaders)
+        self.merged += len(prompts) - len(leaders)
+        responses = await asyncio.gather(*(self.run(prompts[i]) for i in leaders), return_exceptions=True)
+        by_leader = dict(zip(leaders, responses))
+        return [by_leader[leader] for leader in assignment]
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "agent_calls": self.agent_calls,
+            "identical_coalesced": self.flights.coalesced,
+            "similar_merged": self.merged,
+            "batching": self.batcher.stats(),
+        }
+
+
+def create_prompt_coalescer(run):
+    """Build the PromptCoalescer configured by the environment, or None if disabled."""
+    if os.environ.get("CHAT_COALESCE_ENABLED", "1") != "1":
+        return None
+    return PromptCoalescer(
+        run,
+        window=float(os.environ.get("CHAT_COALESCE_WINDOW_MS", "10")) / 1000,
+        threshold=float(os.environ.get("CHAT_COALESCE_THRESHOLD", "0.95")),
+        max_batch=int(os.environ.get("CHAT_COALESCE_MAX_BATCH", "32")),
+    )
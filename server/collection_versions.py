@@ -0,0 +1,167 @@
+"""
+Generation counters for the Weaviate collections.
+
+Every run that writes a collection (populate_database, ``--reinit``, a crew
+description write-back) bumps that collection's generation in a small JSON
+manifest next to the other caches:
+
+    {"CompanyInfo": {"generation": 4, "updated_at": 1718000000.0, "reason": "sync"}, ...}
+
+Caches record the generations an entry was computed from (see key()) and
+treat the entry as stale as soon as one of them has moved on. Invalidation is
+therefore immediate and limited to entries that read the changed
+collections; nothing is flushed on a timer.
+
+generations() is cheap enough to call on every request: the manifest is
+re-read only when the file changed, so an unchanged manifest costs one
+stat() call. Bumps take an exclusive lock on a sibling .lock file and
+replace the manifest atomically, so ingestion processes and API workers on
+the same host see consistent counters.
+
+The manifest path does not depend on the working directory: the default
+and relative COLLECTION_MANIFEST_PATH values are resolved against the server
+directory, so the ingestion script and every API worker share one file
+wherever they are started from.
+
+Configuration (environment variables):
+    COLLECTION_MANIFEST_PATH  JSON manifest (default <server dir>/.cache/collections.json)
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; bumps are then only thread-safe
+    fcntl = None
+
+from paths import cache_path, server_path
+
+# Version key entry standing for every collection
+ALL = "*"
+
+
+class CollectionManifest:
+    """Per-collection generation counters stored in a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file_id = None
+        self._generations = {}
+        self._entries = {}
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # os.replace gives every write a new inode, so equal ids mean an unchanged file
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def generations(self):
+        """Return {collection: generation}; collections never written are missing (generation 0).
+
+        The returned dict is shared and must not be modified. It is replaced,
+        not updated, when the manifest changes, so callers can compare it by
+        identity to skip work when nothing changed.
+        """
+        file_id = self._stat()
+        with self._lock:
+            if file_id != self._file_id:
+                entries = self._load() if file_id is not None else {}
+                self._entries = entries
+                self._generations = {name: entry["generation"] for name, entry in entries.items()}
+                self._file_id = file_id
+            return self._generations
+
+    def generation(self, collection):
+        return self.generations().get(collection, 0)
+
+    def key(self, collections=None, generations=None):
+        """Version key of the given collections, or of every collection if None.
+
+        A sorted tuple of (collection, generation) pairs, usable as part of a
+        cache key; pass a generations() snapshot taken before computing the
+        cached value so a concurrent bump is not missed. The key of every
+        collection is ("*", sum of all generations), which also moves when a
+        collection is written for the first time.
+        """
+        generations = self.generations() if generations is None else generations
+        if collections is None:
+            return ((ALL, sum(generations.values())),)
+        return tuple(sorted((name, generations.get(name, 0)) for name in set(collections)))
+
+    def is_current(self, key, generations=None):
+        """Whether no collection in a version key has been bumped since."""
+        generations = self.generations() if generations is None else generations
+        return all(
+            (sum(generations.values()) if name == ALL else generations.get(name, 0)) == generation
+            for name, generation in key
+        )
+
+    @contextmanager
+    def _exclusive(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def bump(self, collections, reason=None):
+        """Advance the generation of each collection; returns the new {collection: generation}."""
+        with self._lock, self._exclusive():
+            entries = self._load()
+            now = time.time()
+            for name in collections:
+                entry = entries.get(name, {"generation": 0})
+                entries[name] = {"generation": entry["generation"] + 1, "updated_at": now, "reason": reason}
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        return {name: entries[name]["generation"] for name in collections}
+
+    def stats(self):
+        self.generations()
+        with self._lock:
+            return {name: dict(entry) for name, entry in sorted(self._entries.items())}
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(path=None):
+    """Return the process-wide CollectionManifest for a path (default from the environment)."""
+    path = server_path(path) if path else cache_path("COLLECTION_MANIFEST_PATH", "collections.json")
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = _manifests[path] = CollectionManifest(path)
+        return manifest
+
+
+def generations():
+    """Current {collection: generation} of the default manifest."""
+    return get_manifest().generations()
+
+
+def bump(collections, reason=None):
+    """Advance the generations of collections in the default manifest."""
+    return get_manifest().bump(collections, reason)
@@ -0,0 +1,177 @@
+"""
+Typed, streaming dataset layer for company data.
+
+Every object that ends up in Weaviate is one slotted record: CompanyInfoRecord,
+ProductRecord or UseCaseRecord, each tagged with the company it belongs to.
+Fields outside the collection schema (location, features, ...) are kept in
+``extra`` so the stored properties do not change.
+
+CompanyDataset reads records lazily, one at a time, from:
+
+    - a JSONL file (COMPANY_DATASET_PATH ending in .jsonl/.ndjson) whose lines
+      are either company documents ``{"company_info": {...}, "products": [...],
+      "use_cases": [...]}`` or flat records ``{"collection": "Products",
+      "company": "Acme", "name": ..., ...}``
+    - a Parquet file of flat records, read one row group at a time
+    - the built-in COMPANY_DATA literal when no path is configured (imported
+      only when first iterated)
+
+A dataset is re-iterable: each iteration opens the source again, which lets
+the incremental sync make a hashing pass and a writing pass without keeping
+the records in memory.
+
+Export the built-in data to a file to start managing it outside the code:
+    python company_dataset.py export companies.jsonl
+"""
+import json
+import os
+import sys
+from dataclasses import dataclass, field, fields
+from typing import ClassVar, Dict, List, Optional
+
+from dataset_loader import iter_jsonl, iter_parquet
+
+
+@dataclass(slots=True)
+class CompanyRecord:
+    """Base record: one object in one collection, belonging to one company."""
+
+    company: str
+    name: str
+    description: Optional[str] = None
+    sources: Optional[List[str]] = None
+    extra: Dict = field(default_factory=dict)
+
+    collection_name: ClassVar[str] = ""
+
+    @classmethod
+    def from_properties(cls, company, properties):
+        """Build a record from a properties dict, keeping unknown keys in extra."""
+        known = {f.name for f in fields(cls)} - {"company", "extra"}
+        values = {k: v for k, v in properties.items() if k in known}
+        extra = {k: v for k, v in properties.items() if k not in known}
+        return cls(company=company, extra=extra, **values)
+
+    def properties(self):
+        """Return the Weaviate properties of this record."""
+        properties = {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if f.name not in ("company", "extra") and getattr(self, f.name) is not None
+        }
+        properties.update(self.extra)
+        return properties
+
+
+@dataclass(slots=True)
+class CompanyInfoRecord(CompanyRecord):
+    founded_year: Optional[int] = None
+    founders: Optional[List[str]] = None
+
+    collection_name: ClassVar[str] = "CompanyInfo"
+
+
+@dataclass(slots=True)
+class ProductRecord(CompanyRecord):
+    type: Optional[str] = None
+
+    collection_name: ClassVar[str] = "Products"
+
+
+@dataclass(slots=True)
+class UseCaseRecord(CompanyRecord):
+    collection_name: ClassVar[str] = "UseCases"
+
+
+RECORD_TYPES = {cls.collection_name: cls for cls in (CompanyInfoRecord, ProductRecord, UseCaseRecord)}
+
+
+def records_from_document(data):
+    """Yield the records of one company document in the company_info/products/use_cases layout."""
+    company = data["company_info"]["name"]
+    yield CompanyInfoRecord.from_properties(company, data["company_info"])
+    for product in data.get("products") or []:
+        yield ProductRecord.from_properties(company, product)
+    for use_case in data.get("use_cases") or []:
+        yield UseCaseRecord.from_properties(company, use_case)
+
+
+def records_from_row(row):
+    """Yield records from one file row: a company document or a flat record."""
+    if "company_info" in row:
+        yield from records_from_document(row)
+        return
+    properties = {k: v for k, v in row.items() if k not in ("collection", "company") and v is not None}
+    yield RECORD_TYPES[row["collection"]].from_properties(row["company"], properties)
+
+
+def builtin_documents():
+    """Yield company documents from the COMPANY_DATA literal.
+
+    Weaviate's own data sits at the top level; every other company is a nested
+    dict with the same layout.
+    """
+    from company_data import COMPANY_DATA
+
+    yield COMPANY_DATA
+    for value in COMPANY_DATA.values():
+        if isinstance(value, dict) and "company_info" in value:
+            yield value
+
+
+class CompanyDataset:
+    """Lazily read, re-iterable collection of company records."""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def rows(self):
+        if self.path is None:
+            return builtin_documents()
+        if os.path.splitext(self.path)[1].lower() == ".parquet":
+            return iter_parquet(self.path)
+        return iter_jsonl(self.path)
+
+    def __iter__(self):
+        for row in self.rows():
+            yield from records_from_row(row)
+
+    def for_collection(self, collection_name):
+        """Re-iterable view of (company, properties) pairs for one collection."""
+        return CollectionRecords(self, collection_name)
+
+
+class CollectionRecords:
+    """(company, properties) pairs of one collection, re-read on every iteration."""
+
+    def __init__(self, dataset, collection_name):
+        self.dataset = dataset
+        self.collection_name = collection_name
+
+    def __iter__(self):
+        for record in self.dataset:
+            if record.collection_name == self.collection_name:
+                yield record.company, record.properties()
+
+
+def load_company_dataset():
+    """Open the dataset configured by COMPANY_DATASET_PATH (default: built-in COMPANY_DATA)."""
+    return CompanyDataset(os.environ.get("COMPANY_DATASET_PATH") or None)
+
+
+def export_jsonl(dataset, path):
+    """Write a dataset as flat JSONL records; returns the number written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in dataset:
+            row = {"collection": record.collection_name, "company": record.company, **record.properties()}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "export":
+        print("Usage: python company_dataset.py export <output.jsonl>")
+        sys.exit(1)
+    print(f"Wrote {export_jsonl(CompanyDataset(), sys.argv[2])} records to {sys.argv[2]}")
@@ -0,0 +1,47 @@
+"""
+Collection layouts for the company data.
+
+shared (default)
+    One CompanyInfo, Products and UseCases collection holds every company.
+    A /chat company scope is passed to the agent as an instruction, so the
+    agent filters its searches on that company.
+
+tenants
+    The same three collections with Weaviate multi-tenancy enabled and one
+    tenant per company (named by tenant_name()). A scoped question searches
+    only that company's tenant, and each company can be loaded, deactivated,
+    offloaded or re-indexed on its own (``weaviate_calibrate_companies.py
+    --company NAME --company-action ...``). Multi-tenant collections cannot
+    be searched across tenants, so every /chat question needs a company scope.
+
+Switching layouts changes the collection schema: run ``--reinit`` after
+changing COMPANY_COLLECTION_LAYOUT.
+
+Configuration (environment variables):
+    COMPANY_COLLECTION_LAYOUT  "shared" (default) or "tenants"
+"""
+import os
+import re
+import unicodedata
+
+LAYOUTS = ("shared", "tenants")
+
+
+def collection_layout():
+    layout = os.environ.get("COMPANY_COLLECTION_LAYOUT", "shared")
+    if layout not in LAYOUTS:
+        raise ValueError(f"COMPANY_COLLECTION_LAYOUT must be one of {', '.join(LAYOUTS)}, not {layout!r}")
+    return layout
+
+
+def tenant_name(company):
+    """Tenant of a company: Weaviate allows 1-64 characters of [A-Za-z0-9_-]."""
+    ascii_name = unicodedata.normalize("NFKD", company).encode("ascii", "ignore").decode("ascii")
+    name = re.sub(r"[^a-z0-9_-]+", "-", ascii_name.lower()).strip("-")
+    return name[:64] or "company"
+
+
+def scope_prompt(prompt, company):
+    """Prompt narrowed to one company, for layouts without a tenant per company."""
+    return (f"{prompt}\n\nOnly use information about the company {company}; "
+            f"ignore objects that belong to other companies.")
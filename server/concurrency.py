@@ -0,0 +1,81 @@
+"""
+Helpers for keeping blocking agent and crew calls off the event loop.
+
+QueryAgent.run and Crew.kickoff are synchronous network-bound calls. Running
+them directly inside an ``async def`` handler stalls every other request on the
+uvicorn worker, so handlers offload them to a bounded thread pool and guard
+each endpoint with a concurrency limit.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Raised when an endpoint is at its concurrency limit for too long."""
+
+
+class EndpointLimiter:
+    """Async concurrency limit for a single endpoint.
+
+    Up to ``limit`` requests run at once; further requests wait up to
+    ``queue_timeout`` seconds for a free slot before Overloaded is raised.
+    """
+
+    def __init__(self, name, limit, queue_timeout=10.0):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} is at its concurrency limit ({self.limit})")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+        return False
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class BlockingExecutor:
+    """Bounded thread pool for running blocking calls from async code."""
+
+    def __init__(self, max_workers, name="blocking"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the pool and await its result.
+
+        fn runs in a copy of the caller's context, so context variables such as
+        the request trace (see instrumentation.py) carry over to the thread.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,240 @@
+"""
+Bulk company enrichment: run many crews concurrently and stream results to JSONL.
+
+Input files may be CSV (a ``company_name`` column, or the first column), JSONL
+(objects with ``company_name``, or plain strings) or plain text with one name
+per line. Every result is appended and flushed to the output JSONL as soon as
+it is ready, so the output doubles as the checkpoint: re-running with the
+same output file skips the companies that already succeeded.
+
+An application can wrap every crew the batch builds (e.g. to rate-limit its
+LLM calls) with set_crew_guard(); the CLI installs the API server's
+resilience guards when they are importable.
+"""
+import asyncio
+import csv
+import json
+import os
+import time
+
+_crew_guard = None
+
+
+def set_crew_guard(guard):
+    """Pass every crew built by crew_resolver through guard(crew) before it runs (None to stop)."""
+    global _crew_guard
+    _crew_guard = guard
+
+
+def read_company_names(path):
+    """Yield company names from a CSV, JSONL or plain-text file."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if extension == ".csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            column = header.index("company_name") if "company_name" in header else 0
+            if "company_name" not in header and header[column].strip():
+                yield header[column].strip()
+            for row in reader:
+                if len(row) > column and row[column].strip():
+                    yield row[column].strip()
+        elif extension in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                name = record.get("company_name") if isinstance(record, dict) else record
+                if name:
+                    yield str(name).strip()
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def read_checkpoint(output_path):
+    """Return the company names that already succeeded in an earlier run."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record["company_name"])
+    return done
+
+
+class AsyncRateLimiter:
+    """Token bucket allowing `rate` starts per second with bursts of `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class StageTimer:
+    """Crew task callback that records how long each task took."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.timings = {}
+
+    def task_callback(self, output):
+        now = time.perf_counter()
+        name = getattr(output, "name", None) or f"task_{len(self.timings) + 1}"
+        self.timings[name] = now - self._last
+        self._last = now
+
+
+async def crew_resolver(company_name):
+    """Resolve one company, with a fresh crew if the website alone is not conclusive.
+
+    Returns (description, stage timings).
+    """
+    from .tools.website_resolver import describe_company
+
+    start = time.perf_counter()
+    direct = await asyncio.to_thread(describe_company, company_name)
+    timings = {"direct_resolve": time.perf_counter() - start}
+    if direct is not None:
+        return direct.description, timings
+
+    from .crew import CompanyDescriptionRetrievalAutomationCrew
+
+    crew = await asyncio.to_thread(lambda: CompanyDescriptionRetrievalAutomationCrew().crew())
+    if _crew_guard is not None:
+        crew = _crew_guard(crew)
+    timer = StageTimer()
+    crew.task_callback = timer.task_callback
+    result = await crew.kickoff_async(inputs={"company_name": company_name})
+    return str(result), {**timings, **timer.timings}
+
+
+def summarize_timings(records):
+    """Aggregate per-stage timings into count, mean, p50 and p95 seconds."""
+    stages = {}
+    for record in records:
+        for stage, seconds in record.get("timings", {}).items():
+            stages.setdefault(stage, []).append(seconds)
+    summary = {}
+    for stage, values in stages.items():
+        values.sort()
+        summary[stage] = {
+            "count": len(values),
+            "mean_s": round(sum(values) / len(values), 3),
+            "p50_s": round(values[len(values) // 2], 3),
+            "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        }
+    return summary
+
+
+async def iter_batch(names, resolve=crew_resolver, concurrency=4, rate=None, skip=()):
+    """Resolve names concurrently and yield result records as they complete.
+
+    resolve is ``async def resolve(company_name) -> (description, timings)``.
+    At most `concurrency` companies run at once and, if `rate` is set, at most
+    `rate` new companies start per second.
+    """
+    # The burst is one second's worth of starts, so a high concurrency cannot exceed the rate
+    limiter = AsyncRateLimiter(rate, burst=max(1, int(rate))) if rate else None
+    seen = set(skip)
+
+    def unique_names():
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+    pending = unique_names()
+    results = asyncio.Queue()
+
+    async def run_one(name):
+        if limiter is not None:
+            await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            description, timings = await resolve(name)
+            record = {"company_name": name, "status": "ok", "description": description}
+        except Exception as e:
+            timings = {}
+            record = {"company_name": name, "status": "error", "error": str(e)}
+        timings = dict(timings)
+        timings["total"] = time.perf_counter() - start
+        record["timings"] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        return record
+
+    async def worker():
+        for name in pending:
+            await results.put(await run_one(name))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    done = asyncio.ensure_future(asyncio.gather(*workers))
+    try:
+        while not done.done():
+            getter = asyncio.ensure_future(results.get())
+            await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        while not results.empty():
+            yield results.get_nowait()
+        done.result()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def run_batch(input_path, output_path, resolve=crew_resolver, concurrency=4, rate=None, resume=True):
+    """Enrich every company in input_path, appending results to output_path.
+
+    Returns a report with counts, throughput and per-stage timings.
+    """
+    skip = read_checkpoint(output_path) if resume else set()
+    records = []
+    start = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        async for record in iter_batch(read_company_names(input_path), resolve, concurrency, rate, skip):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            records.append(record)
+            print(f"[{len(records)}] {record['company_name']}: {record['status']} "
+                  f"({record['timings']['total']:.1f}s)")
+    return batch_report(records, time.perf_counter() - start, skipped=len(skip))
+
+
+def batch_report(records, elapsed, skipped=0):
+    """Summarize a batch run: counts, throughput and per-stage timings."""
+    return {
+        "processed": len(records),
+        "succeeded": sum(1 for r in records if r["status"] == "ok"),
+        "failed": sum(1 for r in records if r["status"] != "ok"),
+        "skipped": skipped,
+        "elapsed_s": round(elapsed, 3),
+        "companies_per_s": round(len(records) / elapsed, 3) if elapsed else 0.0,
+        "stages": summarize_timings(records),
+    }
@@ -1,7 +1,21 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import WebsiteSearchTool
-from crewai_tools import ScrapeElementFromWebsiteTool
+from .tools.cached_tools import scrape_element_tool, website_search_tool
+from .tools.custom_tool import CandidatePagesDescriptionTool, CompanyWebsiteTool
+from .tools.fan_out import execution_mode
+
+# In parallel mode the website finder hands over several candidate pages,
+# which the scraper reads concurrently (see tools/fan_out.py)
+PARALLEL_CANDIDATES_OUTPUT = (
+    "The official website URL for {company_name}, followed by up to three other pages of that "
+    "website likely to describe the company (such as its About page), one URL per line."
+)
+
+
+def scraper_tools():
+    if execution_mode() == "parallel":
+        return [CandidatePagesDescriptionTool(), scrape_element_tool()]
+    return [scrape_element_tool()]
 
 @CrewBase
 class CompanyDescriptionRetrievalAutomationCrew():
@@ -11,14 +25,14 @@ class CompanyDescriptionRetrievalAutomationCrew():
     def website_finder(self) -> Agent:
         return Agent(
             config=self.agents_config['website_finder'],
-            tools=[WebsiteSearchTool()],
+            tools=[CompanyWebsiteTool(), website_search_tool()],
         )
 
     @agent
     def description_scraper(self) -> Agent:
         return Agent(
             config=self.agents_config['description_scraper'],
-            tools=[ScrapeElementFromWebsiteTool()],
+            tools=scraper_tools(),
         )
 
 
@@ -26,14 +40,15 @@ class CompanyDescriptionRetrievalAutomationCrew():
     def find_company_website(self) -> Task:
         return Task(
             config=self.tasks_config['find_company_website'],
-            tools=[WebsiteSearchTool()],
+            expected_output=PARALLEL_CANDIDATES_OUTPUT if execution_mode() == "parallel" else None,
+            tools=[CompanyWebsiteTool(), website_search_tool()],
         )
 
     @task
     def extract_company_description(self) -> Task:
         return Task(
             config=self.tasks_config['extract_company_description'],
-            tools=[ScrapeElementFromWebsiteTool()],
+            tools=scraper_tools(),
         )
 
 
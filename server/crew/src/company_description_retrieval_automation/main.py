@@ -7,6 +7,8 @@ from .crew import CompanyDescriptionRetrievalAutomationCrew
 # Replace with inputs you want to test with, it will automatically
 # interpolate any tasks and agents information
 
+import asyncio
+import json
 import os   
 from dotenv import load_dotenv
 
@@ -27,6 +29,53 @@ def run(company_name=None):
     }
     return CompanyDescriptionRetrievalAutomationCrew().crew().kickoff(inputs=inputs)
 
+def batch(input_path=None, output_path=None, concurrency=4, rate=None):
+    """
+    Run the crew for every company in a CSV/JSONL/text file.
+
+    Results are appended to output_path as JSONL; re-running with the same
+    output file resumes after the companies that already succeeded.
+
+    Args:
+        input_path (str): File with company names
+        output_path (str): JSONL file to write results to
+        concurrency (int): Number of crews to run at once
+        rate (float): Maximum number of crews to start per second
+    """
+    if not all([input_path, output_path]):
+        raise ValueError("input_path and output_path must be provided")
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if rate is not None and rate <= 0:
+        raise ValueError("rate must be positive")
+
+    from .batch import run_batch
+
+    install_server_guards()
+    report = asyncio.run(run_batch(input_path, output_path, concurrency=concurrency, rate=rate))
+    print(json.dumps(report, indent=2))
+    return report
+
+def install_server_guards():
+    """
+    Route page fetches and LLM calls through the API server's resilience layer.
+
+    Only possible when the server's modules are importable (running from the
+    server directory); returns whether the guards were installed.
+    """
+    try:
+        import resilience
+    except ImportError:
+        return False
+    if not resilience.enabled():
+        return False
+    from .batch import set_crew_guard
+    from .tools.page_cache import set_fetch_guard
+
+    set_fetch_guard(resilience.web_guard)
+    set_crew_guard(resilience.guard_crew)
+    return True
+
 def train(n_iterations=None, filename=None, company_name=None):
     """
     Train the crew for a given number of iterations.
@@ -80,6 +129,16 @@ if __name__ == "__main__":
             print("Usage: main.py run <company_name>")
             sys.exit(1)
         run(company_name=sys.argv[2])
+    elif command == "batch":
+        if len(sys.argv) not in (4, 5, 6):
+            print("Usage: main.py batch <input_file> <output_jsonl> [<concurrency>] [<rate_per_second>]")
+            sys.exit(1)
+        batch(
+            input_path=sys.argv[2],
+            output_path=sys.argv[3],
+            concurrency=int(sys.argv[4]) if len(sys.argv) > 4 else 4,
+            rate=float(sys.argv[5]) if len(sys.argv) > 5 else None,
+        )
     elif command == "train":
         if len(sys.argv) != 5:
             print("Usage: main.py train <n_iterations> <filename> <company_name>")
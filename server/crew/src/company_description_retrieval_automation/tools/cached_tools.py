@@ -0,0 +1,309 @@
+"""
+Caching versions of the crew's web tools.
+
+CachedScrapeElementFromWebsiteTool fetches pages through the shared
+PageCache (see page_cache.py) instead of a new request per call.
+
+CachedWebsiteSearchTool keeps one embedding collection per website, shared
+by every crew in the process and persisted by the RAG client. A website is
+fetched through the PageCache, chunked and embedded once, and re-embedded
+only when the page changes: the index is keyed on the content hash the
+PageCache stores with the page, so a search on an unchanged page neither
+parses nor hashes it again. (Re)indexing a website holds a per-website lock,
+shared with the other worker processes through a lock file, so concurrent
+crews never add its chunks twice. Search results are cached by website,
+content hash and query, so repeating a lookup skips both the page fetch and
+the query embedding; expired results are dropped and at most
+CREW_SEARCH_CACHE_MAX_ENTRIES are kept. Beyond CREW_RAG_MAX_COLLECTIONS
+websites, the least recently used collections are deleted.
+
+The stock tool indexes every website into one shared collection, so results
+for one company could include another company's pages; per-website
+collections also fix that.
+
+Configuration (environment variables):
+    CREW_TOOL_CACHE_ENABLED        "1" (default) or "0" for the stock tools
+    CREW_RAG_MAX_COLLECTIONS       website collections kept (default 200)
+    CREW_SEARCH_CACHE_TTL          seconds a search result is reused (default 86400)
+    CREW_SEARCH_CACHE_MAX_ENTRIES  search results kept (default 10000)
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from bs4 import BeautifulSoup
+from crewai_tools import ScrapeElementFromWebsiteTool, WebsiteSearchTool
+from crewai_tools.rag.data_types import DataType
+from pydantic import PrivateAttr
+
+from .page_cache import cache_path, get_page_cache
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; indexing is then only thread-safe
+    fcntl = None
+
+
+def page_text(content):
+    """Visible text of an HTML page, whitespace-normalized like crewai's WebPageLoader."""
+    soup = BeautifulSoup(content, "html.parser")
+    for element in soup(["script", "style"]):
+        element.decompose()
+    text = soup.get_text(" ")
+    text = re.sub("[ \t]+", " ", text)
+    text = re.sub("\\s+\n\\s+", "\n", text)
+    return text.strip()
+
+
+def collection_name(website):
+    """Embedding collection for one website (Chroma allows 3-63 [A-Za-z0-9_-] characters)."""
+    key = website.strip().rstrip("/").lower()
+    return "site_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+class SiteIndex:
+    """Records which websites are embedded (and from which content) plus cached search results."""
+
+    def __init__(self, path, max_searches=10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_searches = max_searches
+        self._lock_dir = f"{path}.locks"
+        self._collection_locks = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sites ("
+            " collection TEXT PRIMARY KEY,"
+            " website TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            " key TEXT PRIMARY KEY,"
+            " collection TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS searches_expires_at ON searches (expires_at)")
+        self._db.commit()
+
+    @contextmanager
+    def indexing(self, collection):
+        """Hold a collection's indexing lock, across threads and worker processes."""
+        with self._lock:
+            lock = self._collection_locks.setdefault(collection, threading.Lock())
+        with lock:
+            os.makedirs(self._lock_dir, exist_ok=True)
+            with open(os.path.join(self._lock_dir, f"{collection}.lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def content_hash(self, collection):
+        with self._lock:
+            row = self._db.execute("SELECT content_hash FROM sites WHERE collection = ?", (collection,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE sites SET last_access = ? WHERE collection = ?", (time.time(), collection))
+                self._db.commit()
+        return row[0] if row else None
+
+    def record(self, collection, website, content_hash):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sites (collection, website, content_hash, last_access) VALUES (?, ?, ?, ?)",
+                (collection, website, content_hash, time.time()),
+            )
+            self._db.execute("DELETE FROM searches WHERE collection = ?", (collection,))
+            self._db.commit()
+
+    def least_recent(self, keep):
+        """Collections beyond the `keep` most recently used ones."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT collection FROM sites ORDER BY last_access DESC LIMIT -1 OFFSET ?", (keep,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, collection):
+        with self._lock:
+            self._db.execute("DELETE FROM sites WHERE collection = ?", (collection,))
+            self._db.execute("DELETE FROM searches WHERE collection = ?", (collection,))
+            self._db.commit()
+            self._collection_locks.pop(collection, None)
+
+    def search(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM searches WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def store_search(self, key, collection, result, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO searches (key, collection, result, expires_at) VALUES (?, ?, ?, ?)",
+                (key, collection, result, now + ttl),
+            )
+            self._db.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+            # Every result lives for the same TTL, so the earliest expiry is the oldest
+            self._db.execute(
+                "DELETE FROM searches WHERE key IN ("
+                " SELECT key FROM searches ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_searches,),
+            )
+            self._db.commit()
+
+
+_site_index = None
+_adapters = {}
+_index_lock = threading.Lock()
+
+
+def get_site_index():
+    """Return the process-wide SiteIndex, stored next to the page cache."""
+    global _site_index
+    with _index_lock:
+        if _site_index is None:
+            _site_index = SiteIndex(
+                cache_path("CREW_PAGE_CACHE_PATH", "crew_pages.sqlite3"),
+                max_searches=int(os.environ.get("CREW_SEARCH_CACHE_MAX_ENTRIES", "10000")),
+            )
+        return _site_index
+
+
+class CachedScrapeElementFromWebsiteTool(ScrapeElementFromWebsiteTool):
+    """ScrapeElementFromWebsiteTool reading pages through the shared PageCache."""
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        css_element = kwargs.get("css_element", self.css_element)
+        page = get_page_cache().fetch(website_url, headers=self.headers, cookies=self.cookies)
+        parsed = BeautifulSoup(page.content, "html.parser")
+        return "\n".join(element.get_text() for element in parsed.select(css_element))
+
+
+class CachedWebsiteSearchTool(WebsiteSearchTool):
+    """WebsiteSearchTool with per-website embedding collections reused across crews."""
+
+    _website: Optional[str] = PrivateAttr(default=None)
+    _rag_client: Any = PrivateAttr(default=None)
+
+    def add(self, website: str) -> None:
+        self._website = website
+        self._ensure_indexed(website)
+
+    def _run(
+        self,
+        search_query: str,
+        website: Optional[str] = None,
+        similarity_threshold: float | None = None,
+        limit: int | None = None,
+    ) -> str:
+        website = website or self._website
+        if website is None:
+            return super()._run(search_query, similarity_threshold=similarity_threshold, limit=limit)
+        collection, content_hash = self._ensure_indexed(website)
+        threshold = similarity_threshold if similarity_threshold is not None else self.similarity_threshold
+        result_limit = limit if limit is not None else self.limit
+        key = hashlib.sha256(f"{collection}|{content_hash}|{threshold}|{result_limit}|{search_query}".encode()).hexdigest()
+        index = get_site_index()
+        result = index.search(key)
+        if result is None:
+            result = self._adapter(collection).query(
+                search_query, similarity_threshold=threshold, limit=result_limit
+            )
+            index.store_search(key, collection, result, float(os.environ.get("CREW_SEARCH_CACHE_TTL", "86400")))
+        return f"Relevant Content:\n{result}"
+
+    def _create_adapter(self, collection):
+        from crewai_tools.adapters.crewai_rag_adapter import CrewAIRagAdapter
+
+        return CrewAIRagAdapter(
+            collection_name=collection,
+            summarize=self.summarize,
+            similarity_threshold=self.similarity_threshold,
+            limit=self.limit,
+            config=self._parse_config(self.config),
+        )
+
+    def _client(self):
+        """The RAG client the collections live in, from crewai's public factory like the adapters'."""
+        if self._rag_client is None:
+            from crewai.rag.config.utils import get_rag_client
+            from crewai.rag.factory import create_client
+
+            config = self._parse_config(self.config)
+            self._rag_client = create_client(config) if config is not None else get_rag_client()
+        return self._rag_client
+
+    def _adapter(self, collection):
+        with _index_lock:
+            adapter = _adapters.get(collection)
+            if adapter is None:
+                adapter = _adapters[collection] = self._create_adapter(collection)
+            return adapter
+
+    def _ensure_indexed(self, website):
+        """Embed the website unless its current page is already indexed; returns (collection, content hash)."""
+        collection = collection_name(website)
+        page = get_page_cache().fetch(website)
+        content_hash = page.content_hash
+        index = get_site_index()
+        if index.content_hash(collection) == content_hash:
+            return collection, content_hash
+        with index.indexing(collection):
+            # Another crew may have indexed the page while this one waited for the lock
+            indexed_hash = index.content_hash(collection)
+            if indexed_hash == content_hash:
+                return collection, content_hash
+            adapter = self._adapter(collection)
+            if indexed_hash is not None:
+                # The page changed: rebuild its collection rather than mixing old and new chunks
+                self._client().delete_collection(collection_name=collection)
+                self._client().get_or_create_collection(collection_name=collection)
+            adapter.add(page_text(page.content), data_type=DataType.TEXT,
+                        metadata={"url": page.url, "website": website})
+            index.record(collection, website, content_hash)
+        self._evict(index, collection)
+        return collection, content_hash
+
+    def _evict(self, index, current):
+        keep = int(os.environ.get("CREW_RAG_MAX_COLLECTIONS", "200"))
+        for collection in index.least_recent(keep):
+            if collection == current:
+                continue
+            try:
+                self._client().delete_collection(collection_name=collection)
+            except Exception as e:
+                print(f"Could not delete collection {collection}: {e}")
+            with _index_lock:
+                _adapters.pop(collection, None)
+            index.forget(collection)
+
+
+def tool_cache_enabled():
+    return os.environ.get("CREW_TOOL_CACHE_ENABLED", "1") == "1"
+
+
+def website_search_tool():
+    """The crew's website search tool, cached unless CREW_TOOL_CACHE_ENABLED=0."""
+    return CachedWebsiteSearchTool() if tool_cache_enabled() else WebsiteSearchTool()
+
+
+def scrape_element_tool():
+    """The crew's element scraping tool, cached unless CREW_TOOL_CACHE_ENABLED=0."""
+    return CachedScrapeElementFromWebsiteTool() if tool_cache_enabled() else ScrapeElementFromWebsiteTool()
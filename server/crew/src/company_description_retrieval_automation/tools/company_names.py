@@ -0,0 +1,27 @@
+"""
+Company name normalization shared by the website resolver and the API
+server's caches (description_cache.py re-exports it), so a company maps to
+the same key in the domain index, the description cache and the fast path.
+
+Kept free of third-party imports so the server can import it cheaply.
+"""
+import re
+
+# Legal-form suffixes that do not change which company is meant
+COMPANY_SUFFIXES = {
+    "inc", "incorporated", "ltd", "limited", "llc", "corp", "corporation",
+    "co", "company", "gmbh", "ag", "bv", "sa", "plc", "oy", "ab",
+}
+
+
+def name_tokens(company_name):
+    """Lower-case words of a company name without trailing legal-form suffixes."""
+    words = re.sub(r"[^\w\s]", " ", company_name.lower()).split()
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return words
+
+
+def normalize_company_name(name):
+    """Return the key for a company name, e.g. 'Canva, Inc.' -> 'canva'."""
+    return " ".join(name_tokens(name))
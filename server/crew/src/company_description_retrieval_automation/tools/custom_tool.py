@@ -1,19 +1,47 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import List, Type
 from pydantic import BaseModel, Field
 
+from .website_resolver import describe_pages, lookup_company
 
-class MyCustomToolInput(BaseModel):
-    """Input schema for MyCustomTool."""
-    argument: str = Field(..., description="Description of the argument.")
 
-class MyCustomTool(BaseTool):
-    name: str = "Name of my tool"
+class CompanyWebsiteToolInput(BaseModel):
+    """Input schema for CompanyWebsiteTool."""
+    company_name: str = Field(..., description="Name of the company to look up, e.g. 'Canva'.")
+
+class CompanyWebsiteTool(BaseTool):
+    name: str = "Find company website and description"
+    description: str = (
+        "Finds a company's official website from its name and reads the description the site "
+        "publishes about itself (structured data, meta description or About page). Returns the "
+        "URL, the description and a confidence score; verify low-confidence results with other tools."
+    )
+    args_schema: Type[BaseModel] = CompanyWebsiteToolInput
+
+    def _run(self, company_name: str) -> str:
+        result = lookup_company(company_name)
+        if result.url is None:
+            return f"No website found for {company_name}."
+        if result.description is None:
+            return f"Website: {result.url}\nNo description found on the website."
+        return str(result)
+
+class CandidatePagesToolInput(BaseModel):
+    """Input schema for CandidatePagesDescriptionTool."""
+    company_name: str = Field(..., description="Name of the company, e.g. 'Canva'.")
+    urls: List[str] = Field(..., description="Candidate pages to read, best guess first, e.g. the homepage and its About page.")
+
+class CandidatePagesDescriptionTool(BaseTool):
+    name: str = "Read company description from candidate pages"
     description: str = (
-        "Clear description for what this tool is useful for, your agent will need this information to use it."
+        "Reads several candidate pages of a company's website at once and returns the first "
+        "confident company description found (structured data, meta description or About page), "
+        "with its URL and confidence."
     )
-    args_schema: Type[BaseModel] = MyCustomToolInput
+    args_schema: Type[BaseModel] = CandidatePagesToolInput
 
-    def _run(self, argument: str) -> str:
-        # Implementation goes here
-        return "this is an example of a tool output, ignore it and move along."
+    def _run(self, company_name: str, urls: List[str]) -> str:
+        result = describe_pages(company_name, urls)
+        if result is None:
+            return f"No description found on {', '.join(urls)}."
+        return str(result)
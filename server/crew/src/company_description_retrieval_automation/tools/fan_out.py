@@ -0,0 +1,83 @@
+"""
+Parallel fan-out for the crew's website work.
+
+In the default sequential mode the crew probes candidate homepages and
+scrapes pages one at a time, exactly as the task definitions describe. In
+parallel mode, independent lookups (candidate domains, candidate pages for
+a description) run concurrently: fan_out() submits up to `width` of them at
+once, returns the first result that is good enough and cancels the rest.
+With ordered=True the items are in priority order and the winner is the
+first acceptable result in that order: a result is only returned once every
+item before it has failed, so a fast low-priority answer cannot beat a slower
+high-priority one. Requests that are already in flight finish in the
+background and their results are dropped.
+
+Configuration (environment variables):
+    CREW_EXECUTION_MODE  "sequential" (default) or "parallel"
+    CREW_FANOUT_WIDTH    concurrent lookups per fan-out in parallel mode (default 4)
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def execution_mode():
+    mode = os.environ.get("CREW_EXECUTION_MODE", "sequential")
+    if mode not in ("sequential", "parallel"):
+        raise ValueError(f"CREW_EXECUTION_MODE must be 'sequential' or 'parallel', not {mode!r}")
+    return mode
+
+
+def fanout_width():
+    return int(os.environ.get("CREW_FANOUT_WIDTH", "4"))
+
+
+def fan_out(fn, items, accept, width=None, ordered=False):
+    """Run fn over items, `width` at a time, until a result passes accept().
+
+    Returns (winner, results): the first accepted result (None if there is
+    none) and every result gathered so far, in completion order. Calls that
+    raise count as None results. With ordered, the winner is the accepted
+    result of the earliest item, waiting for earlier items to finish first.
+    """
+    width = width or fanout_width()
+    items = list(items)
+    results = []
+    if width <= 1:
+        for item in items:
+            try:
+                result = fn(item)
+            except Exception:
+                result = None
+            results.append(result)
+            if result is not None and accept(result):
+                return result, results
+        return None, results
+
+    executor = ThreadPoolExecutor(max_workers=width, thread_name_prefix="crew-fanout")
+    try:
+        futures = [executor.submit(fn, item) for item in items]
+        position = {future: i for i, future in enumerate(futures)}
+        accepted = {}
+        pending = set(futures)
+        next_index = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                results.append(result)
+                ok = result is not None and accept(result)
+                if ok and not ordered:
+                    return result, results
+                accepted[position[future]] = result if ok else None
+            # Earliest items first: stop at the first one still running
+            while next_index in accepted:
+                if accepted[next_index] is not None:
+                    return accepted[next_index], results
+                next_index += 1
+        return None, results
+    finally:
+        # Queued calls are cancelled; running ones finish without being awaited
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,239 @@
+"""
+On-disk HTTP page cache shared by the crew's web tools.
+
+Pages are stored in SQLite by URL with their ETag and Last-Modified headers.
+A fresh entry (younger than the TTL) is served without touching the network;
+a stale one is revalidated with a conditional GET, and a 304 only extends its
+lifetime. Total content size is capped: least recently used pages are evicted
+beyond the byte limit. Requests go through one pooled requests.Session, so
+repeated fetches from the same domain reuse connections.
+
+An application can route every network fetch through a guard (rate limits,
+circuit breakers) with set_fetch_guard(); the API server and the batch CLI
+install one from the server's resilience layer.
+
+Cache files live with the server's caches: the defaults, and relative
+paths given in the environment, resolve against the server directory that
+contains this crew, not the working directory.
+
+Configuration (environment variables):
+    CREW_PAGE_CACHE_PATH       SQLite file (default <server dir>/.cache/crew_pages.sqlite3)
+    CREW_PAGE_CACHE_TTL        seconds before a page is revalidated (default 86400)
+    CREW_PAGE_CACHE_MAX_BYTES  total cached content size (default 256 MB)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# server/crew/src/<package>/tools -> server
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), *[os.pardir] * 4))
+
+
+def cache_path(env_name, filename):
+    """The path set in env_name, or <server dir>/.cache/filename, resolved against the server directory."""
+    return os.path.join(SERVER_DIR, os.environ.get(env_name) or os.path.join(".cache", filename))
+
+
+_fetch_guard = None
+
+
+def set_fetch_guard(guard):
+    """Send network fetches through guard(url, get, *args, **kwargs) instead of get(*args, **kwargs).
+
+    Pass None to fetch directly again.
+    """
+    global _fetch_guard
+    _fetch_guard = guard
+
+
+class CachedPage:
+    """A fetched page: final URL, status, body bytes, content type and SHA-256 of the body."""
+
+    __slots__ = ("url", "status_code", "content", "content_type", "source", "content_hash")
+
+    def __init__(self, url, status_code, content, content_type, source, content_hash=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+        # "cache", "revalidated" or "network"
+        self.source = source
+        self.content_hash = content_hash or hashlib.sha256(content).hexdigest()
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+
+def create_session(pool_size=16):
+    """A requests.Session with a connection pool sized for concurrent crews."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class PageCache:
+    """SQLite-backed URL -> page cache with ETag/Last-Modified revalidation."""
+
+    def __init__(self, path, ttl=86400.0, max_bytes=256 * 1024 * 1024, session=None, timeout=15.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.session = session or create_session()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " final_url TEXT NOT NULL,"
+            " status_code INTEGER NOT NULL,"
+            " content BLOB NOT NULL,"
+            " content_type TEXT,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " content_hash TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "content_hash" not in columns:
+            # Caches created before content hashes; their pages are hashed when read
+            self._db.execute("ALTER TABLE pages ADD COLUMN content_hash TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._db.commit()
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+        self.evicted = 0
+
+    def fetch(self, url, headers=None, cookies=None, timeout=None):
+        """Return a CachedPage for url, from the cache when fresh or still valid.
+
+        Requests with cookies are personalised and bypass the cache.
+        """
+        if cookies:
+            response = self._get(url, headers=headers, cookies=cookies, timeout=timeout or self.timeout)
+            return self._page(url, response, "network")
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT final_url, status_code, content, content_type, etag, last_modified, expires_at,"
+                " content_hash FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is not None and row[6] > now:
+            self._touch(url, now, None)
+            self.hits += 1
+            return CachedPage(row[0], row[1], row[2], row[3], "cache", row[7])
+
+        request_headers = dict(headers or {})
+        if row is not None:
+            if row[4]:
+                request_headers["If-None-Match"] = row[4]
+            if row[5]:
+                request_headers["If-Modified-Since"] = row[5]
+        response = self._get(url, headers=request_headers, timeout=timeout or self.timeout)
+        if row is not None and response.status_code == 304:
+            self._touch(url, now, now + self.ttl)
+            self.revalidated += 1
+            return CachedPage(row[0], row[1], row[2], row[3], "revalidated", row[7])
+        self.fetched += 1
+        page = self._page(url, response, "network")
+        if response.ok and "no-store" not in response.headers.get("Cache-Control", ""):
+            self._store(url, page, response.headers, now)
+        return page
+
+    def _get(self, url, **kwargs):
+        guard = _fetch_guard
+        if guard is None:
+            return self.session.get(url, **kwargs)
+        return guard(url, self.session.get, url, **kwargs)
+
+    def _page(self, url, response, source):
+        return CachedPage(response.url or url, response.status_code, response.content,
+                          response.headers.get("Content-Type", ""), source)
+
+    def _touch(self, url, now, expires_at):
+        with self._lock:
+            if expires_at is None:
+                self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, url))
+            else:
+                self._db.execute(
+                    "UPDATE pages SET last_access = ?, expires_at = ? WHERE url = ?", (now, expires_at, url)
+                )
+            self._db.commit()
+
+    def _store(self, url, page, headers, now):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, final_url, status_code, content, content_type,"
+                " etag, last_modified, expires_at, last_access, size, content_hash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, page.url, page.status_code, page.content, page.content_type,
+                 headers.get("ETag"), headers.get("Last-Modified"), now + self.ttl, now, len(page.content),
+                 page.content_hash),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            pages, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {
+            "pages": pages,
+            "bytes": size,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "fetched": self.fetched,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        self._db.close()
+        self.session.close()
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Return the process-wide PageCache configured by the environment."""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(
+                cache_path("CREW_PAGE_CACHE_PATH", "crew_pages.sqlite3"),
+                ttl=float(os.environ.get("CREW_PAGE_CACHE_TTL", "86400")),
+                max_bytes=int(os.environ.get("CREW_PAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            )
+        return _page_cache
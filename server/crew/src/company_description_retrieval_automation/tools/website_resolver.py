@@ -0,0 +1,367 @@
+"""
+Deterministic company website resolution and description extraction.
+
+Most companies can be resolved without an LLM: the official site is usually
+the company name as a domain, and the site describes itself in its JSON-LD
+Organization data, OpenGraph or meta description, or on an About page.
+
+resolve_website() checks a local domain index (a JSON file of company name
+-> URL, extended with every confident resolution) and then probes domains
+derived from the name, e.g. "Acme Robotics" -> acmerobotics.com,
+acme-robotics.com, acme.com, acmerobotics.io. A homepage counts when its
+title or site name names the company as whole words ("Acme Robotics",
+"AcmeRobotics", not "Acmes"); names shorter than three characters are never
+matched this way and are left to the crew. At most six domains are probed,
+and probing stops once the total probe budget (5s by default) is spent,
+so a company without a findable homepage delays the crew only briefly.
+
+extract_description() scores the description candidates of a page; the
+highest scoring candidate and its confidence are returned. Pages are
+fetched through the shared PageCache (pooled connections, on-disk cache)
+and parsed with lxml when it is installed.
+
+describe_company() combines both and returns None when the confidence stays
+below the threshold, so callers can fall back to the LLM crew.
+
+In parallel mode (CREW_EXECUTION_MODE=parallel, see fan_out.py) candidate
+domains are probed concurrently (the most likely matching domain still wins,
+as in sequential mode) and describe_pages() scrapes several
+candidate pages at once, keeping the first confident description.
+
+Configuration (environment variables):
+    COMPANY_DIRECT_RESOLVE_ENABLED    "1" (default) or "0" to always run the crew
+    COMPANY_DIRECT_RESOLVE_THRESHOLD  minimum confidence to skip the crew (default 0.7)
+    COMPANY_DOMAIN_INDEX_PATH         JSON domain index (default <server dir>/.cache/company_domains.json)
+    COMPANY_PROBE_BUDGET              seconds for probing all candidate domains (default 5)
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from .fan_out import execution_mode, fan_out
+from .company_names import name_tokens, normalize_company_name
+from .page_cache import cache_path, get_page_cache
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; puts are then only thread-safe
+    fcntl = None
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+PROBE_TLDS = (".com", ".io", ".ai", ".co")
+PROBE_TIMEOUT = 3.0
+# Candidate domains probed per company, e.g. the name's stems on .com and .io
+PROBE_MAX_CANDIDATES = 6
+MIN_NAME_LENGTH = 3
+# Base confidence of each description source
+SOURCE_CONFIDENCE = {"json_ld": 0.85, "og_description": 0.8, "meta_description": 0.75, "about_page": 0.65}
+BOILERPLATE = re.compile(r"cookie|javascript|sign in|log in|subscribe|all rights reserved|404|not found", re.I)
+
+
+def candidate_urls(company_name):
+    """Homepage URLs worth probing for a company, most likely first."""
+    words = name_tokens(company_name)
+    if not words:
+        return []
+    stems = ["".join(words)]
+    if len(words) > 1:
+        stems += ["-".join(words), words[0]]
+    urls = []
+    for tld in PROBE_TLDS:
+        for stem in stems:
+            url = f"https://{stem}{tld}/"
+            if url not in urls:
+                urls.append(url)
+    return urls[:PROBE_MAX_CANDIDATES]
+
+
+class DomainIndex:
+    """JSON file of normalized company name -> homepage URL, shared by every worker.
+
+    The file is re-read whenever another process has replaced it, and put()
+    merges into the current file under a file lock, so concurrent workers
+    do not drop each other's entries.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+
+    def _load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._entries
+        # os.replace() gives every write a new inode, even within one mtime tick
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version != self._version:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except ValueError:
+                self._entries = {}
+            self._version = version
+        return self._entries
+
+    @contextmanager
+    def _exclusive(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, company_name):
+        with self._lock:
+            return self._load().get(normalize_company_name(company_name))
+
+    def put(self, company_name, url):
+        key = normalize_company_name(company_name)
+        with self._lock:
+            if self._load().get(key) == url:
+                return
+            with self._exclusive():
+                entries = dict(self._load())
+                entries[key] = url
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(entries, f, indent=1, sort_keys=True)
+                    os.replace(tmp, self.path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+                self._entries = entries
+                stat = os.stat(self.path)
+                self._version = (stat.st_ino, stat.st_mtime_ns)
+
+
+def parse(content):
+    return BeautifulSoup(content, HTML_PARSER)
+
+
+def mentions_company(text, company_name):
+    """True if text names the company on word boundaries, its words joined by nothing or punctuation."""
+    words = name_tokens(company_name)
+    if len("".join(words)) < MIN_NAME_LENGTH:
+        return False
+    pattern = r"\b" + r"[\W_]*".join(re.escape(word) for word in words) + r"\b"
+    return re.search(pattern, (text or "").lower()) is not None
+
+
+def fetch(url, timeout=None):
+    """Fetch a page through the PageCache; None on network errors or non-HTML responses."""
+    try:
+        page = get_page_cache().fetch(url, timeout=timeout)
+    except Exception:
+        return None
+    if page.status_code != 200 or "html" not in (page.content_type or "html"):
+        return None
+    return page
+
+
+def homepage_matches(soup, company_name):
+    title = soup.title.get_text() if soup.title else ""
+    site_name = soup.find("meta", property="og:site_name")
+    return mentions_company(title, company_name) or (
+        site_name is not None and mentions_company(site_name.get("content"), company_name)
+    )
+
+
+def resolve_website(company_name, index=None):
+    """Return (homepage url, parsed homepage) for a company, or (None, None)."""
+    known = index.get(company_name) if index is not None else None
+    if known:
+        page = fetch(known)
+        if page is not None:
+            return page.url, parse(page.content)
+
+    deadline = time.monotonic() + float(os.environ.get("COMPANY_PROBE_BUDGET", "5"))
+
+    def probe(url):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        page = fetch(url, timeout=min(PROBE_TIMEOUT, remaining))
+        if page is None:
+            return None
+        soup = parse(page.content)
+        return (page.url, soup) if homepage_matches(soup, company_name) else None
+
+    width = None if execution_mode() == "parallel" else 1
+    # Candidates are in priority order (.com before .io, ...): keep the first that matches
+    match, _ = fan_out(probe, candidate_urls(company_name), accept=lambda found: True,
+                       width=width, ordered=True)
+    return match or (None, None)
+
+
+def _json_ld_descriptions(soup):
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if isinstance(item, dict) and item.get("description") and str(item.get("@type", "")).endswith(
+                ("Organization", "Corporation", "LocalBusiness", "WebSite")
+            ):
+                yield item["description"]
+
+
+def _meta(soup, **attrs):
+    tag = soup.find("meta", attrs=attrs)
+    return tag.get("content") if tag is not None else None
+
+
+def about_url(soup, base_url):
+    """Link to the site's About page, if the homepage has one on the same host."""
+    host = urlparse(base_url).netloc
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        label = f"{href} {link.get_text(' ')}".lower()
+        if re.search(r"\babout(\s+us|-us)?\b|/company/?$|/who-we-are", label):
+            url = urljoin(base_url, href)
+            if urlparse(url).netloc == host:
+                return url
+    return None
+
+
+def about_text(soup):
+    """First substantial paragraphs of an About page."""
+    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+    paragraphs = [p for p in paragraphs if len(p) >= 60 and not BOILERPLATE.search(p)]
+    return " ".join(paragraphs[:2]) or None
+
+
+def score(description, source, company_name):
+    """Confidence that a candidate is a usable company description."""
+    text = " ".join((description or "").split())
+    if len(text) < 40 or BOILERPLATE.search(text):
+        return 0.0
+    confidence = SOURCE_CONFIDENCE[source]
+    if mentions_company(text, company_name):
+        confidence += 0.1
+    if len(text) < 80:
+        confidence -= 0.15
+    return round(min(confidence, 1.0), 3)
+
+
+def extract_description(soup, url, company_name):
+    """Return (description, confidence, source) for the best candidate on a homepage."""
+    candidates = [(d, "json_ld") for d in _json_ld_descriptions(soup)]
+    candidates.append((_meta(soup, property="og:description"), "og_description"))
+    candidates.append((_meta(soup, name="description"), "meta_description"))
+    scored = [(score(d, source, company_name), " ".join(d.split()), source) for d, source in candidates if d]
+    best = max(scored, key=lambda candidate: candidate[0], default=(0.0, None, None))
+    if best[0] < SOURCE_CONFIDENCE["meta_description"]:
+        link = about_url(soup, url)
+        page = fetch(link) if link else None
+        text = about_text(parse(page.content)) if page is not None else None
+        about_score = score(text, "about_page", company_name) if text else 0.0
+        if about_score > best[0]:
+            best = (about_score, text, "about_page")
+    confidence, description, source = best
+    return description, confidence, source
+
+
+class CompanyDescription:
+    """A deterministic resolution: homepage URL, description and how sure we are."""
+
+    __slots__ = ("company_name", "url", "description", "confidence", "source")
+
+    def __init__(self, company_name, url, description, confidence, source):
+        self.company_name = company_name
+        self.url = url
+        self.description = description
+        self.confidence = confidence
+        self.source = source
+
+    def __str__(self):
+        return (f"Website: {self.url}\nDescription: {self.description}\n"
+                f"Confidence: {self.confidence} (from {self.source})")
+
+
+_domain_index = None
+_domain_index_lock = threading.Lock()
+
+
+def get_domain_index():
+    global _domain_index
+    with _domain_index_lock:
+        if _domain_index is None:
+            _domain_index = DomainIndex(cache_path("COMPANY_DOMAIN_INDEX_PATH", "company_domains.json"))
+        return _domain_index
+
+
+def lookup_company(company_name, index=None):
+    """Resolve and extract without a threshold; returns a CompanyDescription (fields may be None)."""
+    index = index if index is not None else get_domain_index()
+    url, soup = resolve_website(company_name, index)
+    if url is None:
+        return CompanyDescription(company_name, None, None, 0.0, None)
+    description, confidence, source = extract_description(soup, url, company_name)
+    return CompanyDescription(company_name, url, description, confidence, source)
+
+
+def describe_page(company_name, url):
+    """Extract a description from one given page; returns a CompanyDescription."""
+    page = fetch(url)
+    if page is None:
+        return CompanyDescription(company_name, url, None, 0.0, None)
+    description, confidence, source = extract_description(parse(page.content), page.url, company_name)
+    return CompanyDescription(company_name, page.url, description, confidence, source)
+
+
+def describe_pages(company_name, urls, threshold=None):
+    """Describe the company from the best of several candidate pages.
+
+    Pages are scraped concurrently in parallel mode; the first one reaching
+    the threshold wins and the remaining scrapes are cancelled. Otherwise
+    the most confident result is returned (None if no page could be read).
+    """
+    if threshold is None:
+        threshold = float(os.environ.get("COMPANY_DIRECT_RESOLVE_THRESHOLD", "0.7"))
+    width = None if execution_mode() == "parallel" else 1
+    winner, results = fan_out(
+        lambda url: describe_page(company_name, url), urls,
+        accept=lambda result: result.confidence >= threshold, width=width,
+    )
+    if winner is not None:
+        return winner
+    results = [result for result in results if result is not None and result.description]
+    return max(results, key=lambda result: result.confidence, default=None)
+
+
+def describe_company(company_name, threshold=None, index=None):
+    """Return a confident CompanyDescription, or None to fall back to the crew. Blocking."""
+    if os.environ.get("COMPANY_DIRECT_RESOLVE_ENABLED", "1") != "1":
+        return None
+    if threshold is None:
+        threshold = float(os.environ.get("COMPANY_DIRECT_RESOLVE_THRESHOLD", "0.7"))
+    index = index if index is not None else get_domain_index()
+    result = lookup_company(company_name, index)
+    if result.url is None or result.confidence < threshold:
+        return None
+    index.put(company_name, result.url)
+    return result
@@ -0,0 +1,121 @@
+"""
+Streaming, memory-bounded dataset ingestion.
+
+Each source is read by its own prefetch thread into a bounded queue, so
+network or disk reads overlap with batch submission while at most
+``DATASET_PREFETCH`` items per source are held in memory, however large the
+dataset. import_sources() imports several (collection, source) pairs
+concurrently, one BatchImporter run per collection.
+
+A source is either a local file (``.jsonl``/``.ndjson`` with one item per
+line, or ``.parquet`` read one row group at a time) or a Hugging Face dataset
+given as ``"repo:config"`` and streamed with ``datasets.load_dataset``.
+
+Configuration (environment variables):
+    DATASET_PREFETCH  items buffered per source (default 1000)
+"""
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+def iter_jsonl(path):
+    """Yield one item per non-empty line of a JSONL file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_parquet(path, batch_size=1024):
+    """Yield rows of a Parquet file as dicts, one record batch at a time."""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from record_batch.to_pylist()
+
+
+def iter_hf_dataset(spec, split="train"):
+    """Stream a Hugging Face dataset given as "repo:config"."""
+    from datasets import load_dataset
+
+    path, _, name = spec.partition(":")
+    yield from load_dataset(path, name or None, split=split, streaming=True)
+
+
+def iter_source(source):
+    """Yield items from a local JSONL/Parquet file or a "repo:config" HF dataset."""
+    extension = os.path.splitext(source)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return iter_jsonl(source)
+    if extension == ".parquet":
+        return iter_parquet(source)
+    return iter_hf_dataset(source)
+
+
+def prefetch(iterable, maxsize=None):
+    """Iterate `iterable` on a background thread through a bounded queue.
+
+    Exceptions raised while reading are re-raised in the consumer. Stopping
+    the consumer early stops the reader thread at its next item.
+    """
+    if maxsize is None:
+        maxsize = int(os.environ.get("DATASET_PREFETCH", "1000"))
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+            return
+        put((_DONE, None))
+
+    thread = threading.Thread(target=reader, name="dataset-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if isinstance(item, tuple) and len(item) == 2 and item[0] is _DONE:
+                if item[1] is not None:
+                    raise item[1]
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def vector_objects(items):
+    """Map dataset items with "properties" and "vector" to importer objects."""
+    for item in items:
+        yield {"properties": item["properties"], "vector": item.get("vector")}
+
+
+def import_sources(importer, jobs, prefetch_size=None):
+    """Import (collection, items) pairs concurrently; returns ImportStats per collection."""
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="dataset-import") as pool:
+        futures = [
+            pool.submit(importer.import_objects, collection, prefetch(items, prefetch_size))
+            for collection, items in jobs
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,164 @@
+"""
+Two-tier cache for company descriptions produced by the crew.
+
+Resolving a company runs a web search, a scrape and two LLM agent loops, so
+results are kept in an in-memory LRU backed by a SQLite file that survives
+restarts. Entries are keyed by a normalized company name (the crew's
+company_names.normalize_company_name, also used by the website resolver's
+domain index) and expire after a TTL.
+
+Configuration (environment variables):
+    DESCRIPTION_CACHE_PATH              SQLite file (default <server dir>/.cache/descriptions.sqlite3)
+    DESCRIPTION_CACHE_TTL               seconds an entry stays valid (default 7 days)
+    DESCRIPTION_CACHE_MAX_ENTRIES       in-memory LRU size (default 1024)
+    DESCRIPTION_CACHE_MAX_DISK_ENTRIES  SQLite row limit (default 100000)
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from crew.src.company_description_retrieval_automation.tools.company_names import normalize_company_name
+from paths import cache_path
+
+
+class DescriptionCache:
+    """In-memory LRU with a SQLite tier and per-entry TTL."""
+
+    def __init__(self, path=None, ttl=7 * 24 * 3600, max_entries=1024, max_disk_entries=100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS descriptions ("
+                " key TEXT PRIMARY KEY,"
+                " company_name TEXT NOT NULL,"
+                " description TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS descriptions_last_access ON descriptions (last_access)"
+            )
+            self._db.commit()
+
+    def get(self, company_name):
+        """Return the cached description for company_name, or None."""
+        key = normalize_company_name(company_name)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                description, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return description
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT description, expires_at FROM descriptions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._db.execute(
+                        "UPDATE descriptions SET last_access = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+                if row is not None:
+                    self._db.execute("DELETE FROM descriptions WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, company_name, description):
+        """Store a description for company_name in both tiers."""
+        key = normalize_company_name(company_name)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, description, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO descriptions"
+                    " (key, company_name, description, created_at, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, company_name, description, now, expires_at, now),
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def invalidate(self, company_name=None):
+        """Drop one company, or every entry when company_name is None."""
+        with self._lock:
+            if company_name is None:
+                self._memory.clear()
+                if self._db is not None:
+                    self._db.execute("DELETE FROM descriptions")
+            else:
+                key = normalize_company_name(company_name)
+                self._memory.pop(key, None)
+                if self._db is not None:
+                    self._db.execute("DELETE FROM descriptions WHERE key = ?", (key,))
+            if self._db is not None:
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {
+            "memory_entries": memory_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, description, expires_at):
+        self._memory[key] = (description, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        self._db.execute("DELETE FROM descriptions WHERE expires_at <= ?", (time.time(),))
+        count = self._db.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM descriptions WHERE key IN ("
+                " SELECT key FROM descriptions ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+
+def create_description_cache():
+    """Build a DescriptionCache from environment configuration."""
+    return DescriptionCache(
+        path=cache_path("DESCRIPTION_CACHE_PATH", "descriptions.sqlite3"),
+        ttl=float(os.environ.get("DESCRIPTION_CACHE_TTL", str(7 * 24 * 3600))),
+        max_entries=int(os.environ.get("DESCRIPTION_CACHE_MAX_ENTRIES", "1024")),
+        max_disk_entries=int(os.environ.get("DESCRIPTION_CACHE_MAX_DISK_ENTRIES", "100000")),
+    )
@@ -0,0 +1,151 @@
+"""
+Optional local embedding stage for the company import.
+
+Instead of letting text2vec_weaviate vectorize every object on the server,
+vectors are computed locally in batches (one (n, dim) NumPy array per batch)
+and sent along with the objects. Vectors are cached on disk keyed by the
+model name and a hash of the text, so re-importing unchanged text, including
+after ``--reinit``, costs no vectorizer calls at all.
+
+The model must produce vectors in the same space as the collection's
+vectorizer, otherwise the QueryAgent's near-text searches will not match
+them: point EMBEDDING_MODEL at a factory for the same model text2vec_weaviate
+uses. The built-in "hashing" model is only meant for offline runs. Switching
+models requires ``--reinit``, since unchanged objects keep their old vectors.
+
+Configuration (environment variables):
+    LOCAL_EMBEDDINGS      "1" to enable the stage (default "0")
+    EMBEDDING_MODEL       "hashing" or "module:factory" returning an object with
+                          embed(texts) -> (n, dim) array (default "hashing")
+    EMBEDDING_BATCH_SIZE  texts per embed call (default 64)
+    VECTOR_CACHE_PATH     SQLite file (default <server dir>/.cache/vectors.sqlite3)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from answer_cache import load_embedder
+from incremental_sync import HASH_PROPERTY
+from paths import cache_path
+
+
+def object_text(properties):
+    """Text of an object's vectorized properties, in property order."""
+    parts = []
+    for name, value in properties.items():
+        if name == HASH_PROPERTY:
+            continue
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, (list, tuple)):
+            parts.extend(item for item in value if isinstance(item, str))
+    return " ".join(parts)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class VectorCache:
+    """SQLite store of vectors keyed by (model, text hash)."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+
+    def get_many(self, model, hashes):
+        """Return text_hash -> float32 vector for the hashes that are cached."""
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector FROM vectors WHERE model = ? AND text_hash IN "
+                    f"({', '.join('?' * len(chunk))})",
+                    (model, *chunk),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, model, items):
+        """Store (text_hash, vector) pairs."""
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO vectors (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+            )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+class EmbeddingStage:
+    """Embed texts in batches, reusing cached vectors."""
+
+    def __init__(self, embedder, cache, model, batch_size=64):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = model
+        self.batch_size = batch_size
+        self.cached = 0
+        self.computed = 0
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 array with one vector per text."""
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, set(hashes))
+        self.cached += sum(1 for key in hashes if key in vectors)
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        keys = list(missing)
+        for start in range(0, len(keys), self.batch_size):
+            chunk = keys[start:start + self.batch_size]
+            batch = np.asarray(self.embedder.embed([missing[key] for key in chunk]), dtype=np.float32)
+            self.cache.put_many(self.model, zip(chunk, batch))
+            vectors.update(zip(chunk, batch))
+            self.computed += len(chunk)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in hashes])
+
+    def embed_objects(self, objects):
+        """Return uuid -> vector (as a list) for (uuid, properties) pairs."""
+        objects = list(objects)
+        matrix = self.embed([object_text(properties) for _, properties in objects])
+        return {uuid: row.tolist() for (uuid, _), row in zip(objects, matrix)}
+
+    def stats(self):
+        return {"model": self.model, "cached": self.cached, "computed": self.computed}
+
+
+def create_embedding_stage():
+    """Build the EmbeddingStage configured by the environment, or None if disabled."""
+    if os.environ.get("LOCAL_EMBEDDINGS", "0") != "1":
+        return None
+    model = os.environ.get("EMBEDDING_MODEL", "hashing")
+    return EmbeddingStage(
+        load_embedder(model),
+        VectorCache(cache_path("VECTOR_CACHE_PATH", "vectors.sqlite3")),
+        model,
+        batch_size=int(os.environ.get("EMBEDDING_BATCH_SIZE", "64")),
+    )
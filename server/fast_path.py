@@ -0,0 +1,407 @@
+"""
+Local fast path for /chat questions that the company records answer directly.
+
+Questions like "who founded Weaviate?" or "what products does Canva have?"
+do not need the QueryAgent's LLM planning, cloud search and generation: the
+answer is a field of one record. FastPathRouter keeps an in-process index of
+the company dataset and answers such questions in milliseconds; everything
+else falls through to the agent.
+
+Routing:
+    1. entity   record names (companies, products, use cases) mentioned
+                verbatim are matched exactly (confidence 1.0); otherwise a
+                hybrid of BM25 and hashed-embedding similarity over the names
+                picks the closest one, with a confidence from its fused score
+                and its margin over the runner-up
+    2. intent   regular expressions map the rest of the question to founders,
+                founded year, products, use cases or a plain description;
+                questions with no or several intents, comparisons and yes/no
+                questions fall through
+    3. residue  the question may contain nothing but the intent phrase, the
+                entity and filler words: "who is the CEO of Canva?" or "what
+                is the revenue of Canva?" ask for something the records do
+                not hold and fall through
+    4. gate     only answers with confidence >= FAST_PATH_THRESHOLD are
+                served locally
+
+When a collection generation changes (see collection_versions) the index is
+rebuilt on a background thread; requests keep using the previous index until
+the new one is swapped in, and fall through while the first one is built.
+Routing decisions, fall-through reasons and latency are counted in stats().
+
+Configuration (environment variables):
+    FAST_PATH_ENABLED    "0" (default) or "1"
+    FAST_PATH_THRESHOLD  minimum confidence to answer locally (default 0.75)
+    FAST_PATH_ALPHA      weight of vector vs BM25 similarity (default 0.5)
+"""
+import difflib
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from answer_cache import STOPWORDS, HashingEmbedder
+from collection_versions import get_manifest
+from company_dataset import load_company_dataset
+from description_cache import normalize_company_name
+from incremental_sync import object_uuid
+
+# Checked in order; the first intent whose pattern matches wins unless a
+# later, different one also matches (then the question is ambiguous).
+INTENTS = [
+    ("founders", re.compile(r"\b(who (founded|started|created|co ?founded)|founders?|co ?founders?)\b")),
+    ("founded_year", re.compile(r"\b(when (was|were|did) .*\b(founded|started|established|launched)|what year|founding year|how old)\b")),
+    ("use_cases", re.compile(r"\b(use[- ]?cases?|used for|applications?)\b")),
+    ("products", re.compile(r"\b(products?|services?|offerings?|plans?|what does .* (offer|sell|make|provide))\b")),
+    ("description", re.compile(r"^(what|whats|who|tell me about|describe|give me an overview of)\b")),
+]
+
+# Words that may surround the intent phrase and the entity without changing
+# what is asked; any other word left over sends the question to the agent
+FILLER = set(
+    "have has had offer offers sell sells make makes provide provides list all any some "
+    "main key company companies please give show name names kind kinds type types "
+    "founded established started launched".split()
+)
+
+# Questions that need reasoning across records go to the agent
+COMPLEX = re.compile(r"\b(compare|comparison|versus|vs|difference|better|best|which|how many|why|should)\b"
+                     r"|^(does|do|did|is|are|was|can|has|have)\b")
+
+# Specific intents are trusted more than the catch-all description intent
+INTENT_WEIGHT = {"description": 0.9}
+
+
+def tokenize(text):
+    return [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+
+
+def question_words(question):
+    """Lowercase words of a question, without punctuation and possessive 's."""
+    return re.sub(r"[^\w\s]", " ", re.sub(r"'s\b", "", question.lower())).split()
+
+
+def join_names(names):
+    names = list(names)
+    if len(names) <= 1:
+        return "".join(names)
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+class LocalAnswer:
+    """QueryAgentResponse look-alike for answers served from the local index."""
+
+    def __init__(self, original_query, final_answer, collection_names, sources, total_time):
+        self.original_query = original_query
+        self.collection_names = collection_names
+        self.searches = []
+        self.aggregations = []
+        self.total_time = total_time
+        self.final_answer = final_answer
+        self.sources = sources
+
+    def model_dump(self, mode="python"):
+        """Plain data in the QueryAgentResponse layout, so the answer can be passed as context=."""
+        return {
+            "original_query": self.original_query,
+            "collection_names": list(self.collection_names),
+            "searches": list(self.searches),
+            "aggregations": list(self.aggregations),
+            "usage": {"requests": 0, "request_tokens": None, "response_tokens": None,
+                      "total_tokens": None, "details": None},
+            "total_time": self.total_time,
+            "aggregation_answer": None,
+            "has_aggregation_answer": False,
+            "has_search_answer": True,
+            "is_partial_answer": False,
+            "missing_information": [],
+            "final_answer": self.final_answer,
+            "sources": list(self.sources),
+        }
+
+    def __str__(self):
+        # Same layout as the pydantic repr so the UI can parse final_answer='...'
+        return (
+            f"original_query={self.original_query!r} "
+            f"collection_names={self.collection_names!r} "
+            f"searches={self.searches!r} aggregations={self.aggregations!r} "
+            f"total_time={self.total_time!r} "
+            f"final_answer={self.final_answer!r} sources={self.sources!r}"
+        )
+
+
+class NameIndex:
+    """Exact and hybrid (BM25 + vector) lookup over record names."""
+
+    def __init__(self, names, embedder, k1=1.2, b=0.75):
+        self.names = names
+        self.k1 = k1
+        self.b = b
+        self.exact = {}
+        for i, name in enumerate(names):
+            self.exact.setdefault(normalize_company_name(name), []).append(i)
+        self.max_words = max((len(key.split()) for key in self.exact), default=0)
+        self.postings = {}
+        lengths = []
+        for i, name in enumerate(names):
+            tokens = tokenize(name)
+            lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                self.postings.setdefault(token, []).append((i, tf))
+        self.lengths = np.array(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if len(names) else 0.0
+        self.embedder = embedder
+        self.vectors = embedder.embed(names) if names else None
+
+    def mentions(self, words):
+        """Return (word count, start, key) for names that appear verbatim in a question's words, longest first."""
+        found = []
+        for size in range(min(self.max_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                key = " ".join(words[start:start + size])
+                if key in self.exact:
+                    found.append((size, start, key))
+        return found
+
+    def bm25(self, tokens):
+        scores = np.zeros(len(self.names), dtype=np.float32)
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.names) - len(postings) + 0.5) / (len(postings) + 0.5))
+            ids = np.array([i for i, _ in postings])
+            tf = np.array([tf for _, tf in postings], dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[ids] / self.avg_length)
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def hybrid(self, question, alpha=0.5):
+        """Return (index, confidence) of the best matching name, or (None, 0.0)."""
+        if not self.names:
+            return None, 0.0
+        lexical = self.bm25(tokenize(question))
+        if lexical.max() > 0:
+            lexical = lexical / lexical.max()
+        semantic = np.clip(self.vectors @ self.embedder.embed([question])[0], 0.0, 1.0)
+        fused = alpha * semantic + (1 - alpha) * lexical
+        order = np.argsort(fused)[::-1]
+        best = float(fused[order[0]])
+        runner_up = float(fused[order[1]]) if len(order) > 1 else 0.0
+        # A near tie between two names is not a confident match
+        margin = min(1.0, (best - runner_up) / 0.1)
+        return int(order[0]), best * margin
+
+
+class IndexSnapshot:
+    """Name index and records of one dataset build, swapped in as a whole."""
+
+    def __init__(self, records, embedder, generations):
+        self.records = records
+        self.by_company = {}
+        for record in records:
+            self.by_company.setdefault(record.company, {}).setdefault(record.collection_name, []).append(record)
+        self.index = NameIndex([record.name for record in records], embedder)
+        self.generations = generations
+
+
+class FastPathRouter:
+    """Answer simple company questions from an in-process index of the dataset."""
+
+    def __init__(self, dataset_factory=load_company_dataset, threshold=0.75, alpha=0.5,
+                 manifest=None):
+        self.dataset_factory = dataset_factory
+        self.threshold = threshold
+        self.alpha = alpha
+        self.manifest = manifest or get_manifest()
+        self.embedder = HashingEmbedder(dim=256)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._rebuilding = False
+        self.rebuilds = 0
+        self.decisions = Counter()
+        self.reasons = Counter()
+        self.intents = Counter()
+        self.fast_time = 0.0
+
+    def refresh(self, force=False):
+        """(Re)build the index if the collections changed since the last build. Blocking.
+
+        The build runs without holding the lock; requests keep routing on the
+        previous snapshot until the new one is swapped in.
+        """
+        generations = dict(self.manifest.generations())
+        snapshot = self._snapshot
+        if not force and snapshot is not None and generations == snapshot.generations:
+            return
+        snapshot = IndexSnapshot(list(self.dataset_factory()), self.embedder, generations)
+        with self._lock:
+            self._snapshot = snapshot
+            self.rebuilds += 1
+
+    def _refresh_in_background(self):
+        """Start a rebuild on a daemon thread if the index is missing or stale."""
+        snapshot = self._snapshot
+        if snapshot is not None and self.manifest.generations() == snapshot.generations:
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="fast-path-rebuild", daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Fast path: index rebuild failed: {e}")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def classify(self, text):
+        """Return the single intent of a question (lowercase words), or (None, reason)."""
+        if COMPLEX.search(text):
+            return None, "complex"
+        matched = [name for name, pattern in INTENTS if pattern.search(text)]
+        specific = [name for name in matched if name != "description"]
+        if len(specific) > 1:
+            return None, "ambiguous_intent"
+        if specific:
+            return specific[0], None
+        if matched:
+            return "description", None
+        return None, "no_intent"
+
+    def resolve(self, snapshot, words):
+        """Return (record, confidence, text) for the entity a question is about.
+
+        text is the question with a verbatim entity mention replaced by "it",
+        so intent patterns and the residue check see only the rest.
+        """
+        index = snapshot.index
+        mentions = index.mentions(words)
+        if mentions:
+            size, start, key = mentions[0]
+            others = {
+                snapshot.records[i].company
+                for other_size, other_start, other_key in mentions
+                if other_key not in key
+                for i in index.exact[other_key]
+            }
+            record = snapshot.records[index.exact[key][0]]
+            if others - {record.company}:
+                return None, 0.0, None
+            return record, 1.0, " ".join(words[:start] + ["it"] + words[start + size:])
+        text = " ".join(words)
+        i, confidence = index.hybrid(text, self.alpha)
+        return (snapshot.records[i] if i is not None else None), confidence, text
+
+    def residue(self, text, record):
+        """Words of a question not accounted for by its intent phrases, entity or filler."""
+        for name, pattern in INTENTS:
+            text = pattern.sub(" ", text)
+        names = set(tokenize(record.name)) | set(tokenize(record.company))
+        return [
+            word for word in tokenize(text)
+            if word not in FILLER and not difflib.get_close_matches(word, names, n=1, cutoff=0.8)
+        ]
+
+    def answer(self, snapshot, intent, record):
+        """Build the answer text and source records, or (None, None) if the field is missing."""
+        company = snapshot.by_company.get(record.company, {})
+        info = (company.get("CompanyInfo") or [None])[0]
+        if intent == "founders":
+            if info is None or not info.founders:
+                return None, None
+            return f"{record.company} was founded by {join_names(info.founders)}.", [info]
+        if intent == "founded_year":
+            if info is None or info.founded_year is None:
+                return None, None
+            return f"{record.company} was founded in {info.founded_year}.", [info]
+        if intent in ("products", "use_cases"):
+            collection = "Products" if intent == "products" else "UseCases"
+            items = company.get(collection) or []
+            if not items:
+                return None, None
+            label = "products" if intent == "products" else "use cases"
+            lines = [f"{record.company}'s {label} include:"]
+            lines.extend(f"- {item.name}: {item.description}" for item in items)
+            return "\n".join(lines), items
+        if not record.description:
+            return None, None
+        return record.description, [record]
+
+    def route(self, question):
+        """Return a LocalAnswer for a confident question, or None to use the agent."""
+        start = time.perf_counter()
+        self._refresh_in_background()
+        snapshot = self._snapshot
+        intent = answer = sources = None
+        if snapshot is None:
+            reason = "index_loading"
+        else:
+            record, confidence, text = self.resolve(snapshot, question_words(question))
+            if record is None:
+                reason = "no_entity"
+            else:
+                intent, reason = self.classify(text)
+            if intent is not None:
+                confidence *= INTENT_WEIGHT.get(intent, 1.0)
+                if self.residue(text, record):
+                    reason = "unrecognised_terms"
+                elif confidence < self.threshold:
+                    reason = "low_confidence"
+                else:
+                    answer, sources = self.answer(snapshot, intent, record)
+                    if answer is None:
+                        reason = "missing_field"
+        elapsed = time.perf_counter() - start
+        if answer is None:
+            self.decisions["agent"] += 1
+            self.reasons[reason] += 1
+            return None
+        self.decisions["fast"] += 1
+        self.intents[intent] += 1
+        self.fast_time += elapsed
+        return LocalAnswer(
+            question,
+            answer,
+            sorted({source.collection_name for source in sources}),
+            [
+                {"object_id": object_uuid(source.collection_name, source.company, source.name),
+                 "collection": source.collection_name}
+                for source in sources
+            ],
+            elapsed,
+        )
+
+    def stats(self):
+        total = sum(self.decisions.values())
+        fast = self.decisions["fast"]
+        snapshot = self._snapshot
+        return {
+            "records": len(snapshot.records) if snapshot is not None else 0,
+            "rebuilds": self.rebuilds,
+            "routed": total,
+            "fast": fast,
+            "agent": self.decisions["agent"],
+            "fast_ratio": round(fast / total, 3) if total else 0.0,
+            "fallback_reasons": dict(self.reasons),
+            "intents": dict(self.intents),
+            "mean_fast_ms": round(self.fast_time / fast * 1000, 3) if fast else 0.0,
+        }
+
+
+def create_fast_path():
+    """Build the FastPathRouter configured by the environment, or None if disabled."""
+    if os.environ.get("FAST_PATH_ENABLED", "0") != "1":
+        return None
+    return FastPathRouter(
+        threshold=float(os.environ.get("FAST_PATH_THRESHOLD", "0.75")),
+        alpha=float(os.environ.get("FAST_PATH_ALPHA", "0.5")),
+    )
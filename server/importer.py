@@ -0,0 +1,191 @@
+"""
+Shared batch importer with retries, a dead-letter file and throughput reporting.
+
+Wraps the Weaviate v4 collection batch API (dynamic, fixed-size or
+rate-limited batching with concurrent requests). After each pass the
+collection's failed_objects are collected and re-submitted with exponential
+backoff; objects that still fail are appended to a JSONL dead-letter file
+so they can be inspected and replayed later. Progress and objects/sec are
+printed per collection.
+
+Every pass goes through the weaviate_import backend of resilience.py: while
+its circuit is open after repeated failed passes, the remaining retries are
+skipped and the failed objects go straight to the dead-letter file.
+
+Anything with a ``name`` and a Weaviate-like ``batch`` attribute can be used
+as the target, e.g. stub_backend.FakeCollection for offline runs.
+
+Configuration (environment variables):
+    IMPORT_BATCH_MODE           "dynamic" (default), "fixed" or "rate_limit"
+    IMPORT_BATCH_SIZE           objects per request in fixed mode (default 200)
+    IMPORT_CONCURRENT_REQUESTS  parallel requests in fixed mode (default 2)
+    IMPORT_REQUESTS_PER_MINUTE  request budget in rate_limit mode (default 600)
+    IMPORT_MAX_RETRIES          retry passes for failed objects (default 3)
+    IMPORT_RETRY_BACKOFF        base retry delay in seconds, doubled per pass (default 1)
+    IMPORT_DEAD_LETTER_PATH     JSONL file for objects that never succeeded
+                                (default <server dir>/.cache/dead_letter.jsonl)
+"""
+import json
+import os
+import time
+
+import resilience
+from paths import cache_path
+
+
+class ImportStats:
+    """Counters for one collection import."""
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self.submitted = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def succeeded(self):
+        return self.submitted - self.dead_lettered
+
+    @property
+    def objects_per_s(self):
+        return self.submitted / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "collection": self.collection_name,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "elapsed_s": round(self.elapsed, 3),
+            "objects_per_s": round(self.objects_per_s, 1),
+        }
+
+    def report(self):
+        return (
+            f"{self.collection_name}: {self.succeeded}/{self.submitted} imported in "
+            f"{self.elapsed:.1f}s ({self.objects_per_s:.1f} objects/s), "
+            f"{self.retried} retried, {self.dead_lettered} dead-lettered"
+        )
+
+
+class BatchImporter:
+    """Import objects into a collection with retries and failure accounting."""
+
+    def __init__(self, mode="dynamic", batch_size=200, concurrent_requests=2,
+                 requests_per_minute=600, max_retries=3, retry_backoff=1.0,
+                 dead_letter_path=None, progress_every=1000):
+        if mode not in ("dynamic", "fixed", "rate_limit"):
+            raise ValueError(f"Unknown batch mode: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.concurrent_requests = concurrent_requests
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self.progress_every = progress_every
+
+    def _batch(self, collection):
+        if self.mode == "fixed":
+            return collection.batch.fixed_size(
+                batch_size=self.batch_size, concurrent_requests=self.concurrent_requests
+            )
+        if self.mode == "rate_limit":
+            return collection.batch.rate_limit(requests_per_minute=self.requests_per_minute)
+        return collection.batch.dynamic()
+
+    def _submit(self, collection, objects, stats=None):
+        """Send one pass of objects; returns the failed (object, message) pairs."""
+        with self._batch(collection) as batch:
+            for obj in objects:
+                batch.add_object(
+                    properties=obj["properties"],
+                    uuid=obj.get("uuid"),
+                    vector=obj.get("vector"),
+                )
+                if stats is not None:
+                    stats.submitted += 1
+                    if self.progress_every and stats.submitted % self.progress_every == 0:
+                        elapsed = time.perf_counter() - stats.started
+                        print(f"{stats.collection_name}: {stats.submitted} objects sent "
+                              f"({stats.submitted / elapsed:.1f} objects/s)")
+        return [
+            (
+                {
+                    "properties": error.object_.properties,
+                    "uuid": str(error.object_.uuid) if error.object_.uuid else None,
+                    "vector": error.object_.vector,
+                },
+                error.message,
+            )
+            for error in collection.batch.failed_objects
+        ]
+
+    def import_objects(self, collection, objects):
+        """Import an iterable of {"properties", "uuid"?, "vector"?} dicts.
+
+        Returns ImportStats for the collection.
+        """
+        stats = ImportStats(collection.name)
+        attempt = 0
+        try:
+            # objects may be a one-shot iterator: failed passes are retried below instead
+            failed = resilience.call("weaviate_import", self._submit, collection, objects, stats, retries=0)
+        except resilience.BackendUnavailable as e:
+            # Rejected before anything was sent, so objects is still unconsumed; the
+            # breaker or limiter that rejected it would reject the retries too
+            print(f"{collection.name}: import rejected: {e}")
+            failed = [(obj, str(e)) for obj in objects]
+            stats.submitted += len(failed)
+            attempt = self.max_retries
+        while failed and attempt < self.max_retries:
+            attempt += 1
+            delay = self.retry_backoff * 2 ** (attempt - 1)
+            print(f"{collection.name}: retrying {len(failed)} failed objects in {delay:.1f}s "
+                  f"(attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
+            stats.retried += len(failed)
+            try:
+                failed = resilience.call(
+                    "weaviate_import", self._submit, collection, [obj for obj, _ in failed], retries=0
+                )
+            except resilience.BackendUnavailable as e:
+                print(f"{collection.name}: giving up on retries: {e}")
+                break
+        if failed:
+            stats.dead_lettered = len(failed)
+            self._dead_letter(collection.name, failed)
+        stats.elapsed = time.perf_counter() - stats.started
+        print(stats.report())
+        return stats
+
+    def _dead_letter(self, collection_name, failed):
+        print(f"{collection_name}: {len(failed)} objects failed after {self.max_retries} retries; "
+              f"first error: {failed[0][1]}")
+        if not self.dead_letter_path:
+            return
+        directory = os.path.dirname(self.dead_letter_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for obj, message in failed:
+                f.write(json.dumps({"collection": collection_name, "error": message, **obj}, default=str) + "\n")
+        print(f"{collection_name}: failed objects written to {self.dead_letter_path}")
+
+
+def create_importer(**overrides):
+    """Build a BatchImporter from environment configuration."""
+    options = dict(
+        mode=os.environ.get("IMPORT_BATCH_MODE", "dynamic"),
+        batch_size=int(os.environ.get("IMPORT_BATCH_SIZE", "200")),
+        concurrent_requests=int(os.environ.get("IMPORT_CONCURRENT_REQUESTS", "2")),
+        requests_per_minute=int(os.environ.get("IMPORT_REQUESTS_PER_MINUTE", "600")),
+        max_retries=int(os.environ.get("IMPORT_MAX_RETRIES", "3")),
+        retry_backoff=float(os.environ.get("IMPORT_RETRY_BACKOFF", "1")),
+        dead_letter_path=cache_path("IMPORT_DEAD_LETTER_PATH", "dead_letter.jsonl"),
+    )
+    options.update(overrides)
+    return BatchImporter(**options)
@@ -0,0 +1,269 @@
+"""
+Incremental, idempotent sync of source records into Weaviate collections.
+
+Every object gets a deterministic UUID derived from its identity (collection,
+company and name) and a ``content_hash`` property over its other properties.
+A sync compares the desired objects with the (uuid, content_hash) pairs
+already stored and only writes what changed:
+
+    insert     uuid not in the collection yet
+    update     uuid present but content_hash differs (re-vectorized on write)
+    delete     uuid in the collection but no longer in the source
+    unchanged  left alone, so it costs no vectorizer calls
+
+Objects without a content_hash were not written by a sync (descriptions
+written back by the crew, or imports from before hashes existed) and are never
+deleted; run ``--reinit`` once to clear out old hash-less imports.
+
+Records are read twice: a first pass keeps only (uuid, hash, name) per object
+to build the plan, and the writing pass streams the changed objects straight
+into the importer. Records must therefore be re-iterable (a list, or a
+company_dataset.CollectionRecords view), but are never all held in memory.
+
+Multi-tenant collections (COMPANY_COLLECTION_LAYOUT=tenants, see
+company_layout.py) are synced with a tenant_of(company) function: hashes are
+read from every active tenant, each written object goes to its company's
+tenant (created on first write), and deletes are sent to the tenant that
+holds the object. Tenants that are not active (deactivated or offloaded)
+cannot be read, so their companies are skipped entirely, neither written
+nor deleted, until the tenant is activated again.
+"""
+import hashlib
+import json
+from itertools import groupby
+from uuid import NAMESPACE_DNS, uuid5
+
+from importer import create_importer
+
+HASH_PROPERTY = "content_hash"
+
+# Tenant activity statuses whose objects can be read and written
+ACTIVE_STATUSES = ("ACTIVE", "HOT")
+
+
+def content_hash(properties):
+    """Return a stable hash of an object's properties (excluding the hash itself)."""
+    payload = {k: v for k, v in properties.items() if k != HASH_PROPERTY}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def object_uuid(collection_name, company, name):
+    """Deterministic UUID for an object identified by its company and name.
+
+    Same value as weaviate.util.generate_uuid5(key, collection_name), without
+    importing the Weaviate client for callers that only need the id.
+    """
+    return str(uuid5(NAMESPACE_DNS, collection_name + f"{company}/{name}".lower()))
+
+
+class SyncPlan:
+    """Difference between the desired objects and a collection's contents.
+
+    inserts and updates hold (uuid, name) pairs; deletes holds uuids. For a
+    multi-tenant collection, tenants maps uuid -> tenant and skipped_tenants
+    lists the inactive tenants left out of the plan.
+    """
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+        self.unmanaged = 0
+        self.tenants = None
+        self.skipped_tenants = []
+
+    @property
+    def has_changes(self):
+        return bool(self.inserts or self.updates or self.deletes)
+
+    def writes(self):
+        """UUIDs of the objects to insert or update."""
+        return {uuid for uuid, _ in self.inserts} | {uuid for uuid, _ in self.updates}
+
+    def report(self):
+        """Return a human-readable diff summary."""
+        lines = [
+            f"{self.collection_name}: {len(self.inserts)} to insert, {len(self.updates)} to update, "
+            f"{len(self.deletes)} to delete, {self.unchanged} unchanged, {self.unmanaged} unmanaged"
+        ]
+        if self.skipped_tenants:
+            lines.append(f"  skipped {len(self.skipped_tenants)} inactive tenants: {', '.join(self.skipped_tenants)}")
+        for label, items in (("+", self.inserts), ("~", self.updates)):
+            for uuid, name in items:
+                lines.append(f"  {label} {name or uuid}")
+        for uuid in self.deletes:
+            lines.append(f"  - {uuid}")
+        return "\n".join(lines)
+
+
+def plan_sync(collection_name, desired, existing):
+    """Build a SyncPlan.
+
+    desired maps uuid -> (content_hash, name); existing maps uuid -> stored
+    content_hash (None for objects without one, which are counted as
+    unmanaged and never deleted).
+    """
+    plan = SyncPlan(collection_name)
+    for uuid, (desired_hash, name) in desired.items():
+        if uuid not in existing:
+            plan.inserts.append((uuid, name))
+        elif existing[uuid] != desired_hash:
+            plan.updates.append((uuid, name))
+        else:
+            plan.unchanged += 1
+    for uuid, stored_hash in existing.items():
+        if uuid in desired:
+            continue
+        if stored_hash is None:
+            plan.unmanaged += 1
+        else:
+            plan.deletes.append(uuid)
+    return plan
+
+
+def iter_objects(collection_name, records):
+    """Yield (uuid, properties with content_hash) for (company, properties) records."""
+    for company, properties in records:
+        uuid = object_uuid(collection_name, company, properties["name"])
+        yield uuid, {**properties, HASH_PROPERTY: content_hash(properties)}
+
+
+def desired_hashes(collection_name, records):
+    """Return uuid -> (content_hash, name) for (company, properties) records."""
+    return {
+        uuid: (properties[HASH_PROPERTY], properties.get("name"))
+        for uuid, properties in iter_objects(collection_name, records)
+    }
+
+
+class TenantRecords:
+    """Re-iterable view of (company, properties) records without the companies of some tenants."""
+
+    def __init__(self, records, tenant_of, excluded):
+        self.records = records
+        self.tenant_of = tenant_of
+        self.excluded = set(excluded)
+
+    def __iter__(self):
+        for company, properties in self.records:
+            if self.tenant_of(company) not in self.excluded:
+                yield company, properties
+
+
+def object_tenants(collection_name, records, tenant_of):
+    """Return uuid -> tenant for (company, properties) records."""
+    return {
+        object_uuid(collection_name, company, properties["name"]): tenant_of(company)
+        for company, properties in records
+    }
+
+
+def tenant_statuses(collection):
+    """Return tenant -> activity status name ("ACTIVE", "INACTIVE", "OFFLOADED", ...)."""
+    return {
+        name: getattr(tenant.activity_status, "value", tenant.activity_status)
+        for name, tenant in collection.tenants.get().items()
+    }
+
+
+def fetch_existing_hashes(collection):
+    """Return uuid -> content_hash for every object in a collection."""
+    existing = {}
+    for obj in collection.iterator(return_properties=[HASH_PROPERTY]):
+        existing[str(obj.uuid)] = obj.properties.get(HASH_PROPERTY)
+    return existing
+
+
+def _write_objects(collection_name, records, uuids, embedding_stage=None, chunk_size=500):
+    """Stream importer objects for the records whose uuid is in uuids."""
+    chunk = []
+    for uuid, properties in iter_objects(collection_name, records):
+        if uuid not in uuids:
+            continue
+        chunk.append((uuid, properties))
+        if len(chunk) >= chunk_size:
+            yield from _with_vectors(chunk, embedding_stage)
+            chunk = []
+    yield from _with_vectors(chunk, embedding_stage)
+
+
+def _with_vectors(chunk, embedding_stage):
+    vectors = embedding_stage.embed_objects(chunk) if embedding_stage and chunk else {}
+    for uuid, properties in chunk:
+        yield {"properties": properties, "uuid": uuid, "vector": vectors.get(uuid)}
+
+
+def apply_sync(collection, plan, records, batch_size=100, importer=None, embedding_stage=None):
+    """Write a SyncPlan to a collection; returns the number of failed writes.
+
+    The changed objects are read again from records. With an embedding_stage
+    (see embeddings.py) they are sent with locally computed vectors, so the
+    server does not vectorize them.
+    """
+    from weaviate.classes.query import Filter
+
+    uuids = plan.writes()
+    failed = 0
+    if uuids:
+        # Adding an object with an existing UUID replaces it
+        importer = importer or create_importer()
+        objects = _write_objects(collection.name, records, uuids, embedding_stage)
+        if plan.tenants is None:
+            failed = importer.import_objects(collection, objects).dead_lettered
+        else:
+            # One import per run of consecutive objects of the same tenant;
+            # datasets grouped by company give one import per company
+            for tenant, tenant_objects in groupby(objects, key=lambda obj: plan.tenants[obj["uuid"]]):
+                failed += importer.import_objects(collection.with_tenant(tenant), tenant_objects).dead_lettered
+    deletes = {None: plan.deletes}
+    if plan.tenants is not None:
+        deletes = {}
+        for uuid in plan.deletes:
+            deletes.setdefault(plan.tenants[uuid], []).append(uuid)
+    for tenant, uuids in deletes.items():
+        target = collection if tenant is None else collection.with_tenant(tenant)
+        for start in range(0, len(uuids), batch_size):
+            chunk = uuids[start:start + batch_size]
+            target.data.delete_many(where=Filter.by_id().contains_any(chunk))
+    return failed
+
+
+def plan_tenant_sync(collection, records, tenant_of):
+    """Plan a sync into a multi-tenant collection; returns (plan, records of active tenants)."""
+    statuses = tenant_statuses(collection)
+    skipped = sorted(name for name, status in statuses.items() if status not in ACTIVE_STATUSES)
+    if skipped:
+        records = TenantRecords(records, tenant_of, skipped)
+    existing, tenants = {}, {}
+    for name in statuses:
+        if name in skipped:
+            continue
+        hashes = fetch_existing_hashes(collection.with_tenant(name))
+        existing.update(hashes)
+        tenants.update(dict.fromkeys(hashes, name))
+    tenants.update(object_tenants(collection.name, records, tenant_of))
+    plan = plan_sync(collection.name, desired_hashes(collection.name, records), existing)
+    plan.tenants = tenants
+    plan.skipped_tenants = skipped
+    return plan, records
+
+
+def sync_collection(collection, records, dry_run=False, embedding_stage=None, tenant_of=None):
+    """Plan and (unless dry_run) apply a sync of re-iterable records into collection.
+
+    Pass tenant_of(company) -> tenant name for a multi-tenant collection.
+    """
+    if tenant_of is None:
+        plan = plan_sync(collection.name, desired_hashes(collection.name, records),
+                         fetch_existing_hashes(collection))
+    else:
+        plan, records = plan_tenant_sync(collection, records, tenant_of)
+    print(plan.report())
+    if not dry_run and plan.has_changes:
+        failed = apply_sync(collection, plan, records, embedding_stage=embedding_stage)
+        if failed:
+            print(f"Number of failed imports in {collection.name}: {failed}")
+    return plan
@@ -0,0 +1,369 @@
+"""
+Latency instrumentation: per-stage spans, Prometheus histograms and a debug header.
+
+Wrap a stage in ``with span("agent_run"):`` to time it. Every span is
+observed in the ``stage_seconds`` histogram (labelled by stage and, for crew
+tasks and tools, by name) and, while a request is being traced, appended to
+that request's trace. The trace follows the request into worker threads
+started through BlockingExecutor, because the executor copies the context.
+
+Stages recorded by the API:
+    pool_acquire        waiting for a pooled Weaviate client
+    agent_run           QueryAgent.run wall time
+    agent_server        time the agent service reports for plan, search and generation
+    agent_network       agent_run minus agent_server (transport and queuing)
+    connect             opening a Weaviate client (agent pool reconnects)
+    fast_path           local fast-path routing for /chat
+    answer_cache        semantic answer cache lookup
+    description_cache   description cache lookup
+    direct_resolve      deterministic website lookup before the crew
+    crew_build          building the crew
+    crew_kickoff        the whole crew run
+    crew_task           each crew task (label: task name)
+    crew_step           each agent step, ending with its tool call (label: tool)
+    backend_call        each successful call through resilience.py (label: backend)
+
+GET /metrics serves the histograms, and the output of any collector added
+with register_collector(), in the Prometheus text format. Requests
+sent with ``X-Debug-Timing: 1`` (or every request, with
+METRICS_DEBUG_HEADER=1) get a ``Server-Timing`` header listing their spans.
+
+With several worker processes (serve.py), each worker has its own
+histograms. When METRICS_MULTIPROC_DIR is set, every worker writes a
+snapshot of its metrics there every METRICS_FLUSH_INTERVAL seconds, and
+/metrics merges the snapshots of all workers, so whichever worker answers
+reports the whole server (up to one flush interval behind for the others).
+
+With METRICS_ENABLED=0, span() returns a shared no-op context manager and the
+middleware is not installed, so the cost is one function call per stage.
+
+Configuration (environment variables):
+    METRICS_ENABLED         "1" (default) or "0"
+    METRICS_DEBUG_HEADER    "1" to add Server-Timing to every response (default "0")
+    METRICS_MULTIPROC_DIR   directory for per-worker snapshots merged by /metrics
+                            (default: unset, this process only; serve.py sets it)
+    METRICS_FLUSH_INTERVAL  seconds between a worker's snapshots (default 5)
+"""
+import bisect
+import contextlib
+import contextvars
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_DEBUG_HEADER = os.environ.get("METRICS_DEBUG_HEADER", "0") == "1"
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with labels."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self):
+        """Copy of every series: label values -> [bucket counts, sum, count]."""
+        with self._lock:
+            return {labels: [counts[:], total, count] for labels, (counts, total, count) in self._series.items()}
+
+    def render(self, series=None):
+        """Render this histogram, or the given series (as returned by series()) in its place."""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        if series is None:
+            series = self.series()
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return "\n".join(lines)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Duration of request stages.", ("stage", "name"))
+REQUEST_SECONDS = Histogram("http_request_seconds", "Duration of HTTP requests.", ("method", "path", "status"))
+HISTOGRAMS = (REQUEST_SECONDS, STAGE_SECONDS)
+
+
+_collectors = []
+
+
+def register_collector(render):
+    """Add a function returning extra Prometheus text lines to /metrics."""
+    _collectors.append(render)
+
+
+def render_metrics():
+    """Return every histogram and collector in the Prometheus text exposition format."""
+    if METRICS_MULTIPROC_DIR:
+        return render_all_workers()
+    parts = [h.render() for h in HISTOGRAMS]
+    parts += [render() for render in _collectors]
+    return "\n".join(part for part in parts if part) + "\n"
+
+
+def _render_collectors():
+    return "\n".join(part for part in (render() for render in _collectors) if part)
+
+
+def write_snapshot():
+    """Write this worker's histograms and collector output to METRICS_MULTIPROC_DIR."""
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    snapshot = {
+        "histograms": {
+            h.name: [[list(labels), *values] for labels, values in h.series().items()] for h in HISTOGRAMS
+        },
+        "collectors": _render_collectors(),
+    }
+    path = os.path.join(METRICS_MULTIPROC_DIR, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge_collectors(outputs):
+    """Combine collector text from several workers, adding a worker label to every sample."""
+    headers, samples = {}, {}
+    for pid, text in outputs:
+        for line in text.splitlines():
+            if line.startswith("#"):
+                name = line.split()[2]
+                if line not in headers.setdefault(name, []):
+                    headers[name].append(line)
+            elif "{" in line:
+                name, _, rest = line.partition("{")
+                samples.setdefault(name, []).append(f'{name}{{worker="{pid}",{rest}')
+            elif line:
+                name, _, value = line.partition(" ")
+                samples.setdefault(name, []).append(f'{name}{{worker="{pid}"}} {value}')
+    lines = []
+    for name in {**headers, **samples}:
+        lines += headers.get(name, []) + samples.get(name, [])
+    return "\n".join(lines)
+
+
+def render_all_workers():
+    """Metrics of every worker sharing METRICS_MULTIPROC_DIR.
+
+    Histograms are summed, including those of workers that have exited, so
+    they stay cumulative. Collector samples (gauges and counters of a live
+    worker's backends) get a ``worker`` label and are left out once the
+    worker is gone.
+    """
+    write_snapshot()
+    merged = {h.name: {} for h in HISTOGRAMS}
+    outputs = []
+    for path in sorted(glob.glob(os.path.join(METRICS_MULTIPROC_DIR, "*.json"))):
+        try:
+            pid = int(os.path.basename(path)[:-len(".json")])
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, rows in snapshot["histograms"].items():
+            if name not in merged:
+                continue
+            for labels, counts, total, count in rows:
+                into = merged[name].setdefault(tuple(labels), [[0] * len(counts), 0.0, 0])
+                into[0] = [a + b for a, b in zip(into[0], counts)]
+                into[1] += total
+                into[2] += count
+        if _alive(pid):
+            outputs.append((pid, snapshot["collectors"]))
+    parts = [h.render(merged[h.name]) for h in HISTOGRAMS] + [_merge_collectors(outputs)]
+    return "\n".join(part for part in parts if part) + "\n"
+
+
+def _write_snapshots():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except OSError as e:
+            print(f"Metrics: could not write the worker snapshot: {e}")
+
+
+def record(stage, seconds, name=""):
+    """Record an externally measured stage duration."""
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage, name)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((f"{stage}.{name}" if name else stage, seconds))
+
+
+class _Span:
+    __slots__ = ("stage", "name", "start")
+
+    def __init__(self, stage, name):
+        self.stage = stage
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self.start, self.name)
+        return False
+
+
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+def span(stage, name=""):
+    """Context manager timing one stage."""
+    if not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(stage, name)
+
+
+def start_trace():
+    """Begin collecting spans for the current request; returns the trace list."""
+    trace = []
+    _trace.set(trace)
+    return trace
+
+
+def server_timing(trace):
+    """Format a trace as a Server-Timing header value (durations in ms)."""
+    return ", ".join(
+        f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={seconds * 1000:.1f}" for name, seconds in trace
+    )
+
+
+def record_agent_response(response, wall_seconds):
+    """Split an agent call into the service's own time and the transport around it."""
+    server_seconds = getattr(response, "total_time", None)
+    if not METRICS_ENABLED or not isinstance(server_seconds, (int, float)):
+        return
+    record("agent_server", server_seconds)
+    record("agent_network", max(0.0, wall_seconds - server_seconds))
+
+
+class CrewTimer:
+    """Chains onto a crew's callbacks to record crew_task and crew_step spans.
+
+    A step callback fires after the agent's LLM turn and its tool call, so a
+    crew_step covers both; time from the last step to the task's end is
+    attributed to the task's final answer.
+    """
+
+    def __init__(self, crew):
+        self._task_callback = crew.task_callback
+        self._step_callback = crew.step_callback
+        self._task_started = self._step_started = time.perf_counter()
+        crew.task_callback = self.task_callback
+        crew.step_callback = self.step_callback
+
+    def task_callback(self, output):
+        now = time.perf_counter()
+        record("crew_task", now - self._task_started, getattr(output, "name", None) or "")
+        self._task_started = self._step_started = now
+        if self._task_callback is not None:
+            return self._task_callback(output)
+
+    def step_callback(self, step):
+        now = time.perf_counter()
+        tool = getattr(step, "tool", None)
+        if tool:
+            record("crew_step", now - self._step_started, tool)
+            self._step_started = now
+        if self._step_callback is not None:
+            return self._step_callback(step)
+
+
+def instrument_crew(crew):
+    """Record task and step spans for a built crew, keeping its existing callbacks."""
+    if METRICS_ENABLED:
+        CrewTimer(crew)
+    return crew
+
+
+def install(app):
+    """Add the request-timing middleware to a FastAPI app (no-op when disabled)."""
+    if not METRICS_ENABLED:
+        return
+    if METRICS_MULTIPROC_DIR:
+        threading.Thread(target=_write_snapshots, name="metrics-snapshot", daemon=True).start()
+
+    app.add_middleware(TimingMiddleware)
+
+
+class TimingMiddleware:
+    """ASGI middleware observing http_request_seconds and adding the Server-Timing header.
+
+    A request is timed until the last chunk of its body has been sent, so a
+    streamed (SSE) response counts for as long as it streams. Server-Timing
+    has to go out with the response headers and covers the spans up to then.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = start_trace()
+        start = time.perf_counter()
+        debug = METRICS_DEBUG_HEADER or (b"x-debug-timing", b"1") in scope.get("headers", ())
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if debug:
+                    value = server_timing(trace + [("total", time.perf_counter() - start)])
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", value.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            path = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, str(status))
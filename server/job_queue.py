@@ -0,0 +1,421 @@
+"""
+Background job queue for long-running crew kickoffs.
+
+Submitting a job returns an id immediately; a bounded pool of asyncio workers
+runs the jobs and records status, progress and results in a SQLite job store,
+so clients can poll or stream a job instead of holding an HTTP request open.
+
+Identical in-flight submissions (same kind and key) are deduplicated, failed
+jobs are retried with exponential backoff, and queued or running jobs can be
+cancelled. On shutdown, running jobs get JOB_DRAIN_TIMEOUT seconds to finish;
+jobs still running after that, and queued ones, are picked up again on the
+next start.
+
+Several worker processes may share one job store (see serve.py): a worker
+claims a queued job with a conditional update before running it, so a job
+queued in more than one process still runs once. A claimed job records its
+owner and a lease that the owner renews every JOB_LEASE_SECONDS / 3 while
+the job runs. Only jobs whose lease has expired (their worker died) are
+requeued, by whichever worker notices first, so a worker that starts next to
+live siblings does not run their jobs a second time. Queued jobs that no
+worker has touched for a lease period are adopted the same way.
+
+Cancelling marks the job cancelled in the store. The owning worker stops the
+job at once if it is local, otherwise on its next lease renewal, so a job
+running on another worker stops within JOB_LEASE_SECONDS / 3.
+
+Configuration (environment variables):
+    JOB_STORE_PATH         SQLite file (default <server dir>/.cache/jobs.sqlite3)
+    JOB_WORKERS            concurrent jobs (default 2)
+    JOB_MAX_ATTEMPTS       attempts before a job is marked failed (default 3)
+    JOB_RETRY_BACKOFF      base retry delay in seconds, doubled per attempt (default 2)
+    JOB_DRAIN_TIMEOUT      seconds running jobs may take to finish on shutdown (default 30)
+    JOB_LEASE_SECONDS      how long a running job survives its worker (default 30)
+    JOB_PROGRESS_INTERVAL  seconds between progress writes of a running job (default 1)
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from paths import cache_path
+from streaming import CrewCancelled, CrewEventRelay
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+TERMINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobStore:
+    """SQLite-backed persistence for jobs."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Other workers hold the write lock briefly; wait for it rather than fail
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT,"
+            " lease_expires REAL)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                # Stores created before leases; their running jobs count as expired
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_kind_key ON jobs (kind, key, status)")
+        self._db.commit()
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        return job
+
+    def create(self, kind, key, payload):
+        """Insert a queued job, or return the active job with the same kind and key.
+
+        Returns (job, created).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE kind = ? AND key = ? AND status IN (?, ?)"
+                " ORDER BY created_at LIMIT 1",
+                (kind, key, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                return self._row_to_job(row), False
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, key, payload, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, json.dumps(payload), QUEUED, now, now),
+            )
+            self._db.commit()
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def update(self, job_id, **fields):
+        """Set columns on a job; progress is JSON-encoded."""
+        if "progress" in fields:
+            fields["progress"] = json.dumps(fields["progress"], default=str)
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def claim(self, job_id, owner, lease):
+        """Mark a queued job as running under owner's lease.
+
+        False if it is no longer queued (e.g. another worker took it).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                (RUNNING, owner, now + lease, now, job_id, QUEUED),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id):
+        """Mark a queued or running job cancelled; False if it is unknown or already finished."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, *ACTIVE_STATUSES),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, owner, job_ids, lease):
+        """Extend owner's leases on running jobs; return the ids among job_ids that were cancelled."""
+        if not job_ids:
+            return []
+        marks = ", ".join("?" for _ in job_ids)
+        with self._lock:
+            self._db.execute(
+                f"UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = ? AND id IN ({marks})",
+                (time.time() + lease, owner, RUNNING, *job_ids),
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                f"SELECT id FROM jobs WHERE status = ? AND id IN ({marks})", (CANCELLED, *job_ids)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def recover(self, idle_before=None):
+        """Requeue running jobs whose lease expired; return their ids and those of queued jobs.
+
+        With idle_before, only queued jobs last updated before that time are
+        returned, not the ones live workers have queued or are backing off.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [row["id"] for row in self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)"
+                " ORDER BY created_at",
+                (RUNNING, now),
+            )]
+            self._db.executemany(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                [(QUEUED, now, job_id, RUNNING) for job_id in expired],
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND updated_at <= ? ORDER BY created_at",
+                (QUEUED, now if idle_before is None else idle_before),
+            ).fetchall()
+        queued = [row["id"] for row in rows]
+        return expired + [job_id for job_id in queued if job_id not in expired]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self._db.close()
+
+
+class JobQueue:
+    """Bounded asyncio worker pool running jobs from a JobStore.
+
+    handler is ``async def handler(payload, relay) -> str``; progress events the
+    handler emits through the CrewEventRelay are saved as the job's progress.
+
+    exclusive is an optional ``exclusive(payload) -> bool`` telling whether a
+    job is the only caller waiting on its work. When it returns False,
+    cancelling the job only detaches it and the shared work keeps running for
+    the other callers.
+    """
+
+    def __init__(self, store, handler, kind, workers=2, max_attempts=3, retry_backoff=2.0, drain_timeout=30.0,
+                 lease=30.0, exclusive=None, progress_interval=1.0):
+        self.store = store
+        self.handler = handler
+        self.kind = kind
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.drain_timeout = drain_timeout
+        self.lease = lease
+        self.exclusive = exclusive
+        self.progress_interval = progress_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = None
+        self._enqueued = set()
+        self._tasks = []
+        self._heartbeat = None
+        self._running = {}
+        self._draining = False
+        self.recovered = 0
+        self.remote_cancels = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        for job_id in self.store.recover():
+            self._enqueue(job_id)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._heartbeat = asyncio.ensure_future(self._renew_leases())
+
+    def _enqueue(self, job_id):
+        if job_id not in self._enqueued:
+            self._enqueued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def stop(self):
+        """Stop taking jobs, let running ones finish for up to drain_timeout, then cancel the rest.
+
+        Cancelled and still-queued jobs stay queued in the store for the next start.
+        """
+        self._draining = True
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        running = [task for task, _, _ in self._running.values()]
+        if running and self.drain_timeout > 0:
+            print(f"Job queue: draining {len(running)} running job(s) for up to {self.drain_timeout:g}s")
+            await asyncio.wait(running, timeout=self.drain_timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key, payload):
+        """Queue a job unless one with the same key is already active. Returns (job, created)."""
+        job, created = self.store.create(self.kind, key, payload)
+        if created:
+            self._enqueue(job["id"])
+        return job, created
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the updated job, or None if unknown.
+
+        A job running on another worker is stopped by that worker on its next
+        lease renewal.
+        """
+        if self.store.cancel(job_id):
+            self._stop(job_id)
+        return self.store.get(job_id)
+
+    def _stop(self, job_id):
+        running = self._running.get(job_id)
+        if running is None:
+            return
+        task, relay, payload = running
+        if self.exclusive is None or self.exclusive(payload):
+            relay.cancel()
+        task.cancel()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "owner": self.owner,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "draining": self._draining,
+            "recovered": self.recovered,
+            "remote_cancels": self.remote_cancels,
+            "jobs": self.store.counts(),
+        }
+
+    async def _renew_leases(self):
+        """Renew the leases of running jobs, stop the ones cancelled elsewhere and adopt orphans."""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            for job_id in self.store.renew(self.owner, list(self._running), self.lease):
+                self.remote_cancels += 1
+                self._stop(job_id)
+            for job_id in self.store.recover(idle_before=time.time() - self.lease):
+                if job_id not in self._enqueued:
+                    self.recovered += 1
+                self._enqueue(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            if self._draining:
+                continue
+            job = self.store.get(job_id)
+            if job is None or job["status"] != QUEUED or not self.store.claim(job_id, self.owner, self.lease):
+                continue
+            await self._run(job)
+
+    async def _run(self, job):
+        job_id = job["id"]
+        attempts = job["attempts"] + 1
+        self.store.update(job_id, status=RUNNING, attempts=attempts, error=None)
+        relay = CrewEventRelay(asyncio.get_running_loop())
+        task = asyncio.ensure_future(self.handler(job["payload"], relay))
+        self._running[job_id] = (task, relay, job["payload"])
+        progress = asyncio.ensure_future(self._record_progress(job_id, relay))
+        try:
+            result = await task
+        except CrewCancelled:
+            return
+        except asyncio.CancelledError:
+            if self.store.get(job_id)["status"] == CANCELLED:
+                return
+            # The worker is shutting down: run the job again on the next start
+            self.store.update(job_id, status=QUEUED, owner=None, lease_expires=None)
+            raise
+        except Exception as e:
+            if self.store.get(job_id)["status"] == CANCELLED:
+                return
+            if attempts < self.max_attempts:
+                delay = self.retry_backoff * 2 ** (attempts - 1)
+                self.store.update(job_id, status=QUEUED, owner=None, lease_expires=None,
+                                  error=f"{e} (retrying in {delay:.0f}s)")
+                asyncio.get_running_loop().call_later(delay, self._enqueue, job_id)
+            else:
+                self.store.update(job_id, status=FAILED, error=str(e))
+        else:
+            if self.store.get(job_id)["status"] != CANCELLED:
+                self.store.update(job_id, status=SUCCEEDED, result=result)
+        finally:
+            self._running.pop(job_id, None)
+            progress.cancel()
+
+    async def _record_progress(self, job_id, relay):
+        """Save the latest progress event, at most once per progress_interval.
+
+        A crew emits an event per step; only the latest one is kept, so the
+        events of an interval are coalesced into one write. The pending event
+        is still saved when the job ends.
+        """
+        latest = None
+        try:
+            while True:
+                latest = await relay.queue.get()
+                await asyncio.sleep(self.progress_interval)
+                while not relay.queue.empty():
+                    latest = relay.queue.get_nowait()
+                self._save_progress(job_id, latest)
+                latest = None
+        except asyncio.CancelledError:
+            while not relay.queue.empty():
+                latest = relay.queue.get_nowait()
+            if latest is not None:
+                self._save_progress(job_id, latest)
+            raise
+
+    def _save_progress(self, job_id, latest):
+        event, data = latest
+        self.store.update(job_id, progress={"event": event, **data})
+
+
+def create_job_store():
+    """Open the JobStore configured by the environment."""
+    return JobStore(cache_path("JOB_STORE_PATH", "jobs.sqlite3"))
+
+
+def create_job_queue(store, handler, kind, exclusive=None):
+    """Build a JobQueue from environment configuration."""
+    return JobQueue(
+        store,
+        handler,
+        kind,
+        workers=int(os.environ.get("JOB_WORKERS", "2")),
+        max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+        retry_backoff=float(os.environ.get("JOB_RETRY_BACKOFF", "2")),
+        drain_timeout=float(os.environ.get("JOB_DRAIN_TIMEOUT", "30")),
+        lease=float(os.environ.get("JOB_LEASE_SECONDS", "30")),
+        exclusive=exclusive,
+        progress_interval=float(os.environ.get("JOB_PROGRESS_INTERVAL", "1")),
+    )
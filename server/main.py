@@ -1,10 +1,82 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+import asyncio
+import json
+import os
+import time
+from typing import List, Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from weaviate_calibrate_companies import query_weaviate_agent
-from crew.src.company_description_retrieval_automation.crew import CompanyDescriptionRetrievalAutomationCrew
+from crew.src.company_description_retrieval_automation.batch import batch_report, iter_batch
+from agent_pool import PoolTimeout, create_agent_pool
+from concurrency import BlockingExecutor, EndpointLimiter, Overloaded
+from description_cache import create_description_cache, normalize_company_name
+from singleflight import AsyncSingleFlight
+from answer_cache import create_answer_cache
+from fast_path import create_fast_path
+from coalescing import create_prompt_coalescer
+from sessions import create_session_store, new_session_id
+from prewarm import create_prewarmer
+import collection_versions
+import instrumentation
+from company_layout import collection_layout, scope_prompt, tenant_name
+import resilience
+from instrumentation import instrument_crew, record_agent_response, span
+from streaming import CrewEventRelay, answer_chunks, sse_event, to_jsonable
+from job_queue import TERMINAL_STATUSES, create_job_queue, create_job_store
 
-app = FastAPI()
+# Per-endpoint concurrency limits; requests beyond the limit queue for up to
+# ENDPOINT_QUEUE_TIMEOUT seconds and are then rejected with 503.
+CHAT_MAX_CONCURRENCY = int(os.environ.get("CHAT_MAX_CONCURRENCY", "16"))
+COMPANY_INFO_MAX_CONCURRENCY = int(os.environ.get("COMPANY_INFO_MAX_CONCURRENCY", "4"))
+ENDPOINT_QUEUE_TIMEOUT = float(os.environ.get("ENDPOINT_QUEUE_TIMEOUT", "30"))
+# Also store newly resolved descriptions in the CompanyInfo collection
+DESCRIPTION_CACHE_WRITEBACK = os.environ.get("DESCRIPTION_CACHE_WRITEBACK", "0") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pool of connected clients/agents for the lifetime of the process;
+    # its slots connect in the background so startup does not wait on Weaviate
+    app.state.collection_layout = collection_layout()
+    app.state.agent_pool = create_agent_pool()
+    app.state.agent_pool.start()
+    app.state.chat_executor = BlockingExecutor(CHAT_MAX_CONCURRENCY, name="chat")
+    app.state.crew_executor = BlockingExecutor(COMPANY_INFO_MAX_CONCURRENCY, name="crew")
+    app.state.limiters = {
+        "chat": EndpointLimiter("/chat", CHAT_MAX_CONCURRENCY, ENDPOINT_QUEUE_TIMEOUT),
+        "company-info": EndpointLimiter("/company-info", COMPANY_INFO_MAX_CONCURRENCY, ENDPOINT_QUEUE_TIMEOUT),
+    }
+    app.state.description_cache = create_description_cache()
+    app.state.description_flights = AsyncSingleFlight()
+    app.state.answer_cache = create_answer_cache()
+    app.state.chat_coalescer = create_prompt_coalescer(run_chat_agent)
+    app.state.sessions = create_session_store()
+    app.state.fast_path = create_fast_path()
+    app.state.job_store = create_job_store()
+    app.state.company_jobs = create_job_queue(
+        app.state.job_store, company_job_handler, "company-info", exclusive=company_job_exclusive
+    )
+    await app.state.company_jobs.start()
+    # Load the crew and Weaviate modules and build the fast-path index in the
+    # background, so startup does not wait for them
+    warm_steps = [("fast_path_index", app.state.fast_path.refresh)] if app.state.fast_path else []
+    app.state.prewarm = create_prewarmer(warm_steps)
+    if app.state.prewarm is not None:
+        app.state.prewarm.start()
+    yield
+    await app.state.company_jobs.stop()
+    app.state.job_store.close()
+    app.state.chat_executor.shutdown(wait=False)
+    app.state.crew_executor.shutdown(wait=False)
+    app.state.agent_pool.close()
+    app.state.description_cache.close()
+    if app.state.answer_cache is not None:
+        app.state.answer_cache.close()
+    app.state.sessions.close()
+
+app = FastAPI(lifespan=lifespan)
+instrumentation.install(app)
 
 # Allow CORS for local dev
 app.add_middleware(
@@ -17,27 +89,416 @@ app.add_middleware(
 
 class ChatRequest(BaseModel):
     message: str
+    # Pass the session_id of an earlier response to ask a follow-up
+    session_id: Optional[str] = None
+    # Answer only from this company's data (required in the tenants layout, see company_layout.py)
+    company: Optional[str] = None
 
 class CompanyRequest(BaseModel):
     company_name: str
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
+
+class BatchCompanyRequest(BaseModel):
+    company_names: List[str]
+    concurrency: Optional[int] = Field(None, ge=1, le=COMPANY_INFO_MAX_CONCURRENCY)
+    rate: Optional[float] = Field(None, gt=0)
+
+def build_company_crew():
+    """Build the crew off the event loop; loading tools and config is blocking."""
+    # Imported on first use (or by the prewarm thread): crewai is slow to import
+    from crew.src.company_description_retrieval_automation.crew import CompanyDescriptionRetrievalAutomationCrew
+
+    resilience.install_web_guard()
+    return resilience.guard_crew(CompanyDescriptionRetrievalAutomationCrew().crew())
+
+def describe_company_directly(company_name: str):
+    """Resolve a company from its website without the crew; None if not confident. Blocking."""
+    from crew.src.company_description_retrieval_automation.tools.website_resolver import describe_company
+
+    resilience.install_web_guard()
+    return describe_company(company_name)
+
+def agent_response_text(response):
+    """Render an agent response as text (imports the Weaviate modules on first use)."""
+    from weaviate_calibrate_companies import response_text
+
+    return response_text(response)
+
+def pooled_agent_run(prompt: str, context=None, company=None):
+    """Run a prompt on a pooled agent and return the raw agent response. Blocking.
+
+    The call goes through the weaviate_agent backend (see resilience.py); a
+    pool timeout is local and does not count against the agent service.
+    """
+    return resilience.call("weaviate_agent", agent_attempt, prompt, context, company, neutral=(PoolTimeout,))
+
+def agent_attempt(prompt: str, context=None, company=None):
+    kwargs = {}
+    if context is not None:
+        kwargs["context"] = context
+    if company is not None:
+        # A tenant per company narrows the search itself; a shared layout relies on the prompt
+        if app.state.collection_layout == "tenants":
+            kwargs["tenant"] = tenant_name(company)
+        else:
+            prompt = scope_prompt(prompt, company)
+    with app.state.agent_pool.acquire() as agent:
+        start = time.perf_counter()
+        with span("agent_run"):
+            response = agent.run(prompt, **kwargs)
+        record_agent_response(response, time.perf_counter() - start)
+        return response
+
+async def run_chat_agent(prompt: str, context=None, company=None):
+    """Run a prompt on a pooled agent under the /chat limiter; returns the raw response."""
+    async with app.state.limiters["chat"]:
+        return await app.state.chat_executor.run(pooled_agent_run, prompt, context, company)
+
+async def ask_agent(prompt: str, context=None, company=None):
+    """Run a prompt through the coalescer (if enabled); returns the raw response.
+
+    Follow-ups with a context are specific to their session and are never
+    coalesced, nor are company-scoped prompts.
+    """
+    coalescer = app.state.chat_coalescer
+    if coalescer is None or context is not None or company is not None:
+        return await run_chat_agent(prompt, context, company)
+    return await coalescer.ask(prompt)
+
+def check_company_scope(company: Optional[str]):
+    """Reject unscoped questions when multi-tenant collections cannot be searched without a tenant."""
+    if company is None and app.state.collection_layout == "tenants":
+        raise HTTPException(status_code=400, detail="company is required with COMPANY_COLLECTION_LAYOUT=tenants")
+
+def local_chat_answer(message: str, context, company=None):
+    """Answer from the fast path or the answer cache without calling the agent.
+
+    Returns (response object or None, cached answer string or None). Follow-ups
+    with a stored context always go to the agent; a session without one (e.g.
+    whose first answer came from the cache) is served like a new question.
+    The fast path searches every company, so it only serves unscoped questions.
+    """
+    if context is not None:
+        return None, None
+    fast_path = app.state.fast_path
+    if fast_path is not None and company is None:
+        with span("fast_path"):
+            local = fast_path.route(message)
+        if local is not None:
+            return local, None
+    answer_cache = app.state.answer_cache
+    if answer_cache is not None:
+        with span("answer_cache"):
+            return None, answer_cache.lookup(message, scope=company)
+    return None, None
+
+def write_back_description(company_name: str, description: str):
+    """Best-effort insert of a new description into CompanyInfo. Blocking."""
+    from weaviate_calibrate_companies import add_company_description
+
+    try:
+        with app.state.agent_pool.acquire_slot() as slot:
+            add_company_description(slot.client, company_name, description)
+    except Exception as e:
+        print(f"Could not write back description for {company_name}: {e}")
+
+async def resolve_company_description(company_name: str, relay=None) -> str:
+    """Run the crew for a cache miss and store its result.
+
+    If a CrewEventRelay is given, the crew's progress is reported through it.
+    """
+    async with app.state.limiters["company-info"]:
+        with span("direct_resolve"):
+            direct = await app.state.crew_executor.run(describe_company_directly, company_name)
+        if direct is not None:
+            if relay is not None:
+                relay.emit("status", {"stage": "resolved_directly", "url": direct.url,
+                                      "source": direct.source, "confidence": direct.confidence})
+            description = direct.description
+        else:
+            with span("crew_build"):
+                crew = await app.state.crew_executor.run(build_company_crew)
+            if relay is not None:
+                relay.attach(crew)
+                relay.emit("status", {"stage": "website_search_started"})
+            instrument_crew(crew)
+            with span("crew_kickoff"):
+                result = await crew.kickoff_async(inputs={'company_name': company_name})
+            description = str(result)
+    app.state.description_cache.put(company_name, description)
+    if DESCRIPTION_CACHE_WRITEBACK:
+        await app.state.crew_executor.run(write_back_description, company_name, description)
+    return description
 
 @app.post("/company-info")
 async def get_company_description(request: CompanyRequest):
     try:
-        crew = CompanyDescriptionRetrievalAutomationCrew()
-        result = crew.crew().kickoff(inputs={'company_name': request.company_name})
-        return {"description": result}
+        with span("description_cache"):
+            description = app.state.description_cache.get(request.company_name)
+        if description is not None:
+            return {"description": description, "cached": True}
+        # Concurrent misses for the same company share one crew run
+        description = await app.state.description_flights.do(
+            normalize_company_name(request.company_name),
+            lambda: resolve_company_description(request.company_name),
+        )
+        return {"description": description, "cached": False}
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         return {"error": str(e)}
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
-    resp = query_weaviate_agent(req.message)
-    return ChatResponse(response=resp)
+    check_company_scope(req.company)
+    sessions = app.state.sessions
+    session_id = req.session_id or new_session_id()
+    context = sessions.context(req.session_id) if req.session_id else None
+    local, cached = local_chat_answer(req.message, context, req.company)
+    if cached is not None:
+        return ChatResponse(response=cached, session_id=session_id)
+    if local is not None:
+        sessions.record(session_id, local)
+        return ChatResponse(response=str(local), session_id=session_id)
+    # Taken before the agent runs, so a concurrent ingestion is not missed
+    generations = collection_versions.generations()
+    try:
+        response = await ask_agent(req.message, context, req.company)
+        resp = agent_response_text(response)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        return ChatResponse(response=f"Error: {str(e)}", session_id=session_id)
+    sessions.record(session_id, response)
+    answer_cache = app.state.answer_cache
+    if answer_cache is not None and context is None and not resp.startswith("Error:"):
+        answer_cache.store(req.message, resp, getattr(response, "collection_names", None), generations,
+                           scope=req.company)
+    return ChatResponse(response=resp, session_id=session_id)
+
+async def timed_company_resolver(company_name: str):
+    """Resolve a company through the cache and crew; returns (description, stage timings)."""
+    description = app.state.description_cache.get(company_name)
+    if description is not None:
+        return description, {}
+    # Only the stage timings are read, so the relay queues no events
+    relay = CrewEventRelay(asyncio.get_running_loop(), events=False)
+    description = await app.state.description_flights.do(
+        normalize_company_name(company_name),
+        lambda: resolve_company_description(company_name, relay),
+    )
+    return description, relay.timer.timings
+
+async def batch_records(request: BatchCompanyRequest):
+    """Yield one JSON line per company as it completes, then a summary line."""
+    records = []
+    start = time.perf_counter()
+    async for record in iter_batch(
+        request.company_names,
+        timed_company_resolver,
+        concurrency=request.concurrency or COMPANY_INFO_MAX_CONCURRENCY,
+        rate=request.rate,
+    ):
+        records.append(record)
+        yield json.dumps(record) + "\n"
+    yield json.dumps({"summary": batch_report(records, time.perf_counter() - start)}) + "\n"
+
+@app.post("/company-info/batch")
+async def batch_company_descriptions(request: BatchCompanyRequest):
+    return StreamingResponse(batch_records(request), media_type="application/x-ndjson")
+
+async def company_job_handler(payload, relay):
+    """Resolve one company for the background job queue."""
+    company_name = payload["company_name"]
+    description = app.state.description_cache.get(company_name)
+    if description is not None:
+        return description
+    return await app.state.description_flights.do(
+        normalize_company_name(company_name),
+        lambda: resolve_company_description(company_name, relay),
+    )
+
+def company_job_exclusive(payload):
+    """Whether a job is the only caller waiting on its company's crew run, so cancelling may stop it."""
+    return app.state.description_flights.waiters(normalize_company_name(payload["company_name"])) <= 1
+
+@app.post("/company-info/jobs")
+async def submit_company_job(request: CompanyRequest):
+    job, created = app.state.company_jobs.submit(
+        normalize_company_name(request.company_name),
+        {"company_name": request.company_name},
+    )
+    return {"job": job, "deduplicated": not created}
+
+@app.get("/company-info/jobs/{job_id}")
+async def get_company_job(job_id: str):
+    job = app.state.job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job": job}
+
+@app.delete("/company-info/jobs/{job_id}")
+async def cancel_company_job(job_id: str):
+    job = app.state.company_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job": job}
+
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "0.5"))
+
+async def job_events(job_id: str):
+    """Yield SSE events whenever a job's status or progress changes."""
+    last = None
+    while True:
+        job = app.state.job_store.get(job_id)
+        if job is None:
+            yield sse_event("error", {"error": "Job not found", "status": 404})
+            return
+        current = (job["status"], job["progress"])
+        if current != last:
+            yield sse_event("status", {"status": job["status"], "progress": job["progress"]})
+            last = current
+        if job["status"] in TERMINAL_STATUSES:
+            yield sse_event("done", {"job": job})
+            return
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+@app.get("/company-info/jobs/{job_id}/events")
+async def stream_company_job(job_id: str):
+    return StreamingResponse(job_events(job_id), media_type="text/event-stream", headers=SSE_HEADERS)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+async def company_description_events(company_name: str):
+    """Yield SSE events for one company lookup as the crew makes progress."""
+    yield sse_event("status", {"stage": "started", "company_name": company_name})
+    description = app.state.description_cache.get(company_name)
+    if description is not None:
+        yield sse_event("description", {"description": description, "cached": True})
+        yield sse_event("done", {})
+        return
+
+    key = normalize_company_name(company_name)
+    flights = app.state.description_flights
+    relay = CrewEventRelay(asyncio.get_running_loop())
+    flight = asyncio.ensure_future(
+        flights.do(key, lambda: resolve_company_description(company_name, relay))
+    )
+    try:
+        while not flight.done():
+            next_event = asyncio.ensure_future(relay.queue.get())
+            await asyncio.wait({next_event, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield sse_event(*next_event.result())
+            else:
+                next_event.cancel()
+        while not relay.queue.empty():
+            yield sse_event(*relay.queue.get_nowait())
+        try:
+            description = flight.result()
+        except Overloaded as e:
+            yield sse_event("error", {"error": str(e), "status": 503})
+            return
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        yield sse_event("description", {"description": description, "cached": False})
+        yield sse_event("done", {})
+    finally:
+        if not flight.done():
+            # The client went away; stop the crew unless others share its result
+            if flights.waiters(key) <= 1:
+                relay.cancel()
+            flight.cancel()
+
+async def chat_events(message: str, session_id: Optional[str] = None, company: Optional[str] = None):
+    """Yield SSE events for one chat prompt: status, searches, sources, answer tokens."""
+    sessions = app.state.sessions
+    context = sessions.context(session_id) if session_id else None
+    session_id = session_id or new_session_id()
+    local, cached = local_chat_answer(message, context, company)
+    if cached is not None:
+        yield sse_event("done", {"response": cached, "cached": True, "session_id": session_id})
+        return
+    if local is not None:
+        sessions.record(session_id, local)
+        yield sse_event("status", {"stage": "fast_path"})
+        yield sse_event("sources", {"sources": local.sources})
+        yield sse_event("token", {"text": local.final_answer})
+        yield sse_event("done", {"response": str(local), "cached": False, "fast_path": True,
+                                 "session_id": session_id})
+        return
+
+    yield sse_event("status", {"stage": "retrieving", "follow_up": context is not None})
+    generations = collection_versions.generations()
+    try:
+        response = await ask_agent(message, context, company)
+    except Overloaded as e:
+        yield sse_event("error", {"error": str(e), "status": 503})
+        return
+    except Exception as e:
+        yield sse_event("error", {"error": f"Error: {str(e)}"})
+        return
+
+    sessions.record(session_id, response)
+    yield sse_event("searches", {"searches": to_jsonable(getattr(response, "searches", []))})
+    yield sse_event("sources", {"sources": to_jsonable(getattr(response, "sources", []))})
+    for chunk in answer_chunks(getattr(response, "final_answer", str(response))):
+        yield sse_event("token", {"text": chunk})
+        await asyncio.sleep(0)
+    resp = str(response)
+    answer_cache = app.state.answer_cache
+    if answer_cache is not None and context is None and not resp.startswith("Error:"):
+        answer_cache.store(message, resp, getattr(response, "collection_names", None), generations,
+                           scope=company)
+    yield sse_event("done", {"response": resp, "cached": False, "session_id": session_id})
+
+@app.post("/company-info/stream")
+async def stream_company_description(request: CompanyRequest):
+    return StreamingResponse(
+        company_description_events(request.company_name),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@app.post("/chat/stream")
+async def stream_chat(req: ChatRequest):
+    check_company_scope(req.company)
+    return StreamingResponse(
+        chat_events(req.message, req.session_id, req.company), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+@app.delete("/chat/sessions/{session_id}")
+async def end_chat_session(session_id: str):
+    if not app.state.sessions.end(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "ended": True}
+
+@app.get("/health/pool")
+async def pool_health():
+    return {
+        "worker_pid": os.getpid(),
+        "agent_pool": app.state.agent_pool.stats(),
+        "limiters": {name: limiter.stats() for name, limiter in app.state.limiters.items()},
+        "description_cache": app.state.description_cache.stats(),
+        "description_flights": app.state.description_flights.stats(),
+        "answer_cache": app.state.answer_cache.stats() if app.state.answer_cache else None,
+        "fast_path": app.state.fast_path.stats() if app.state.fast_path else None,
+        "chat_coalescer": app.state.chat_coalescer.stats() if app.state.chat_coalescer else None,
+        "sessions": app.state.sessions.stats(),
+        "company_jobs": app.state.company_jobs.stats(),
+        "prewarm": app.state.prewarm.stats() if app.state.prewarm else None,
+        "backends": resilience.stats(),
+        "collections": collection_versions.get_manifest().stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
-    return {"message": "Hello World"} 
\ No newline at end of file
+    return {"message": "Hello World"} 
@@ -0,0 +1,22 @@
+"""
+Locations of the server's on-disk caches and stores.
+
+Every cache defaults to a file under <server dir>/.cache, and relative paths
+given in the environment are resolved against the server directory as
+well, so the API workers, serve.py and the ingestion scripts share the same
+files wherever they are started from. Absolute paths are used as given.
+"""
+import os
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SERVER_DIR, ".cache")
+
+
+def server_path(path):
+    """Resolve a configured path against the server directory."""
+    return os.path.join(SERVER_DIR, path)
+
+
+def cache_path(env_name, filename):
+    """The path set in env_name, or CACHE_DIR/filename, resolved against the server directory."""
+    return server_path(os.environ.get(env_name) or os.path.join(CACHE_DIR, filename))
@@ -0,0 +1,75 @@
+"""
+Background prewarming of heavy subsystems after startup.
+
+main.py does not import crewai/crewai_tools (the crew) or the Weaviate client
+and agents (weaviate_calibrate_companies) at module load; together they take
+several seconds to import. The server becomes ready without them, and a
+Prewarmer thread then imports them and builds the fast-path index, so the
+first /chat or /company-info request usually finds everything loaded. A
+request that arrives before a step has finished simply performs the import
+(or index build) itself; Python's import lock makes both paths safe.
+
+Configuration (environment variables):
+    PREWARM_ENABLED  "1" (default) or "0" to load everything on first use only
+"""
+import importlib
+import os
+import threading
+import time
+
+# Modules main.py imports lazily, in the order they are prewarmed
+HEAVY_MODULES = (
+    "weaviate_calibrate_companies",
+    "crew.src.company_description_retrieval_automation.crew",
+)
+
+
+def import_step(module_name):
+    """A prewarm step importing one module."""
+    return f"import:{module_name}", lambda: importlib.import_module(module_name)
+
+
+class Prewarmer:
+    """Runs (name, fn) steps one after another on a daemon thread."""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.timings = {}
+        self.errors = {}
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            for name, fn in self.steps:
+                start = time.perf_counter()
+                try:
+                    fn()
+                except Exception as e:
+                    print(f"Prewarm: {name} failed: {e}")
+                    self.errors[name] = str(e)
+                self.timings[name] = round(time.perf_counter() - start, 3)
+        finally:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until every step has run; returns whether it finished in time."""
+        return self._done.wait(timeout)
+
+    def stats(self):
+        return {
+            "done": self._done.is_set(),
+            "timings_s": dict(self.timings),
+            "errors": dict(self.errors),
+        }
+
+
+def create_prewarmer(extra_steps=()):
+    """Build the Prewarmer for the heavy modules plus extra_steps, or None if disabled."""
+    if os.environ.get("PREWARM_ENABLED", "1") != "1":
+        return None
+    return Prewarmer([*extra_steps, *(import_step(name) for name in HEAVY_MODULES)])
@@ -0,0 +1,524 @@
+"""
+Per-backend rate limits, adaptive concurrency, circuit breakers and hedged retries.
+
+Every call to an external backend goes through ``call(backend, fn, ...)``.
+Per backend, in order, the call:
+
+- fails fast with BackendUnavailable while the backend's circuit is open
+  (after FAILURE_THRESHOLD consecutive failures, for RESET_TIMEOUT seconds,
+  then a single probe call decides whether it closes again);
+- takes a token from the backend's token bucket (RATE calls/s, BURST deep);
+- waits for a slot under an adaptive concurrency limit: the limit grows by
+  about one per round of successful calls and shrinks by 20% on errors,
+  between 1 and MAX_CONCURRENCY; with LATENCY_TOLERANCE set it also shrinks
+  by 10% when a call takes longer than that multiple of the observed
+  baseline (off for the agent and the LLM, whose latency varies by an order
+  of magnitude between healthy calls);
+- is retried up to RETRIES times with exponential backoff if it raises a
+  transient error (a timeout, a connection error, HTTP 429 or 5xx; see
+  is_transient) and, with HEDGE_AFTER set, hedged: a second attempt starts when the first has
+  not returned after HEDGE_AFTER seconds, and the first success wins.
+
+A caller that cannot get a token or a slot within ACQUIRE_TIMEOUT seconds
+gets BackendUnavailable too. BackendUnavailable is an Overloaded, so the
+endpoints answer it with 503 like their own concurrency limits.
+
+Backends:
+    weaviate_agent   QueryAgent.run for /chat (main.py)
+    weaviate_import  batch import passes (importer.py)
+    llm              the crew's LLM calls (guard_crew)
+    web              crew page fetches, one limit/breaker per host (install_web_guard)
+
+Each backend is configured by RESILIENCE_<BACKEND>_<SETTING> environment
+variables, e.g. RESILIENCE_WEB_RATE=2 or RESILIENCE_LLM_MAX_CONCURRENCY=8;
+settings missing from the environment take the defaults in DEFAULTS. State
+is reported under "backends" on /health/pool and as backend_* series on
+/metrics; call durations are recorded as the backend_call stage.
+
+Configuration (environment variables):
+    RESILIENCE_ENABLED  "1" (default) or "0" to call backends directly
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from concurrency import Overloaded
+from instrumentation import record, register_collector
+
+# rate: calls/s (0 = unlimited); hedge_after: seconds (0 = no hedging);
+# latency_tolerance: multiple of the baseline latency (0 = errors alone adjust the limit)
+DEFAULTS = {
+    "weaviate_agent": dict(rate=0, burst=32, max_concurrency=32, failure_threshold=5, reset_timeout=15,
+                           retries=1, retry_backoff=0.2, hedge_after=0, acquire_timeout=30,
+                           latency_tolerance=0.0),
+    "weaviate_import": dict(rate=0, burst=4, max_concurrency=4, failure_threshold=3, reset_timeout=30,
+                            retries=0, retry_backoff=1, hedge_after=0, acquire_timeout=300,
+                            latency_tolerance=2.0),
+    "llm": dict(rate=0, burst=16, max_concurrency=16, failure_threshold=5, reset_timeout=30,
+                retries=2, retry_backoff=1, hedge_after=0, acquire_timeout=60, latency_tolerance=0.0),
+    "web": dict(rate=2, burst=4, max_concurrency=4, failure_threshold=3, reset_timeout=60,
+                retries=1, retry_backoff=0.5, hedge_after=0, acquire_timeout=15, latency_tolerance=2.0),
+}
+# HTTP statuses worth retrying; any other status says the request itself is wrong
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Exception class names (anywhere in the MRO) of client libraries' timeout and connection errors
+TRANSIENT_ERRORS = {"TimeoutException", "TransportError", "Timeout", "ConnectionError",
+                    "WeaviateConnectionError", "WeaviateTimeoutError", "APIConnectionError"}
+# Per-host state kept for at most this many hosts (least recently used are dropped)
+MAX_KEYS = 1024
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class BackendUnavailable(Overloaded):
+    """Raised without calling the backend: circuit open, rate limited or at its concurrency limit."""
+
+
+def is_transient(error):
+    """Whether a failed call may succeed if repeated: timeouts, connection errors, 429 and 5xx.
+
+    Anything else (a 4xx, a validation error, a bare Exception with no status)
+    is not retried, since repeating it would repeat a costly call for nothing.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; rate 0 means unlimited."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, timeout):
+        """Take one token, waiting up to timeout seconds; returns False if none came."""
+        if not self.rate:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                delay = (1 - self._tokens) / self.rate
+            if now + delay > deadline:
+                return False
+            time.sleep(delay)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted from observed latency (additive increase, multiplicative decrease)."""
+
+    def __init__(self, max_limit, min_limit=1, tolerance=2.0, smoothing=0.05):
+        # tolerance 0: only errors shrink the limit, latency is just tracked
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.limit = float(max(min_limit, max_limit // 2))
+        self.baseline = None
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency=None, ok=True):
+        """Return a slot; latency is None for calls that say nothing about the backend."""
+        with self._cond:
+            self.in_flight -= 1
+            if latency is not None:
+                if not ok:
+                    self.limit = max(self.min_limit, self.limit * 0.8)
+                else:
+                    if self.baseline is None or latency < self.baseline:
+                        self.baseline = latency
+                    else:
+                        # Let the baseline follow a backend that got slower for good
+                        self.baseline += self.smoothing * (latency - self.baseline)
+                    if not self.tolerance or latency <= self.baseline * self.tolerance:
+                        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    else:
+                        self.limit = max(self.min_limit, self.limit * 0.9)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after reset_timeout one probe call may close it again."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        return self.state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only one probe at a time may."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def cancel(self):
+        """Forget an allowed call that ended without telling anything about the backend."""
+        with self._lock:
+            self._probing = False
+
+
+class Backend:
+    """Rate limit, adaptive concurrency limit and circuit breaker for one backend (or host)."""
+
+    def __init__(self, name, rate=0, burst=1, max_concurrency=16, failure_threshold=5, reset_timeout=30,
+                 retries=0, retry_backoff=0.5, hedge_after=0, acquire_timeout=30, latency_tolerance=2.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveLimiter(max_concurrency, tolerance=latency_tolerance)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge_after = hedge_after
+        self.acquire_timeout = acquire_timeout
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.rejected = {"circuit_open": 0, "rate_limited": 0, "concurrency": 0}
+
+    def call(self, fn, *args, neutral=(), retries=None, **kwargs):
+        """Call fn(*args, **kwargs) under this backend's limits, with retries and hedging.
+
+        Exceptions listed in `neutral` (e.g. a local pool timeout) are raised
+        as they are, without counting against the backend or being retried.
+        `retries` overrides the backend's setting, e.g. 0 for calls that
+        consume an iterator.
+        """
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                if self.hedge_after:
+                    return self._hedged(fn, args, kwargs, neutral)
+                return self._attempt(fn, args, kwargs, neutral)
+            except BackendUnavailable:
+                raise
+            except neutral:
+                raise
+            except Exception as e:
+                if attempt == retries or self.breaker.is_open() or not is_transient(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.0))
+
+    def _reject(self, reason, message):
+        with self._lock:
+            self.rejected[reason] += 1
+        raise BackendUnavailable(f"{self.name}: {message}")
+
+    def _attempt(self, fn, args, kwargs, neutral):
+        # Ask the breaker first, so a rejected call costs no token or slot
+        if not self.breaker.allow():
+            self._reject("circuit_open", "circuit is open after repeated failures")
+        if not self.bucket.take(self.acquire_timeout):
+            self.breaker.cancel()
+            self._reject("rate_limited", f"rate limit of {self.bucket.rate}/s exceeded")
+        if not self.limiter.acquire(self.acquire_timeout):
+            self.breaker.cancel()
+            self._reject("concurrency", f"at its concurrency limit ({int(self.limiter.limit)})")
+        with self._lock:
+            self.calls += 1
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except neutral:
+            self.limiter.release()
+            self.breaker.cancel()
+            raise
+        except Exception:
+            self.limiter.release(time.perf_counter() - start, ok=False)
+            self.breaker.failure()
+            with self._lock:
+                self.failures += 1
+            raise
+        latency = time.perf_counter() - start
+        self.limiter.release(latency)
+        self.breaker.success()
+        record("backend_call", latency, self.name)
+        return result
+
+    def _executor(self):
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * self.limiter.max_limit, thread_name_prefix=f"hedge-{self.name}"
+                )
+            return self._hedge_executor
+
+    def _submit(self, fn, args, kwargs, neutral):
+        # Each attempt runs in its own copy of the caller's context (request trace)
+        return self._executor().submit(contextvars.copy_context().run, self._attempt, fn, args, kwargs, neutral)
+
+    def _hedged(self, fn, args, kwargs, neutral):
+        """Run an attempt; start a second one if the first is slow and return the first success."""
+        first = self._submit(fn, args, kwargs, neutral)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done or self.breaker.is_open():
+            return first.result()
+        with self._lock:
+            self.hedged += 1
+        second = self._submit(fn, args, kwargs, neutral)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    # The slower attempt finishes in the background; its result is dropped
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.breaker.state,
+                "concurrency_limit": round(self.limiter.limit, 2),
+                "in_flight": self.limiter.in_flight,
+                "baseline_latency_s": round(self.limiter.baseline, 4) if self.limiter.baseline else None,
+                "calls": self.calls,
+                "failures": self.failures,
+                "retried": self.retried,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "circuit_opened": self.breaker.opened,
+                "rejected": dict(self.rejected),
+            }
+
+
+def backend_settings(name):
+    """DEFAULTS for a backend, overridden by its RESILIENCE_<NAME>_<SETTING> variables."""
+    settings = dict(DEFAULTS.get(name, DEFAULTS["llm"]))
+    for setting, default in settings.items():
+        value = os.environ.get(f"RESILIENCE_{name.upper()}_{setting.upper()}")
+        if value is not None:
+            settings[setting] = type(default)(value)
+    return settings
+
+
+class BackendGroup:
+    """The Backend of one backend name, or one per key (host) for keyed backends."""
+
+    def __init__(self, name, max_keys=MAX_KEYS):
+        self.name = name
+        self.settings = backend_settings(name)
+        self.max_keys = max_keys
+        self._backends = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key=""):
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                backend = self._backends[key] = Backend(f"{self.name}:{key}" if key else self.name, **self.settings)
+                while len(self._backends) > self.max_keys:
+                    self._backends.popitem(last=False)
+            else:
+                self._backends.move_to_end(key)
+            return backend
+
+    def stats(self):
+        with self._lock:
+            backends = list(self._backends.values())
+        if len(backends) == 1 and backends[0].name == self.name:
+            return backends[0].stats()
+        totals = {"keys": len(backends), "states": {CLOSED: 0, HALF_OPEN: 0, OPEN: 0},
+                  "concurrency_limit": 0.0, "in_flight": 0, "calls": 0, "failures": 0, "retried": 0,
+                  "hedged": 0, "hedge_wins": 0, "circuit_opened": 0,
+                  "rejected": {"circuit_open": 0, "rate_limited": 0, "concurrency": 0}}
+        for backend in backends:
+            stats = backend.stats()
+            totals["states"][stats["state"]] += 1
+            for field in ("concurrency_limit", "in_flight", "calls", "failures", "retried",
+                          "hedged", "hedge_wins", "circuit_opened"):
+                totals[field] += stats[field]
+            for reason, count in stats["rejected"].items():
+                totals["rejected"][reason] += count
+        totals["concurrency_limit"] = round(totals["concurrency_limit"], 2)
+        return totals
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get("RESILIENCE_ENABLED", "1") == "1"
+
+
+def get_backend(name, key=""):
+    """Return the process-wide Backend for a backend name (and key, e.g. a host)."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = BackendGroup(name)
+    return group.get(key)
+
+
+def call(name, fn, *args, key="", neutral=(), retries=None, **kwargs):
+    """Call fn(*args, **kwargs) through the named backend's resilience layer."""
+    if not enabled():
+        return fn(*args, **kwargs)
+    return get_backend(name, key).call(fn, *args, neutral=neutral, retries=retries, **kwargs)
+
+
+def stats():
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: group.stats() for name, group in sorted(groups.items())}
+
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def render_metrics():
+    """backend_* gauges and counters in the Prometheus text format."""
+    series = {
+        "backend_concurrency_limit": ("gauge", "Current adaptive concurrency limit.", []),
+        "backend_in_flight": ("gauge", "Calls currently running.", []),
+        "backend_open_circuits": ("gauge", "Circuits open or half-open (per host for keyed backends).", []),
+        "backend_calls_total": ("counter", "Calls made to the backend.", []),
+        "backend_failures_total": ("counter", "Calls that raised.", []),
+        "backend_retries_total": ("counter", "Retried calls.", []),
+        "backend_hedges_total": ("counter", "Hedge attempts started.", []),
+        "backend_rejected_total": ("counter", "Calls rejected without reaching the backend.", []),
+    }
+    for name, group in stats().items():
+        label = f'backend="{name}"'
+        states = group.get("states") or {group["state"]: 1}
+        series["backend_concurrency_limit"][2].append(f"{{{label}}} {group['concurrency_limit']}")
+        series["backend_in_flight"][2].append(f"{{{label}}} {group['in_flight']}")
+        series["backend_open_circuits"][2].append(
+            f"{{{label}}} {states.get(OPEN, 0) + states.get(HALF_OPEN, 0)}"
+        )
+        for metric, field in (("backend_calls_total", "calls"), ("backend_failures_total", "failures"),
+                              ("backend_retries_total", "retried"), ("backend_hedges_total", "hedged")):
+            series[metric][2].append(f"{{{label}}} {group[field]}")
+        for reason, count in group["rejected"].items():
+            series["backend_rejected_total"][2].append(f'{{{label},reason="{reason}"}} {count}')
+    lines = []
+    for metric, (kind, help_text, samples) in series.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{sample}" for sample in samples]
+    return "\n".join(lines)
+
+
+register_collector(render_metrics)
+
+
+class RetryableStatus(Exception):
+    """A 429 or 5xx response, raised so the web backend counts and retries it."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+
+def _checked_get(get, *args, **kwargs):
+    response = get(*args, **kwargs)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableStatus(response)
+    return response
+
+
+def web_guard(url, get, *args, **kwargs):
+    """Page cache fetch guard: one web backend per host; the last 429/5xx response is returned."""
+    from urllib.parse import urlparse
+
+    try:
+        return call("web", _checked_get, get, *args, key=urlparse(url).netloc, **kwargs)
+    except RetryableStatus as e:
+        return e.response
+
+
+def install_web_guard():
+    """Route the crew's page fetches (page_cache.PageCache) through the web backend."""
+    from crew.src.company_description_retrieval_automation.tools import page_cache
+
+    page_cache.set_fetch_guard(web_guard if enabled() else None)
+
+
+def guard_crew(crew):
+    """Route the LLM calls of a built crew's agents through the llm backend."""
+    if not enabled():
+        return crew
+    for agent in crew.agents:
+        llm = getattr(agent, "llm", None)
+        if llm is None or getattr(llm, "_resilience_guarded", False):
+            continue
+        unguarded = llm.call
+
+        def guarded_call(*args, _call=unguarded, **kwargs):
+            return call("llm", _call, *args, **kwargs)
+
+        llm.call = guarded_call
+        llm._resilience_guarded = True
+    return crew
@@ -0,0 +1,77 @@
+"""
+Production serving mode: uvicorn with several worker processes.
+
+One worker is limited by the GIL and by blocking agent and crew calls, so
+this runs SERVER_WORKERS processes behind one port. Every worker runs the
+full app with its own agent pool, executors, coalescer and in-memory cache
+tiers; AGENT_POOL_SIZE, CHAT_MAX_CONCURRENCY and the other pool and limit
+settings are therefore per worker.
+
+Results are shared between workers through SQLite files (WAL mode):
+    - the description cache's disk tier (DESCRIPTION_CACHE_PATH, already shared)
+    - the answer cache (ANSWER_CACHE_SHARED_PATH, default
+      <server dir>/.cache/answers.sqlite3)
+    - /chat sessions (SESSION_STORE_PATH, default
+      <server dir>/.cache/sessions.sqlite3), so a follow-up works whichever
+      worker receives it
+    - background jobs (JOB_STORE_PATH), claimed by one worker at a time under
+      a renewed lease; a dead worker's jobs are requeued once the lease
+      (JOB_LEASE_SECONDS) expires, and a cancel reaches the owning worker
+
+On SIGTERM or Ctrl-C, uvicorn stops accepting connections and gives
+in-flight requests up to SERVER_DRAIN_TIMEOUT seconds; each worker's
+shutdown then lets running crew jobs finish for up to JOB_DRAIN_TIMEOUT
+seconds and leaves unfinished ones queued for the next start.
+
+/metrics reports every worker: each one writes a snapshot of its metrics to
+METRICS_MULTIPROC_DIR (default <server dir>/.cache/metrics, cleared on
+start) and the worker serving /metrics merges them. /health/pool reports
+the worker that served the request.
+
+Configuration (environment variables):
+    SERVER_HOST           bind address (default 0.0.0.0)
+    SERVER_PORT           port (default 8000)
+    SERVER_WORKERS        worker processes (default: CPU count, at most 4)
+    SERVER_DRAIN_TIMEOUT  seconds to wait for in-flight requests on shutdown (default 30)
+
+Usage (from the server directory):
+    SERVER_WORKERS=4 python serve.py
+"""
+import glob
+import os
+
+import uvicorn
+
+from paths import CACHE_DIR
+
+
+def configure_shared_tier(workers):
+    """Default the cross-worker cache paths when running more than one worker."""
+    if workers > 1:
+        os.environ.setdefault("ANSWER_CACHE_SHARED_PATH", os.path.join(CACHE_DIR, "answers.sqlite3"))
+        os.environ.setdefault("SESSION_STORE_PATH", os.path.join(CACHE_DIR, "sessions.sqlite3"))
+        metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(CACHE_DIR, "metrics"))
+        # Snapshots of a previous run would be added to this run's counts
+        for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+            os.remove(path)
+
+
+def main():
+    workers = int(os.environ.get("SERVER_WORKERS", str(min(4, os.cpu_count() or 1))))
+    host = os.environ.get("SERVER_HOST", "0.0.0.0")
+    port = int(os.environ.get("SERVER_PORT", "8000"))
+    drain_timeout = float(os.environ.get("SERVER_DRAIN_TIMEOUT", "30"))
+    configure_shared_tier(workers)
+    print(f"Serving on {host}:{port} with {workers} worker(s), "
+          f"{os.environ.get('AGENT_POOL_SIZE', '4')} agent client(s) each")
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=drain_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
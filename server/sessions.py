@@ -0,0 +1,272 @@
+"""
+Server-side conversation sessions for /chat follow-ups.
+
+Each session keeps the latest agent response, which is what QueryAgent.run
+accepts as ``context=``: the agent receives the previous answer together with
+its searches, so a follow-up such as "and who founded it?" builds on the
+earlier retrieval instead of starting from scratch.
+
+Responses are stored compactly: the response's JSON (pydantic model_dump, or
+the attributes of a look-alike such as the stub response) is zlib-compressed.
+If a response is larger than SESSION_MAX_BYTES, the searches and sources it
+carries are trimmed to the first few, and dropped entirely if still too
+large. The stored type is a name from RESPONSE_TYPES, never a module path,
+so a tampered session file cannot make the server import anything else.
+Sessions expire after SESSION_TTL seconds of inactivity (reads count) and
+the least recently used ones are evicted beyond SESSION_MAX_SESSIONS.
+
+In-memory sessions belong to one process. With several worker processes a
+follow-up may reach a different worker, so SESSION_STORE_PATH (set by
+serve.py in that mode) keeps the sessions in a SQLite file every worker
+shares instead.
+
+Configuration (environment variables):
+    SESSION_MAX_SESSIONS  sessions kept in memory (default 1000)
+    SESSION_TTL           seconds of inactivity before a session expires (default 1800)
+    SESSION_MAX_BYTES     compressed size limit per session (default 65536)
+    SESSION_STORE_PATH    SQLite file shared between worker processes (default: in memory)
+"""
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+from paths import server_path
+
+# Searches per group and sources kept when a response has to be trimmed
+TRIMMED_SEARCH_RESULTS = 3
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+# Response classes a session may hold: stored name -> (module, class name)
+RESPONSE_TYPES = {
+    "QueryAgentResponse": ("weaviate.agents.classes", "QueryAgentResponse"),
+    "StubAgentResponse": ("stub_backend", "StubAgentResponse"),
+    "LocalAnswer": ("fast_path", "LocalAnswer"),
+}
+
+
+def _type_name(obj):
+    name = type(obj).__name__
+    if name not in RESPONSE_TYPES:
+        raise TypeError(f"Cannot store a {name} in a session")
+    return name
+
+
+def _response_data(response):
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    return dict(vars(response))
+
+
+def _trim(data, keep):
+    """Return a copy of response data with at most `keep` searches per group and sources."""
+    data = dict(data)
+    data["searches"] = [list(group)[:keep] for group in data.get("searches") or []]
+    data["sources"] = list(data.get("sources") or [])[:keep]
+    return data
+
+
+def encode_response(response, max_bytes=None):
+    """Serialize an agent response to compressed JSON, trimming it to max_bytes if possible."""
+    data = _response_data(response)
+    for keep in (None, TRIMMED_SEARCH_RESULTS, 0):
+        candidate = data if keep is None else _trim(data, keep)
+        payload = json.dumps({"type": _type_name(response), "data": candidate},
+                             separators=(",", ":"), default=str)
+        blob = zlib.compress(payload.encode("utf-8"))
+        if max_bytes is None or len(blob) <= max_bytes:
+            break
+    return blob
+
+
+def decode_response(blob):
+    """Rebuild the agent response stored by encode_response; ValueError for an unknown type."""
+    payload = json.loads(zlib.decompress(blob))
+    # Sessions written before RESPONSE_TYPES stored "module:QualName"
+    name = payload["type"].rpartition(":")[2]
+    if name not in RESPONSE_TYPES:
+        raise ValueError(f"Session holds an unknown response type: {payload['type']!r}")
+    module_name, class_name = RESPONSE_TYPES[name]
+    cls = getattr(importlib.import_module(module_name), class_name)
+    if hasattr(cls, "model_validate"):
+        return cls.model_validate(payload["data"])
+    response = cls.__new__(cls)
+    response.__dict__.update(payload["data"])
+    return response
+
+
+class SessionStore:
+    """Bounded LRU of session id -> latest compressed agent response, with TTL."""
+
+    def __init__(self, max_sessions=1000, ttl=1800.0, max_bytes=65536):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def context(self, session_id):
+        """Return the previous agent response of a session, or None."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            blob, turns, expires_at = entry
+            now = time.time()
+            if expires_at <= now:
+                del self._sessions[session_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            # Like the SQLite store, a read counts as activity
+            self._sessions[session_id] = (blob, turns, now + self.ttl)
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+        return self._restore(blob)
+
+    def _restore(self, blob):
+        try:
+            return decode_response(blob)
+        except ValueError as e:
+            print(f"Sessions: ignoring stored context: {e}")
+            return None
+
+    def record(self, session_id, response):
+        """Store a session's latest agent response; returns the session's turn count."""
+        blob = encode_response(response, self.max_bytes)
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            turns = previous[1] + 1 if previous else 1
+            self._sessions[session_id] = (blob, turns, time.time() + self.ttl)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return turns
+
+    def end(self, session_id):
+        """Forget a session; returns whether it existed."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self._lock:
+            sizes = [len(blob) for blob, _, _ in self._sessions.values()]
+        return {
+            "sessions": len(sizes),
+            "bytes": sum(sizes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class SqliteSessionStore(SessionStore):
+    """SessionStore kept in a SQLite file, shared by every worker process."""
+
+    def __init__(self, path, max_sessions=1000, ttl=1800.0, max_bytes=65536):
+        super().__init__(max_sessions, ttl, max_bytes)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " blob BLOB NOT NULL,"
+            " turns INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        self._db.commit()
+
+    def context(self, session_id):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT blob, expires_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                    self._db.commit()
+                    self.expired += 1
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (now + self.ttl, session_id))
+            self._db.commit()
+            self.hits += 1
+        return self._restore(row[0])
+
+    def record(self, session_id, response):
+        blob = encode_response(response, self.max_bytes)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT turns FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            turns = row[0] + 1 if row else 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, blob, turns, expires_at) VALUES (?, ?, ?, ?)",
+                (session_id, blob, turns, now + self.ttl),
+            )
+            self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            # Sessions expire ttl after their last use, so the earliest expiry is the least recent
+            evicted = self._db.execute(
+                "DELETE FROM sessions WHERE id IN ("
+                " SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+            self.evicted += max(0, evicted)
+            self._db.commit()
+        return turns
+
+    def end(self, session_id):
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            self._db.commit()
+        return deleted > 0
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(blob)), 0) FROM sessions").fetchone()
+        return {
+            "sessions": count,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def create_session_store():
+    """Build the SessionStore configured by the environment."""
+    options = dict(
+        max_sessions=int(os.environ.get("SESSION_MAX_SESSIONS", "1000")),
+        ttl=float(os.environ.get("SESSION_TTL", "1800")),
+        max_bytes=int(os.environ.get("SESSION_MAX_BYTES", "65536")),
+    )
+    path = os.environ.get("SESSION_STORE_PATH")
+    if path:
+        return SqliteSessionStore(server_path(path), **options)
+    return SessionStore(**options)
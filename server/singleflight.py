@@ -0,0 +1,62 @@
+"""
+Coalesce concurrent calls for the same key into a single execution.
+
+When several requests miss the cache for the same key at once, only the first
+one runs the expensive work; the others await its result. The work runs as its
+own task, so a caller that disconnects does not cancel it for the others.
+"""
+import asyncio
+
+
+class AsyncSingleFlight:
+    """Deduplicate concurrent coroutine calls by key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._waiters = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """Await fn() for key, sharing one in-flight call with concurrent callers.
+
+        fn is a zero-argument callable returning an awaitable. Exceptions are
+        propagated to every waiter and are not remembered after the call ends.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def in_flight(self):
+        """Return the keys that currently have a running call."""
+        return list(self._calls)
+
+    def waiters(self, key):
+        """Return how many callers are currently awaiting key."""
+        return self._waiters.get(key, 0)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,86 @@
+"""
+Server-Sent Events helpers for the streaming /chat and /company-info endpoints.
+
+The crew runs in a worker thread; CrewEventRelay turns its task and step
+callbacks into events on an asyncio.Queue that the response generator drains.
+Setting the relay's cancel flag makes the next callback raise CrewCancelled, so
+a crew whose client went away stops at its next step instead of running to the
+end.
+"""
+import asyncio
+import json
+import re
+import threading
+
+from crew.src.company_description_retrieval_automation.batch import StageTimer
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def answer_chunks(text):
+    """Split an answer into word-sized chunks, keeping the whitespace."""
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+def to_jsonable(value):
+    """Convert pydantic models (and lists of them) into plain data."""
+    if isinstance(value, list):
+        return [to_jsonable(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return value
+
+
+class CrewCancelled(Exception):
+    """Raised from a crew callback once the streaming client has gone away."""
+
+
+class CrewEventRelay:
+    """Forward crew callbacks from a worker thread to an asyncio.Queue.
+
+    With events=False nothing is queued: the relay only times the stages and
+    carries cancellation, for callers that never read the queue.
+    """
+
+    def __init__(self, loop, events=True):
+        self.loop = loop
+        self.events = events
+        self.queue = asyncio.Queue()
+        self.cancelled = threading.Event()
+        self.timer = StageTimer()
+
+    def emit(self, event, data):
+        if self.events:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def attach(self, crew):
+        """Install the relay's callbacks on a built Crew and start its stage timer."""
+        self.timer = StageTimer()
+        crew.task_callback = self.task_callback
+        crew.step_callback = self.step_callback
+        return crew
+
+    def task_callback(self, output):
+        if self.cancelled.is_set():
+            raise CrewCancelled("Client disconnected")
+        self.timer.task_callback(output)
+        name = getattr(output, "name", None)
+        raw = getattr(output, "raw", str(output))
+        if name == "find_company_website":
+            self.emit("website", {"url": raw.strip()})
+            self.emit("status", {"stage": "scrape_started"})
+        else:
+            self.emit("task", {"name": name, "output": raw})
+
+    def step_callback(self, step):
+        if self.cancelled.is_set():
+            raise CrewCancelled("Client disconnected")
+        tool = getattr(step, "tool", None)
+        if tool:
+            self.emit("tool", {"tool": tool, "input": getattr(step, "tool_input", None)})
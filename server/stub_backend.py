@@ -0,0 +1,368 @@
+"""
+Offline stand-ins for the Weaviate client and QueryAgent.
+
+Select them with AGENT_POOL_BACKEND=stub to run and load-test the API without
+cloud credentials or network access. STUB_AGENT_LATENCY (seconds) and
+STUB_AGENT_JITTER control how long each simulated agent.run takes.
+
+FakeCollection and FakeCollections form a small in-process stand-in for a
+Weaviate instance (create/get/delete collections, batch imports, data
+insert/replace/exists/delete_many by id, iteration, tenants), used by the
+offline backend and the benchmarks.
+"""
+import asyncio
+import random
+import time
+from uuid import uuid4
+
+
+class StubAgentResponse:
+    """Minimal look-alike of QueryAgentResponse."""
+
+    def __init__(self, original_query, final_answer, collection_names=None, total_time=0.0):
+        self.original_query = original_query
+        self.collection_names = collection_names or []
+        self.searches = []
+        self.aggregations = []
+        self.total_time = total_time
+        self.final_answer = final_answer
+        self.sources = []
+
+    def __str__(self):
+        # Mirror the pydantic repr so the UI can still parse final_answer='...'
+        return (
+            f"original_query={self.original_query!r} "
+            f"collection_names={self.collection_names!r} "
+            f"searches={self.searches!r} aggregations={self.aggregations!r} "
+            f"total_time={self.total_time!r} "
+            f"final_answer={self.final_answer!r} sources={self.sources!r}"
+        )
+
+
+class StubWeaviateClient:
+    """Client that is always ready until closed, backed by in-memory collections."""
+
+    def __init__(self, collections=None):
+        self._closed = False
+        self.collections = collections if collections is not None else FakeCollections()
+
+    def is_ready(self):
+        return not self._closed
+
+    def close(self):
+        self._closed = True
+
+
+class StubQueryAgent:
+    """QueryAgent replacement that sleeps for a simulated round-trip."""
+
+    def __init__(self, client, collections=None, latency=0.05, jitter=0.0):
+        self.client = client
+        self.collections = collections or ["CompanyInfo", "Products", "UseCases"]
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    def run(self, query, context=None, tenant=None):
+        if not self.client.is_ready():
+            raise RuntimeError("Stub client is closed")
+        self.calls += 1
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        answer = f"Stub answer for: {query}"
+        if context is not None:
+            answer = f"Stub follow-up to {context.original_query!r}: {query}"
+        if tenant is not None:
+            answer = f"{answer} (tenant {tenant})"
+        return StubAgentResponse(
+            original_query=query,
+            final_answer=answer,
+            collection_names=list(self.collections),
+            total_time=delay,
+        )
+
+
+class StubStep:
+    """Look-alike of a crew AgentAction step."""
+
+    def __init__(self, tool, tool_input):
+        self.tool = tool
+        self.tool_input = tool_input
+
+
+class StubTaskOutput:
+    """Look-alike of a crew TaskOutput."""
+
+    def __init__(self, name, raw):
+        self.name = name
+        self.raw = raw
+
+    def __str__(self):
+        return self.raw
+
+
+class StubCrew:
+    """Crew replacement whose kickoff sleeps instead of searching and scraping.
+
+    Like a real Crew it calls step_callback and task_callback, half of the
+    latency going to each of the two tasks.
+    """
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls = 0
+        self.step_callback = None
+        self.task_callback = None
+
+    def kickoff(self, inputs=None):
+        self.calls += 1
+        company_name = (inputs or {}).get("company_name", "")
+        website = "https://www." + "".join(company_name.lower().split()) + ".com"
+        description = f"Stub description for {company_name}"
+        for task, tool, tool_input, output in [
+            ("find_company_website", "Search in a specific website", company_name, website),
+            ("extract_company_description", "Scrape an element from website", website, description),
+        ]:
+            if self.step_callback:
+                self.step_callback(StubStep(tool, tool_input))
+            time.sleep(self.latency / 2)
+            if self.task_callback:
+                self.task_callback(StubTaskOutput(task, output))
+        return StubTaskOutput("extract_company_description", description)
+
+    async def kickoff_async(self, inputs=None):
+        return await asyncio.to_thread(self.kickoff, inputs)
+
+
+class FakeBatchObject:
+    """Look-alike of weaviate's BatchObject as found in failed_objects."""
+
+    def __init__(self, properties, uuid, vector):
+        self.properties = properties
+        self.uuid = uuid
+        self.vector = vector
+
+
+class FakeErrorObject:
+    """Look-alike of weaviate's ErrorObject."""
+
+    def __init__(self, message, object_):
+        self.message = message
+        self.object_ = object_
+
+
+class FakeObject:
+    """Stored object returned by FakeCollection.iterator()."""
+
+    def __init__(self, uuid, properties, vector):
+        self.uuid = uuid
+        self.properties = properties
+        self.vector = vector
+
+
+class FakeBatch:
+    """Context manager collecting add_object calls, like a weaviate batch."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.collection.batch.failed_objects = self.failed
+        return False
+
+    def add_object(self, properties=None, uuid=None, vector=None, references=None):
+        collection = self.collection
+        uuid = str(uuid) if uuid else str(uuid4())
+        attempts = collection.attempts.get(uuid, 0) + 1
+        collection.attempts[uuid] = attempts
+        if collection.latency:
+            time.sleep(collection.latency)
+        failing = attempts <= collection.fail_times or (
+            collection.fail_predicate is not None and collection.fail_predicate(properties)
+        )
+        if failing:
+            self.failed.append(FakeErrorObject(
+                f"Simulated failure (attempt {attempts})",
+                FakeBatchObject(properties, uuid, vector),
+            ))
+            return uuid
+        collection.objects[uuid] = FakeObject(uuid, dict(properties or {}), vector)
+        return uuid
+
+
+class FakeBatchManager:
+    """collection.batch stand-in offering the three weaviate batching modes."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.failed_objects = []
+        self.modes = []
+
+    def dynamic(self):
+        self.modes.append("dynamic")
+        return FakeBatch(self.collection)
+
+    def fixed_size(self, batch_size=100, concurrent_requests=2):
+        self.modes.append("fixed")
+        return FakeBatch(self.collection)
+
+    def rate_limit(self, requests_per_minute):
+        self.modes.append("rate_limit")
+        return FakeBatch(self.collection)
+
+
+class FakeCollection:
+    """In-memory batch sink for exercising importers offline.
+
+    Every object fails its first ``fail_times`` submissions, and objects for
+    which ``fail_predicate(properties)`` is true always fail. ``latency`` is
+    slept per added object.
+
+    with_tenant() returns the collection of one tenant, created on first use
+    like a collection with auto tenant creation; reading a tenant that is not
+    active fails like it does on a real instance.
+    """
+
+    def __init__(self, name, fail_times=0, fail_predicate=None, latency=0.0, tenant=None):
+        self.name = name
+        self.tenant = tenant
+        self.fail_times = fail_times
+        self.fail_predicate = fail_predicate
+        self.latency = latency
+        self.objects = {}
+        self.attempts = {}
+        self.batch = FakeBatchManager(self)
+        self.data = FakeData(self)
+        self.tenants = FakeTenants(self)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def with_tenant(self, tenant):
+        return self.tenants.collection(tenant)
+
+    def iterator(self, include_vector=False, return_properties=None):
+        if self.tenant is not None and self.tenant.activity_status != "ACTIVE":
+            raise RuntimeError(f"Tenant {self.tenant.name} of {self.name} is not active")
+        for obj in list(self.objects.values()):
+            properties = obj.properties
+            if return_properties is not None:
+                properties = {k: v for k, v in properties.items() if k in return_properties}
+            yield FakeObject(obj.uuid, properties, obj.vector if include_vector else None)
+
+
+class FakeTenant:
+    """Look-alike of weaviate.classes.tenants.Tenant (activity_status is a plain string)."""
+
+    def __init__(self, name, activity_status="ACTIVE"):
+        self.name = name
+        self.activity_status = activity_status
+
+
+class FakeTenants:
+    """collection.tenants stand-in; update() accepts real or fake Tenant objects."""
+
+    def __init__(self, parent):
+        self.parent = parent
+        self._tenants = {}
+
+    def collection(self, name):
+        if name not in self._tenants:
+            self.create(FakeTenant(name))
+        return self._tenants[name]
+
+    def create(self, tenants):
+        for tenant in tenants if isinstance(tenants, list) else [tenants]:
+            name = getattr(tenant, "name", tenant)
+            if name not in self._tenants:
+                self._tenants[name] = FakeCollection(self.parent.name, tenant=FakeTenant(name))
+
+    def get(self):
+        return {name: collection.tenant for name, collection in self._tenants.items()}
+
+    def exists(self, name):
+        return name in self._tenants
+
+    def update(self, tenants):
+        for tenant in tenants if isinstance(tenants, list) else [tenants]:
+            status = tenant.activity_status
+            self._tenants[tenant.name].tenant.activity_status = getattr(status, "value", status)
+
+    def remove(self, names):
+        for name in names if isinstance(names, list) else [names]:
+            self._tenants.pop(name, None)
+
+
+class FakeDeleteResult:
+    def __init__(self, matches):
+        self.matches = matches
+        self.successful = matches
+        self.failed = 0
+
+
+class FakeData:
+    """collection.data stand-in; delete_many understands id filters only."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def insert(self, properties, uuid=None, vector=None):
+        uuid = str(uuid) if uuid else str(uuid4())
+        if uuid in self.collection.objects:
+            raise ValueError(f"Object {uuid} already exists")
+        self.collection.objects[uuid] = FakeObject(uuid, dict(properties), vector)
+        return uuid
+
+    def replace(self, uuid, properties, vector=None):
+        uuid = str(uuid)
+        if uuid not in self.collection.objects:
+            raise ValueError(f"Object {uuid} does not exist")
+        self.collection.objects[uuid] = FakeObject(uuid, dict(properties), vector)
+
+    def exists(self, uuid):
+        return str(uuid) in self.collection.objects
+
+    def delete_many(self, where):
+        if getattr(where, "target", None) != "_id":
+            raise NotImplementedError("FakeData.delete_many only supports Filter.by_id()")
+        values = where.value if isinstance(where.value, list) else [where.value]
+        matches = 0
+        for uuid in values:
+            if self.collection.objects.pop(str(uuid), None) is not None:
+                matches += 1
+        return FakeDeleteResult(matches)
+
+
+class FakeCollections:
+    """client.collections stand-in holding FakeCollection objects by name."""
+
+    def __init__(self):
+        self._collections = {}
+        self.configs = {}
+
+    def create(self, name, **config):
+        if name in self._collections:
+            raise ValueError(f"Collection {name} already exists")
+        self.configs[name] = config
+        self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def get(self, name):
+        # Like the real client, get() returns a handle whether or not the collection exists
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def exists(self, name):
+        return name in self._collections
+
+    def delete(self, name):
+        self._collections.pop(name, None)
+        self.configs.pop(name, None)
+
+    def list_all(self):
+        return dict(self.configs)
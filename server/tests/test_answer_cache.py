@@ -0,0 +1,81 @@
+import pytest
+
+from answer_cache import HashingEmbedder, SemanticAnswerCache, SharedAnswerStore, match_key
+from collection_versions import CollectionManifest
+
+LONG = ("Can you give me a detailed overview of {} including its history, its main products, "
+        "the markets it serves and how customers typically use it?")
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return CollectionManifest(str(tmp_path / "collections.json"))
+
+
+@pytest.fixture
+def cache(manifest):
+    return SemanticAnswerCache(HashingEmbedder(), threshold=0.9, manifest=manifest)
+
+
+def test_embedder_is_deterministic():
+    first = HashingEmbedder().embed(["Who founded Weaviate?"])
+    second = HashingEmbedder().embed(["Who founded Weaviate?"])
+    assert (first == second).all()
+
+
+def test_paraphrase_with_the_same_names_hits(cache):
+    cache.store("What are Weaviate's main products?", "answer")
+    assert cache.lookup("What are the main products of Weaviate?") == "answer"
+
+
+@pytest.mark.parametrize("stored, asked", [
+    (LONG.format("Weaviate"), LONG.format("Canva")),
+    ("Is Canva better than Comet?", "Is Comet better than Canva?"),
+    ("Does Weaviate support semantic search and recommendation systems?",
+     "Does Weaviate support semantic search but not recommendation systems?"),
+    ("Does Weaviate support hybrid search?", "Doesn't Weaviate support hybrid search?"),
+    ("What happened at Canva in 2019?", "What happened at Canva in 2021?"),
+])
+def test_different_names_order_or_negation_miss(cache, stored, asked):
+    cache.store(stored, "answer")
+    assert cache.lookup(asked) is None
+
+
+def test_prompts_without_names_only_match_verbatim(cache):
+    cache.store(LONG.format("weaviate"), "answer")
+    assert cache.lookup(LONG.format("canva")) is None
+    assert cache.lookup(LONG.format("weaviate").upper().lower() + "  ") == "answer"
+
+
+def test_match_key():
+    assert match_key("Is Canva better than Comet?") == ("canva", "comet")
+    assert match_key("Tell me about Canva's products") == ("canva",)
+    assert match_key("Why isn't Comet on Canva?") == ("not", "comet", "canva")
+    assert match_key("who founded it?") == "who founded it"
+
+
+def test_scope_separates_answers(cache):
+    cache.store("What does it sell?", "canva answer", scope="Canva")
+    assert cache.lookup("What does it sell?", scope="Canva") == "canva answer"
+    assert cache.lookup("What does it sell?", scope="Comet") is None
+    assert cache.lookup("What does it sell?") is None
+
+
+def test_bumped_collection_invalidates_only_its_answers(cache, manifest):
+    generations = manifest.generations()
+    cache.store("Who founded Weaviate?", "founders", ["CompanyInfo"], generations)
+    cache.store("What products does Weaviate have?", "products", ["Products"], generations)
+    manifest.bump(["Products"])
+    assert cache.lookup("Who founded Weaviate?") == "founders"
+    assert cache.lookup("What products does Weaviate have?") is None
+
+
+def test_shared_store_keeps_match_keys_across_workers(tmp_path, manifest):
+    path = str(tmp_path / "answers.db")
+    first = SemanticAnswerCache(HashingEmbedder(), manifest=manifest, shared=SharedAnswerStore(path))
+    second = SemanticAnswerCache(HashingEmbedder(), manifest=manifest, shared=SharedAnswerStore(path))
+    first.store("Is Canva better than Comet?", "canva")
+    assert second.lookup("Is Canva better than Comet?") == "canva"
+    assert second.lookup("Is Comet better than Canva?") is None
+    first.close()
+    second.close()
@@ -0,0 +1,65 @@
+import asyncio
+
+from coalescing import MicroBatcher, PromptCoalescer, normalize_prompt
+
+
+async def echo(prompt):
+    await asyncio.sleep(0.01)
+    return f"answer to {prompt}"
+
+
+def test_reversed_comparison_is_not_grouped():
+    coalescer = PromptCoalescer(echo)
+    assert coalescer.group(["Is Canva better than Comet?", "Is Comet better than Canva?"]) == [0, 1]
+
+
+def test_negated_question_is_not_grouped():
+    coalescer = PromptCoalescer(echo, threshold=0.9)
+    prompts = [
+        "Does Weaviate support semantic search and recommendation systems?",
+        "Does Weaviate support semantic search but not recommendation systems?",
+    ]
+    assert coalescer.group(prompts) == [0, 1]
+
+
+def test_near_identical_prompts_are_grouped():
+    coalescer = PromptCoalescer(echo, threshold=0.9)
+    prompts = ["What are Weaviate's main products?", "What are the main products of Weaviate?",
+               "Who founded Canva?"]
+    assert coalescer.group(prompts) == [0, 0, 2]
+
+
+def test_concurrent_prompts_share_calls():
+    async def scenario():
+        coalescer = PromptCoalescer(echo, window=0.02)
+        answers = await asyncio.gather(
+            coalescer.ask("Who founded Canva?"),
+            coalescer.ask("who founded canva"),
+            coalescer.ask("Is Canva better than Comet?"),
+            coalescer.ask("Is Comet better than Canva?"),
+        )
+        return coalescer, answers
+
+    coalescer, answers = asyncio.run(scenario())
+    assert answers[0] == answers[1] == "answer to Who founded Canva?"
+    assert answers[2] == "answer to Is Canva better than Comet?"
+    assert answers[3] == "answer to Is Comet better than Canva?"
+    assert coalescer.agent_calls == 3
+    assert coalescer.stats()["identical_coalesced"] == 1
+
+
+def test_batcher_returns_exceptions_to_their_callers():
+    async def batch(items):
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(batch, window=0.01)
+        return await asyncio.gather(batcher.submit("good"), batcher.submit("bad"), return_exceptions=True)
+
+    good, bad = asyncio.run(scenario())
+    assert good == "good"
+    assert isinstance(bad, ValueError)
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Who founded   Canva?? ") == "who founded canva"
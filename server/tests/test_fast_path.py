@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from collection_versions import CollectionManifest
+from company_dataset import load_company_dataset
+from fast_path import FastPathRouter, create_fast_path
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return CollectionManifest(str(tmp_path / "collections.json"))
+
+
+@pytest.fixture
+def router(manifest):
+    router = FastPathRouter(manifest=manifest)
+    router.refresh()
+    return router
+
+
+@pytest.mark.parametrize("question", [
+    "Who founded Weaviate?",
+    "When was Weaviate founded?",
+    "what year was comet founded",
+    "Who are the co-founders of Canva?",
+    "What products does Canva have?",
+    "What are Canva's products?",
+    "What are the use cases of LlamaIndex?",
+    "What is Weaviate Cloud Service?",
+    "Tell me about LlamaIndex",
+    "What's Comet?",
+])
+def test_answers_questions_the_records_hold(router, question):
+    assert router.route(question) is not None
+
+
+@pytest.mark.parametrize("question", [
+    "Who is the CEO of Canva?",
+    "What is the revenue of Canva?",
+    "Who are Weaviate's competitors?",
+    "What is the latest news about LlamaIndex?",
+    "What is the founding story of Weaviate?",
+    "Tell me about pricing plans of Canva",
+    "What is Canva's market share?",
+    "What does Canva cost?",
+])
+def test_near_misses_go_to_the_agent(router, question):
+    assert router.route(question) is None
+    assert router.stats()["fallback_reasons"] == {"unrecognised_terms": 1}
+
+
+@pytest.mark.parametrize("question", [
+    "Is Canva better than Comet?",
+    "Who founded Canva and Comet?",
+])
+def test_comparisons_and_several_companies_go_to_the_agent(router, question):
+    assert router.route(question) is None
+
+
+def test_product_name_is_not_read_as_products_intent(router):
+    answer = router.route("What is Weaviate Cloud Service?")
+    assert answer.final_answer.startswith("Provides a managed")
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("FAST_PATH_ENABLED", raising=False)
+    assert create_fast_path() is None
+
+
+def test_stale_index_is_rebuilt_in_the_background(manifest):
+    release = threading.Event()
+    builds = []
+
+    def dataset():
+        builds.append(time.perf_counter())
+        if len(builds) > 1:
+            release.wait(5)
+        return load_company_dataset()
+
+    router = FastPathRouter(dataset_factory=dataset, manifest=manifest)
+    router.refresh()
+    manifest.bump(["CompanyInfo"], reason="test")
+
+    start = time.perf_counter()
+    # The previous index keeps answering while the new one is built
+    assert router.route("Who founded Weaviate?") is not None
+    assert router.route("Who founded Weaviate?") is not None
+    assert time.perf_counter() - start < 1
+    release.set()
+    deadline = time.time() + 5
+    while router.rebuilds < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert router.rebuilds == 2
+    assert len(builds) == 2
+
+
+def test_falls_through_until_the_first_index_is_built(manifest):
+    release = threading.Event()
+
+    def dataset():
+        release.wait(5)
+        return load_company_dataset()
+
+    router = FastPathRouter(dataset_factory=dataset, manifest=manifest)
+    assert router.route("Who founded Weaviate?") is None
+    assert router.stats()["fallback_reasons"] == {"index_loading": 1}
+    release.set()
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from importer import BatchImporter, create_importer
+from stub_backend import FakeCollection
+
+
+@pytest.fixture(autouse=True)
+def direct_calls(monkeypatch):
+    # Keep the process-wide weaviate_import backend out of these tests
+    monkeypatch.setenv("RESILIENCE_ENABLED", "0")
+
+
+def objects(count):
+    return [{"properties": {"name": f"Item {i}"}, "uuid": f"00000000-0000-0000-0000-{i:012d}"} for i in range(count)]
+
+
+def test_failed_objects_are_retried_until_they_succeed(tmp_path):
+    collection = FakeCollection("Products", fail_times=2)
+    importer = BatchImporter(max_retries=3, retry_backoff=0, dead_letter_path=str(tmp_path / "dead.jsonl"))
+
+    stats = importer.import_objects(collection, iter(objects(5)))
+
+    assert len(collection) == 5
+    assert stats.submitted == 5 and stats.succeeded == 5
+    assert stats.retried == 10
+    assert stats.dead_lettered == 0
+    assert not (tmp_path / "dead.jsonl").exists()
+
+
+def test_objects_failing_every_retry_go_to_the_dead_letter_file(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    collection = FakeCollection("Products", fail_predicate=lambda properties: properties["name"] == "Item 3")
+    importer = BatchImporter(max_retries=2, retry_backoff=0, dead_letter_path=str(path))
+
+    stats = importer.import_objects(collection, objects(5))
+
+    assert len(collection) == 4
+    assert stats.dead_lettered == 1 and stats.succeeded == 4
+    assert collection.attempts["00000000-0000-0000-0000-000000000003"] == 3
+    [line] = path.read_text().splitlines()
+    record = json.loads(line)
+    assert record["collection"] == "Products"
+    assert record["properties"] == {"name": "Item 3"}
+    assert record["uuid"] == "00000000-0000-0000-0000-000000000003"
+    assert "Simulated failure" in record["error"]
+
+
+def test_batch_mode_selects_the_weaviate_batching_call(tmp_path):
+    collection = FakeCollection("Products")
+    importer = create_importer(mode="fixed", dead_letter_path=str(tmp_path / "dead.jsonl"))
+
+    importer.import_objects(collection, objects(3))
+
+    assert collection.batch.modes == ["fixed"]
+    with pytest.raises(ValueError):
+        BatchImporter(mode="bulk")
+
+
+def test_rejected_import_dead_letters_every_object(tmp_path, monkeypatch):
+    import importer
+    from resilience import BackendUnavailable
+
+    def rejected(name, *args, **kwargs):
+        raise BackendUnavailable(f"{name}: circuit open")
+
+    monkeypatch.setattr(importer.resilience, "call", rejected)
+    path = tmp_path / "dead.jsonl"
+    collection = FakeCollection("Products")
+    stats = BatchImporter(retry_backoff=0, dead_letter_path=str(path)).import_objects(collection, iter(objects(3)))
+
+    assert len(collection) == 0
+    assert stats.submitted == 3 and stats.dead_lettered == 3 and stats.succeeded == 0
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["properties"]["name"] for record in records] == ["Item 0", "Item 1", "Item 2"]
+    assert "circuit open" in records[0]["error"]
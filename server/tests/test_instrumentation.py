@@ -0,0 +1,65 @@
+import json
+import os
+
+import instrumentation
+from instrumentation import Histogram
+
+
+def test_metrics_of_every_worker_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(instrumentation, "_collectors", [lambda: '# TYPE up gauge\nup{backend="web"} 1'])
+    histogram = Histogram("http_request_seconds", "Duration of HTTP requests.", ("method", "path", "status"))
+    monkeypatch.setattr(instrumentation, "HISTOGRAMS", (histogram,))
+    histogram.observe(0.2, "GET", "/health", "200")
+
+    # A worker that has exited: its histograms still count, its gauges do not
+    other = Histogram("http_request_seconds", "", ("method", "path", "status"))
+    other.observe(0.2, "GET", "/health", "200")
+    other.observe(3.0, "GET", "/health", "200")
+    snapshot = {
+        "histograms": {other.name: [[list(labels), *values] for labels, values in other.series().items()]},
+        "collectors": '# TYPE up gauge\nup{backend="web"} 0',
+    }
+    (tmp_path / "999999999.json").write_text(json.dumps(snapshot))
+
+    text = instrumentation.render_metrics()
+
+    assert 'http_request_seconds_count{method="GET",path="/health",status="200"} 3' in text
+    assert 'http_request_seconds_bucket{method="GET",path="/health",status="200",le="0.25"} 2' in text
+    assert f'up{{worker="{os.getpid()}",backend="web"}} 1' in text
+    assert 'worker="999999999"' not in text
+    assert text.count("# TYPE up gauge") == 1
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+
+def test_streamed_responses_are_timed_until_the_body_ends(monkeypatch):
+    import asyncio
+
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from fastapi.testclient import TestClient
+
+    histogram = Histogram("http_request_seconds", "", ("method", "path", "status"))
+    monkeypatch.setattr(instrumentation, "REQUEST_SECONDS", histogram)
+    monkeypatch.setattr(instrumentation, "METRICS_ENABLED", True)
+    app = FastAPI()
+    instrumentation.install(app)
+
+    async def events():
+        for i in range(3):
+            await asyncio.sleep(0.1)
+            yield f"data: {i}\n\n"
+
+    @app.get("/events/{name}")
+    async def stream(name: str):
+        with instrumentation.span("setup"):
+            pass
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    response = TestClient(app).get("/events/canva", headers={"X-Debug-Timing": "1"})
+
+    assert response.text.count("data:") == 3
+    assert "setup;dur=" in response.headers["server-timing"]
+    [(labels, (counts, total, count))] = histogram.series().items()
+    assert labels == ("GET", "/events/{name}", "200") and count == 1
+    assert total >= 0.3
@@ -0,0 +1,219 @@
+import asyncio
+import time
+
+import pytest
+
+from job_queue import CANCELLED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def make_queue(path, handler, **kwargs):
+    kwargs.setdefault("drain_timeout", 0)
+    return JobQueue(JobStore(path), handler, "company-info", **kwargs)
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_job_runs_and_succeeds(path):
+    async def handler(payload, relay):
+        return f"described {payload['company_name']}"
+
+    async def scenario():
+        queue = make_queue(path, handler)
+        await queue.start()
+        job, created = queue.submit("canva", {"company_name": "Canva"})
+        duplicate, created_again = queue.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: queue.store.get(job["id"])["status"] == SUCCEEDED)
+        await queue.stop()
+        return queue.store.get(job["id"]), created, created_again, duplicate["id"] == job["id"]
+
+    job, created, created_again, same = asyncio.run(scenario())
+    assert job["result"] == "described Canva"
+    assert (created, created_again, same) == (True, False, True)
+
+
+def test_starting_worker_leaves_live_siblings_jobs_alone(path):
+    calls = []
+
+    async def handler(payload, relay):
+        calls.append(payload["company_name"])
+        await asyncio.sleep(0.3)
+        return "done"
+
+    async def scenario():
+        first = make_queue(path, handler, lease=0.3)
+        await first.start()
+        job, _ = first.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: first.store.get(job["id"])["status"] == RUNNING)
+        # A sibling worker starts (or restarts) while the job is running
+        second = make_queue(path, handler, lease=0.3)
+        await second.start()
+        await wait_for(lambda: first.store.get(job["id"])["status"] == SUCCEEDED)
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
+    assert calls == ["Canva"]
+
+
+def test_jobs_of_a_dead_worker_are_requeued_after_their_lease(path):
+    store = JobStore(path)
+    job, _ = store.create("company-info", "canva", {"company_name": "Canva"})
+    assert store.claim(job["id"], "dead-worker", lease=0.05)
+    assert store.recover() == []
+    time.sleep(0.1)
+    assert store.recover() == [job["id"]]
+    assert store.get(job["id"])["status"] == QUEUED
+
+
+def test_cancel_on_another_worker_stops_the_owner(path):
+    started = []
+
+    async def handler(payload, relay):
+        started.append(payload["company_name"])
+        await asyncio.sleep(10)
+        return "done"
+
+    async def scenario():
+        owner = make_queue(path, handler, lease=0.3)
+        await owner.start()
+        job, _ = owner.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: bool(owner._running))
+        other = make_queue(path, handler, lease=0.3)
+        await other.start()
+        assert other.cancel(job["id"])["status"] == CANCELLED
+        await wait_for(lambda: not owner._running, timeout=2)
+        stats = owner.stats()
+        await owner.stop()
+        await other.stop()
+        return owner.store.get(job["id"]), stats
+
+    job, stats = asyncio.run(scenario())
+    assert job["status"] == CANCELLED
+    assert stats["remote_cancels"] == 1
+
+
+def test_failed_job_is_retried_then_marked_failed(path):
+    attempts = []
+
+    async def handler(payload, relay):
+        attempts.append(1)
+        raise RuntimeError("site down")
+
+    async def scenario():
+        queue = make_queue(path, handler, max_attempts=2, retry_backoff=0.01)
+        await queue.start()
+        job, _ = queue.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: queue.store.get(job["id"])["status"] == "failed")
+        await queue.stop()
+        return queue.store.get(job["id"])
+
+    job = asyncio.run(scenario())
+    assert len(attempts) == 2
+    assert job["error"] == "site down"
+
+
+def test_cancelling_a_job_keeps_shared_work_running_for_other_callers(path):
+    from singleflight import AsyncSingleFlight
+    from streaming import CrewCancelled
+
+    flights = AsyncSingleFlight()
+
+    async def crew(relay):
+        for _ in range(30):
+            if relay.cancelled.is_set():
+                raise CrewCancelled("cancelled")
+            await asyncio.sleep(0.01)
+        return "description"
+
+    async def handler(payload, relay):
+        return await flights.do("canva", lambda: crew(relay))
+
+    async def scenario():
+        queue = make_queue(path, handler, exclusive=lambda payload: flights.waiters("canva") <= 1)
+        await queue.start()
+        job, _ = queue.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: flights.waiters("canva") == 1)
+        # An HTTP request for the same company joins the job's crew run
+        request = asyncio.ensure_future(flights.do("canva", lambda: crew(None)))
+        await wait_for(lambda: flights.waiters("canva") == 2)
+        queue.cancel(job["id"])
+        description = await request
+        await queue.stop()
+        return description, queue.store.get(job["id"])["status"]
+
+    assert asyncio.run(scenario()) == ("description", CANCELLED)
+
+
+def test_cancelling_the_only_caller_stops_the_work(path):
+    from singleflight import AsyncSingleFlight
+    from streaming import CrewCancelled
+
+    flights = AsyncSingleFlight()
+    stopped = []
+
+    async def crew(relay):
+        for _ in range(300):
+            if relay.cancelled.is_set():
+                stopped.append(True)
+                raise CrewCancelled("cancelled")
+            await asyncio.sleep(0.01)
+        return "description"
+
+    async def handler(payload, relay):
+        return await flights.do("canva", lambda: crew(relay))
+
+    async def scenario():
+        queue = make_queue(path, handler, exclusive=lambda payload: flights.waiters("canva") <= 1)
+        await queue.start()
+        job, _ = queue.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: flights.waiters("canva") == 1)
+        queue.cancel(job["id"])
+        await wait_for(lambda: bool(stopped))
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert stopped == [True]
+
+
+def test_progress_events_are_coalesced_and_the_last_one_is_saved(path):
+    writes = []
+
+    async def handler(payload, relay):
+        for step in range(50):
+            relay.emit("step", {"step": step})
+            await asyncio.sleep(0.001)
+        return "done"
+
+    async def scenario():
+        queue = make_queue(path, handler, progress_interval=0.05)
+        update = queue.store.update
+        queue.store.update = lambda job_id, **fields: (writes.append(fields), update(job_id, **fields))
+        await queue.start()
+        job, _ = queue.submit("canva", {"company_name": "Canva"})
+        await wait_for(lambda: queue.store.get(job["id"])["progress"] == {"event": "step", "step": 49})
+        await queue.stop()
+        return queue.store.get(job["id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == SUCCEEDED
+    assert 1 <= sum("progress" in fields for fields in writes) < 10
+
+
+def test_cancelling_a_finished_job_leaves_it_alone(path):
+    store = JobStore(path)
+    job, _ = store.create("company-info", "canva", {"company_name": "Canva"})
+    assert store.cancel(job["id"])
+    assert store.get(job["id"])["status"] == CANCELLED
+    store.update(job["id"], status=SUCCEEDED)
+    assert not store.cancel(job["id"]) and not store.cancel("unknown")
+    assert store.get(job["id"])["status"] == SUCCEEDED
@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+
+import pytest
+
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter, Backend, BackendUnavailable, CircuitBreaker, TokenBucket,
+    is_transient,
+)
+
+
+def failing():
+    raise RuntimeError("backend down")
+
+
+def test_breaker_opens_after_threshold_and_probes_once_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == CLOSED
+    breaker.failure()
+    assert breaker.state == OPEN and breaker.is_open()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_failed_probe_reopens_and_cancelled_probe_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == OPEN and breaker.opened == 2
+
+
+def test_token_bucket_allows_burst_then_times_out():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.take(0) and bucket.take(0)
+    assert not bucket.take(0.1)
+    assert TokenBucket(rate=0, burst=1).take(0)
+
+
+def test_adaptive_limiter_blocks_at_limit_and_adjusts():
+    limiter = AdaptiveLimiter(max_limit=4)
+    assert limiter.limit == 2
+    assert limiter.acquire(0) and limiter.acquire(0)
+    assert not limiter.acquire(0.01)
+
+    limiter.release(0.1)
+    limiter.release(0.1)
+    assert limiter.limit > 2
+    assert limiter.acquire(0)
+    limiter.release(0.1, ok=False)
+    assert limiter.limit < 2.5
+    for _ in range(3):
+        assert limiter.acquire(0)
+        limiter.release(10.0)
+    assert limiter.limit >= limiter.min_limit
+    assert limiter.in_flight == 0
+
+
+def test_open_circuit_fails_fast_then_recovers():
+    backend = Backend("test", failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        backend.call(failing)
+    assert backend.breaker.state == OPEN
+
+    with pytest.raises(BackendUnavailable):
+        backend.call(lambda: "ok")
+    assert backend.rejected == {"circuit_open": 1, "rate_limited": 0, "concurrency": 0}
+
+    time.sleep(0.06)
+    assert backend.call(lambda: "ok") == "ok"
+    assert backend.breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe_and_rejects_others_without_a_token():
+    # Tokens practically never refill, so every token taken shows
+    backend = Backend("test", rate=0.001, burst=3, failure_threshold=1, reset_timeout=0.05, acquire_timeout=0)
+    with pytest.raises(RuntimeError):
+        backend.call(failing)
+    time.sleep(0.06)
+
+    probing = threading.Event()
+    release = threading.Event()
+
+    def slow_probe():
+        probing.set()
+        release.wait(5)
+        return "ok"
+
+    probe = threading.Thread(target=backend.call, args=(slow_probe,))
+    probe.start()
+    assert probing.wait(5)
+    with pytest.raises(BackendUnavailable):
+        backend.call(lambda: "ok")
+    assert backend.rejected["circuit_open"] == 1
+    assert int(backend.bucket._tokens) == 1
+    release.set()
+    probe.join(5)
+    assert backend.breaker.state == CLOSED
+    assert backend.limiter.in_flight == 0
+
+
+def test_retries_and_neutral_errors():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("connection reset")
+        return "ok"
+
+    backend = Backend("test", retries=1, retry_backoff=0, failure_threshold=5)
+    assert backend.call(flaky) == "ok"
+    assert backend.retried == 1
+
+    calls = []
+
+    def rejected():
+        calls.append(1)
+        raise ValueError("invalid query")
+
+    with pytest.raises(ValueError):
+        backend.call(rejected)
+    assert len(calls) == 1 and backend.retried == 1
+
+    def local_timeout():
+        raise TimeoutError("pool")
+
+    with pytest.raises(TimeoutError):
+        backend.call(local_timeout, neutral=(TimeoutError,))
+    assert backend.failures == 2
+    assert backend.breaker.failures == 1
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_only_transient_errors_are_retried():
+    assert is_transient(TimeoutError()) and is_transient(ConnectionError())
+    assert is_transient(StatusError(429)) and is_transient(StatusError(503))
+    assert not is_transient(StatusError(400)) and not is_transient(StatusError(422))
+    assert not is_transient(Exception("bad request")) and not is_transient(ValueError())
+
+
+def test_variable_latency_does_not_shrink_an_error_driven_limit():
+    rng = random.Random(1)
+    limiter = AdaptiveLimiter(max_limit=32, tolerance=0)
+    for _ in range(500):
+        assert limiter.acquire(0)
+        limiter.release(rng.uniform(2, 20))
+    assert limiter.limit == 32
+
+    latency_driven = AdaptiveLimiter(max_limit=32)
+    for _ in range(500):
+        assert latency_driven.acquire(0)
+        latency_driven.release(rng.uniform(2, 20))
+    assert latency_driven.limit < 16
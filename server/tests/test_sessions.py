@@ -0,0 +1,44 @@
+import json
+import time
+import zlib
+
+import pytest
+
+from fast_path import LocalAnswer
+from sessions import SessionStore, SqliteSessionStore, decode_response, encode_response
+from stub_backend import StubAgentResponse
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl=0.3)
+    else:
+        store = SessionStore(ttl=0.3)
+    yield store
+    store.close()
+
+
+def test_responses_round_trip():
+    for response in (StubAgentResponse("q", "answer", ["CompanyInfo"]),
+                     LocalAnswer("q", "answer", ["CompanyInfo"], [], 0.0)):
+        restored = decode_response(encode_response(response))
+        assert type(restored) is type(response)
+        assert restored.final_answer == "answer"
+
+
+def test_unknown_types_are_neither_stored_nor_imported():
+    with pytest.raises(TypeError):
+        encode_response(object())
+    blob = zlib.compress(json.dumps({"type": "os:system", "data": {}}).encode("utf-8"))
+    with pytest.raises(ValueError):
+        decode_response(blob)
+
+
+def test_reading_a_session_extends_its_ttl(store):
+    store.record("s", StubAgentResponse("q", "answer"))
+    for _ in range(3):
+        time.sleep(0.15)
+        assert store.context("s") is not None
+    time.sleep(0.35)
+    assert store.context("s") is None
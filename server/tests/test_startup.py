@@ -0,0 +1,46 @@
+import threading
+import time
+
+from agent_pool import AgentPool
+from benchmarks.bench_startup import measure, probe_env
+from stub_backend import StubQueryAgent, StubWeaviateClient
+
+IMPORT_BUDGET_S = 1.5
+STARTUP_BUDGET_S = 2.5
+LIFESPAN_BUDGET_S = 0.5
+
+
+def test_startup_stays_within_budget_with_default_backend(tmp_path):
+    env = probe_env()
+    env.pop("AGENT_POOL_BACKEND", None)
+    env["DESCRIPTION_CACHE_PATH"] = str(tmp_path / "descriptions.db")
+    env["JOB_STORE_PATH"] = str(tmp_path / "jobs.db")
+    env["PREWARM_ENABLED"] = "0"
+
+    sample = measure(env)
+
+    assert sample["heavy"] == []
+    assert sample["import_s"] < IMPORT_BUDGET_S
+    assert sample["ready_s"] < STARTUP_BUDGET_S
+    assert sample["ready_s"] - sample["import_s"] < LIFESPAN_BUDGET_S
+
+
+def test_pool_start_does_not_wait_for_connections():
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait(5)
+        client = StubWeaviateClient()
+        return client, StubQueryAgent(client, latency=0)
+
+    pool = AgentPool(slow_factory, size=2, health_check_interval=60)
+    start = time.perf_counter()
+    pool.start()
+    try:
+        assert time.perf_counter() - start < 0.5
+        assert pool.stats()["connecting"]
+        release.set()
+        with pool.acquire(timeout=5) as agent:
+            assert agent.run("hello").final_answer == "Stub answer for: hello"
+    finally:
+        pool.close()
@@ -2,21 +2,35 @@ import os
 import weaviate
 from weaviate.auth import Auth
 from weaviate.classes.config import Configure, Property, DataType
+from weaviate.classes.query import Filter
+from weaviate.classes.tenants import Tenant, TenantActivityStatus
+from weaviate.agents.classes import QueryAgentCollectionConfig
 from weaviate.agents.query import QueryAgent
 from weaviate.agents.utils import print_query_agent_response
 from dotenv import load_dotenv
-from company_data import COMPANY_DATA
+from company_dataset import load_company_dataset
+from company_layout import collection_layout, tenant_name
+from description_cache import normalize_company_name
+import collection_versions
+from incremental_sync import HASH_PROPERTY, object_uuid, sync_collection
+from embeddings import create_embedding_stage
 import argparse
 
 # Load environment variables
 load_dotenv()
 
 # Best practice: store your credentials in environment variables
-weaviate_url = os.environ["WEAVIATE_URL"]
-weaviate_api_key = os.environ["WEAVIATE_API_KEY"]
+# Optional at import time so the API can start with the offline stub backend
+weaviate_url = os.environ.get("WEAVIATE_URL")
+weaviate_api_key = os.environ.get("WEAVIATE_API_KEY")
 
 def setup_weaviate_client():
     """Set up and return a Weaviate client."""
+    if not weaviate_url or not weaviate_api_key:
+        raise RuntimeError(
+            "WEAVIATE_URL and WEAVIATE_API_KEY must be set (in the environment or the .env file) "
+            "to connect to Weaviate Cloud"
+        )
     client = weaviate.connect_to_weaviate_cloud(
         cluster_url=weaviate_url,
         auth_credentials=Auth.api_key(weaviate_api_key),
@@ -24,20 +38,47 @@ def setup_weaviate_client():
     print(f"Client ready: {client.is_ready()}")
     return client
 
+COLLECTIONS = ["CompanyInfo", "Products", "UseCases"]
+
 def delete_collections(client):
     """Delete existing collections if they exist."""
-    collections = ["CompanyInfo", "Products", "UseCases"]
-    for collection_name in collections:
+    for collection_name in COLLECTIONS:
         try:
             client.collections.delete(collection_name)
             print(f"Deleted collection: {collection_name}")
         except:
             print(f"Collection {collection_name} does not exist or could not be deleted")
 
-def create_collections(client):
-    """Create the Company collections."""
+def content_hash_property():
+    """Property holding the sync hash; not vectorized."""
+    return Property(
+        name=HASH_PROPERTY,
+        data_type=DataType.TEXT,
+        description="Hash of the source record, used for incremental sync",
+        skip_vectorization=True,
+        vectorize_property_name=False,
+    )
+
+def create_collections(client, skip_existing=False):
+    """Create the Company collections.
+
+    With skip_existing, collections that already exist are left untouched.
+    With COMPANY_COLLECTION_LAYOUT=tenants they are multi-tenant, with a
+    tenant per company created and activated by the first write to it.
+    """
+    tenants = collection_layout() == "tenants"
+
+    def create(name, **kwargs):
+        if skip_existing and client.collections.exists(name):
+            return
+        if tenants:
+            kwargs["multi_tenancy_config"] = Configure.multi_tenancy(
+                enabled=True, auto_tenant_creation=True, auto_tenant_activation=True
+            )
+        client.collections.create(name, **kwargs)
+
     # Company Info collection
-    client.collections.create(
+    create(
         "CompanyInfo",
         description="Information about the company, including founding details and general description.",
         vectorizer_config=Configure.Vectorizer.text2vec_weaviate(),
@@ -63,11 +104,12 @@ def create_collections(client):
                 data_type=DataType.TEXT_ARRAY,
                 description="Sources of information",
             ),
+            content_hash_property(),
         ],
     )
 
     # Products collection
-    client.collections.create(
+    create(
         "Products",
         description="Information about company products and services.",
         vectorizer_config=Configure.Vectorizer.text2vec_weaviate(),
@@ -88,11 +130,12 @@ def create_collections(client):
                 data_type=DataType.TEXT_ARRAY,
                 description="Sources of information",
             ),
+            content_hash_property(),
         ],
     )
 
     # Use Cases collection
-    client.collections.create(
+    create(
         "UseCases",
         description="Information about company use cases and applications.",
         vectorizer_config=Configure.Vectorizer.text2vec_weaviate(),
@@ -108,115 +151,218 @@ def create_collections(client):
                 data_type=DataType.TEXT_ARRAY,
                 description="Sources of information",
             ),
+            content_hash_property(),
         ],
     )
 
-def check_collections_exist(client):
-    """Check if collections already exist and have data."""
-    try:
-        company_info = client.collections.get("CompanyInfo")
-        products = client.collections.get("Products")
-        use_cases = client.collections.get("UseCases")
-        
-        # More stringent check - we expect at least 4 companies
-        has_sufficient_data = (
-            len(company_info) >= 4 and  # At least 4 companies
-            len(products) > 0 and 
-            len(use_cases) > 0
+def populate_database(client, dry_run=False):
+    """Sync the company information into the collections.
+
+    Records come from COMPANY_DATASET_PATH (JSONL or Parquet, see
+    company_dataset.py) or the built-in COMPANY_DATA. Only new or changed
+    objects are written and objects no longer in the dataset are removed.
+    With dry_run, the diff is printed but nothing is written. With
+    LOCAL_EMBEDDINGS=1, vectors are computed locally (and cached on disk)
+    instead of by the collection's vectorizer. In the tenants layout each
+    company's objects go to its own tenant.
+    """
+    dataset = load_company_dataset()
+    embedding_stage = None if dry_run else create_embedding_stage()
+    tenants = collection_layout() == "tenants"
+    changed = []
+    for collection_name in COLLECTIONS:
+        collection = client.collections.get(collection_name)
+        plan = sync_collection(
+            collection,
+            dataset.for_collection(collection_name),
+            dry_run=dry_run,
+            embedding_stage=embedding_stage,
+            tenant_of=tenant_name if tenants else None,
         )
-        
-        if not has_sufficient_data:
-            return False
-            
-        return True
-    except Exception as e:
-        print(f"Error checking collections: {e}")
-        return False
-
-def populate_database(client):
-    """Populate the database with company information."""
-    # Check if collections already exist and have data
-    if check_collections_exist(client):
-        print("Collections already exist and contain data. Skipping data import.")
+        if plan.has_changes:
+            changed.append(collection_name)
+
+    if embedding_stage is not None:
+        stats = embedding_stage.stats()
+        print(f"Local embeddings ({stats['model']}): {stats['computed']} computed, {stats['cached']} from cache")
+        embedding_stage.cache.close()
+
+    if dry_run:
         return
 
-    # Get collections
-    company_info_collection = client.collections.get("CompanyInfo")
-    products_collection = client.collections.get("Products")
-    use_cases_collection = client.collections.get("UseCases")
-
-    # Add company info for all companies
-    companies = ["company_info", "comet", "llamaindex", "canva"]
-    with company_info_collection.batch.fixed_size(batch_size=len(companies)) as batch:
-        # Add main Weaviate company info
-        batch.add_object(properties=COMPANY_DATA["company_info"])
-        
-        # Add other companies' info
-        for company in ["comet", "llamaindex", "canva"]:
-            if company in COMPANY_DATA and "company_info" in COMPANY_DATA[company]:
-                batch.add_object(properties=COMPANY_DATA[company]["company_info"])
-
-    # Add products for all companies
-    all_products = []
-    all_products.extend(COMPANY_DATA["products"])
-    for company in ["comet", "llamaindex", "canva"]:
-        if company in COMPANY_DATA and "products" in COMPANY_DATA[company]:
-            all_products.extend(COMPANY_DATA[company]["products"])
-
-    with products_collection.batch.fixed_size(batch_size=len(all_products)) as batch:
-        for product in all_products:
-            batch.add_object(properties=product)
-
-    # Add use cases for all companies
-    all_use_cases = []
-    all_use_cases.extend(COMPANY_DATA["use_cases"])
-    for company in ["comet", "llamaindex", "canva"]:
-        if company in COMPANY_DATA and "use_cases" in COMPANY_DATA[company]:
-            all_use_cases.extend(COMPANY_DATA[company]["use_cases"])
-
-    with use_cases_collection.batch.fixed_size(batch_size=len(all_use_cases)) as batch:
-        for use_case in all_use_cases:
-            batch.add_object(properties=use_case)
+    if changed:
+        # Cached answers that read these collections were computed against the old data
+        collection_versions.bump(changed, reason="sync")
 
     # Print collection sizes
-    print(f"Size of the CompanyInfo collection: {len(company_info_collection)}")
-    print(f"Size of the Products collection: {len(products_collection)}")
-    print(f"Size of the UseCases collection: {len(use_cases_collection)}")
+    for collection_name in COLLECTIONS:
+        collection = client.collections.get(collection_name)
+        if tenants:
+            print(f"Size of the {collection_name} collection: {len(collection.tenants.get())} tenants")
+        else:
+            print(f"Size of the {collection_name} collection: {len(collection)}")
+
+def company_collection(client, collection_name, company_name):
+    """Return the collection handle holding a company's objects.
+
+    In the tenants layout this is the company's tenant, created if missing.
+    """
+    collection = client.collections.get(collection_name)
+    if collection_layout() != "tenants":
+        return collection
+    tenant = tenant_name(company_name)
+    if not collection.tenants.exists(tenant):
+        collection.tenants.create(Tenant(name=tenant))
+    return collection.with_tenant(tenant)
+
+def add_company_description(client, company_name, description, sources=None):
+    """Write a crew-produced company description into the CompanyInfo collection.
+
+    The object has a deterministic UUID (in a namespace separate from synced
+    COMPANY_DATA objects) and no content_hash, so repeated write-backs replace
+    each other and incremental syncs leave them alone.
+    """
+    company_info_collection = company_collection(client, "CompanyInfo", company_name)
+    uuid = object_uuid("CompanyInfo", "crew", company_name)
+    properties = {
+        "name": company_name,
+        "description": description,
+        "sources": sources or ["Company website"],
+    }
+    if company_info_collection.data.exists(uuid):
+        company_info_collection.data.replace(uuid=uuid, properties=properties)
+    else:
+        company_info_collection.data.insert(properties, uuid=uuid)
+    collection_versions.bump(["CompanyInfo"], reason="writeback")
+
+COMPANY_ACTIONS = {
+    "activate": TenantActivityStatus.ACTIVE,
+    "deactivate": TenantActivityStatus.INACTIVE,
+    "offload": TenantActivityStatus.OFFLOADED,
+}
+
+def set_company_status(client, company_name, action):
+    """Activate, deactivate or offload a company's tenant in every collection (tenants layout only).
+
+    Deactivated tenants stay on disk but are unloaded from memory; offloaded
+    tenants are moved to cold storage and need the cluster's offload module.
+    Syncs skip companies whose tenant is not active.
+    """
+    if collection_layout() != "tenants":
+        raise ValueError(f"--company-action {action} needs COMPANY_COLLECTION_LAYOUT=tenants")
+    tenant = tenant_name(company_name)
+    for collection_name in COLLECTIONS:
+        collection = client.collections.get(collection_name)
+        if collection.tenants.exists(tenant):
+            collection.tenants.update(Tenant(name=tenant, activity_status=COMPANY_ACTIONS[action]))
+            print(f"{collection_name}: tenant {tenant} set to {action}")
+        else:
+            print(f"{collection_name}: no tenant {tenant}")
+
+def reindex_company(client, company_name):
+    """Drop a company's synced objects and write them again from the dataset.
+
+    In the tenants layout the company's tenant is removed; otherwise its
+    objects are deleted by id. The following sync then re-inserts (and
+    re-vectorizes) only that company's objects; every other object is
+    unchanged and costs no vectorizer calls.
+    """
+    if collection_layout() == "tenants":
+        tenant = tenant_name(company_name)
+        for collection_name in COLLECTIONS:
+            client.collections.get(collection_name).tenants.remove([tenant])
+            print(f"{collection_name}: removed tenant {tenant}")
+    else:
+        dataset = load_company_dataset()
+        for collection_name in COLLECTIONS:
+            uuids = [
+                object_uuid(collection_name, company, properties["name"])
+                for company, properties in dataset.for_collection(collection_name)
+                if normalize_company_name(company) == normalize_company_name(company_name)
+            ]
+            if uuids:
+                client.collections.get(collection_name).data.delete_many(where=Filter.by_id().contains_any(uuids))
+            print(f"{collection_name}: removed {len(uuids)} objects of {company_name}")
+    collection_versions.bump(COLLECTIONS, reason="reindex")
+    populate_database(client)
+
+class CompanyQueryAgent(QueryAgent):
+    """QueryAgent that can answer from a single tenant of multi-tenant collections.
+
+    With a tenant, run() asks the agent's collections in that tenant through
+    QueryAgentCollectionConfig (weaviate-agents 0.8+); without one it is
+    QueryAgent.run.
+    """
+
+    def __init__(self, client, collections, **kwargs):
+        super().__init__(client, collections=collections, **kwargs)
+        self.collection_names = [c if isinstance(c, str) else c.name for c in collections]
+
+    def run(self, query, collections=None, context=None, tenant=None):
+        if tenant is not None and collections is None:
+            collections = [QueryAgentCollectionConfig(name=name, tenant=tenant) for name in self.collection_names]
+        return super().run(query, collections=collections, context=context)
 
 def setup_agent(client):
     """Set up the query agent."""
-    agent = QueryAgent(
+    agent = CompanyQueryAgent(
         client=client,
-        collections=["CompanyInfo", "Products", "UseCases"],
+        collections=COLLECTIONS,
         system_prompt="You are a helpful assistant that provides information about Weaviate company, its products, and use cases. "
         "Always provide detailed and accurate information based on the available data. "
         "If you don't have information about a topic, clearly state that the information is not available in the database.",
     )
     return agent
 
-def run_example_queries(agent, example_numbers):
-    """Run specified example queries."""
-    if 1 in example_numbers:
-        print("\n=== Example Query 1: Weaviate Products ===")
-        response = agent.run("What are Weaviate's main products and their descriptions?")
+# Example number -> (title, company the question is about, question)
+EXAMPLE_QUERIES = {
+    1: ("Weaviate Products", "Weaviate", "What are Weaviate's main products and their descriptions?"),
+    2: ("LlamaIndex Information", "LlamaIndex", "What is LlamaIndex? Can you tell me about its features and capabilities?"),
+}
+
+def run_example_queries(agent, example_numbers, company=None):
+    """Run specified example queries.
+
+    In the tenants layout every query needs a tenant: it is asked in the
+    tenant of `company` if given, otherwise of the company it is about.
+    """
+    tenants = collection_layout() == "tenants"
+    for number in example_numbers:
+        if number not in EXAMPLE_QUERIES:
+            continue
+        title, subject, question = EXAMPLE_QUERIES[number]
+        print(f"\n=== Example Query {number}: {title} ===")
+        tenant = tenant_name(company or subject) if tenants else None
+        response = agent.run(question, tenant=tenant)
         print_query_agent_response(response)
 
-    if 2 in example_numbers:
-        print("\n=== Example Query 2: Crew AI Information ===")
-        response = agent.run("What is Crew AI? Can you tell me about its features and capabilities?")
-        print_query_agent_response(response)
+def run_agent_query(agent, prompt: str) -> str:
+    """Run a prompt on an existing agent and return the response as a string.
+
+    Unlike query_weaviate_agent, errors are raised so callers holding a pooled
+    client can tell a failed call apart from an answer.
+    """
+    return response_text(agent.run(prompt))
+
+def response_text(response) -> str:
+    """Return the text the API sends back for an agent response."""
+    # The response may be a dict or object; get the text/answer part
+    if isinstance(response, dict) and 'answer' in response:
+        return response['answer']
+    return str(response)
 
-def query_weaviate_agent(prompt: str) -> str:
-    """Query the Weaviate agent with a single prompt and return the response as a string."""
+def query_weaviate_agent(prompt: str, agent=None) -> str:
+    """Query the Weaviate agent with a single prompt and return the response as a string.
+
+    Pass a long-lived agent (e.g. from the server's AgentPool) to skip the
+    per-call connect; otherwise a client is opened and closed around the query.
+    """
     client = None
     try:
-        client = setup_weaviate_client()
-        agent = setup_agent(client)
-        response = agent.run(prompt)
-        # The response may be a dict or object; get the text/answer part
-        if isinstance(response, dict) and 'answer' in response:
-            return response['answer']
-        return str(response)
+        if agent is None:
+            client = setup_weaviate_client()
+            agent = setup_agent(client)
+        return run_agent_query(agent, prompt)
     except Exception as e:
         return f"Error: {str(e)}"
     finally:
@@ -228,10 +374,20 @@ def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Run Weaviate company information examples')
     parser.add_argument('--examples', type=int, nargs='+', default=[1, 2],
-                      help='Example numbers to run (1: Weaviate Products, 2: Crew AI Information)')
+                      help='Example numbers to run (1: Weaviate Products, 2: LlamaIndex Information)')
     parser.add_argument('--reinit', action='store_true',
                       help='Delete existing collections and reinitialize them')
+    parser.add_argument('--sync', action='store_true',
+                      help='Incrementally sync the company dataset into the collections (only changed objects are written)')
+    parser.add_argument('--dry-run', action='store_true',
+                      help='Show what --sync would insert, update and delete without writing')
+    parser.add_argument('--company', metavar='NAME',
+                      help='Company for --company-action, and the tenant the examples are asked in (tenants layout)')
+    parser.add_argument('--company-action', choices=['activate', 'deactivate', 'offload', 'reindex'],
+                      help="Change the company's tenant status (tenants layout) or re-index its objects")
     args = parser.parse_args()
+    if args.company_action and not args.company:
+        parser.error('--company-action requires --company')
 
     try:
         # Set up client
@@ -241,14 +397,24 @@ def main():
         if args.reinit:
             print("Reinitializing collections...")
             delete_collections(client)
+            collection_versions.bump(COLLECTIONS, reason="reinit")
             create_collections(client)
             populate_database(client)
+        elif args.sync or args.dry_run:
+            if not args.dry_run:
+                create_collections(client, skip_existing=True)
+            populate_database(client, dry_run=args.dry_run)
+
+        if args.company_action == 'reindex':
+            reindex_company(client, args.company)
+        elif args.company_action:
+            set_company_status(client, args.company, args.company_action)
 
         # Set up agent
         agent = setup_agent(client)
 
         # Run specified example queries
-        run_example_queries(agent, args.examples)
+        run_example_queries(agent, args.examples, company=args.company)
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -274,14 +440,31 @@ Available Commands:
 3. Reinitialize collections (wipe and recreate):
    python weaviate_calibrate_companies.py --reinit
 
-4. Combine reinitialization with specific examples:
+4. Incrementally sync COMPANY_DATA (writes only new/changed objects, removes deleted ones):
+   python weaviate_calibrate_companies.py --sync
+   python weaviate_calibrate_companies.py --dry-run
+
+   Sync from a JSONL or Parquet file instead of the built-in data (see company_dataset.py):
+   python company_dataset.py export companies.jsonl
+   COMPANY_DATASET_PATH=companies.jsonl python weaviate_calibrate_companies.py --sync
+
+   Compute vectors locally and reuse them across re-imports (see embeddings.py):
+   LOCAL_EMBEDDINGS=1 EMBEDDING_MODEL=my_models:arctic_embedder python weaviate_calibrate_companies.py --reinit
+
+5. Per-company data (see company_layout.py; switching layouts needs --reinit):
+   COMPANY_COLLECTION_LAYOUT=tenants python weaviate_calibrate_companies.py --reinit
+   COMPANY_COLLECTION_LAYOUT=tenants python weaviate_calibrate_companies.py --company Canva --company-action offload
+   COMPANY_COLLECTION_LAYOUT=tenants python weaviate_calibrate_companies.py --company Canva --company-action activate
+   python weaviate_calibrate_companies.py --company Canva --company-action reindex
+
+6. Combine reinitialization with specific examples:
    python weaviate_calibrate_companies.py --reinit --examples 1
    python weaviate_calibrate_companies.py --reinit --examples 2
    python weaviate_calibrate_companies.py --reinit --examples 1 2
 
 Example Queries:
 1. Weaviate Products: "What are Weaviate's main products and their descriptions?"
-2. Crew AI Information: "What is Crew AI? Can you tell me about its features and capabilities?"
+2. LlamaIndex Information: "What is LlamaIndex? Can you tell me about its features and capabilities?"
 
 Note: Make sure your .env file contains the required environment variables:
 WEAVIATE_URL=your_weaviate_url
@@ -2,20 +2,29 @@ import os
 import weaviate
 from weaviate.auth import Auth
 from weaviate.classes.config import Configure, Property, DataType
-from datasets import load_dataset
 from weaviate.agents.query import QueryAgent
 from weaviate.agents.utils import print_query_agent_response
 from dotenv import load_dotenv
 
+import collection_versions
+from importer import create_importer
+from dataset_loader import import_sources, iter_source, vector_objects
+
 # Load environment variables
 load_dotenv()
 
 # Best practice: store your credentials in environment variables
-weaviate_url = os.environ["WEAVIATE_URL"]
-weaviate_api_key = os.environ["WEAVIATE_API_KEY"]
+# Optional at import time so the module can be imported offline (e.g. by benchmarks)
+weaviate_url = os.environ.get("WEAVIATE_URL")
+weaviate_api_key = os.environ.get("WEAVIATE_API_KEY")
 
 def setup_weaviate_client():
     """Set up and return a Weaviate client."""
+    if not weaviate_url or not weaviate_api_key:
+        raise RuntimeError(
+            "WEAVIATE_URL and WEAVIATE_API_KEY must be set (in the environment or the .env file) "
+            "to connect to Weaviate Cloud"
+        )
     client = weaviate.connect_to_weaviate_cloud(
         cluster_url=weaviate_url,
         auth_credentials=Auth.api_key(weaviate_api_key),
@@ -78,29 +87,25 @@ def create_collections(client):
     )
 
 def populate_database(client):
-    """Populate the database with sample data."""
-    brands_dataset = load_dataset(
-        "weaviate/agents", "query-agent-brands", split="train", streaming=True
-    )
-    ecommerce_dataset = load_dataset(
-        "weaviate/agents", "query-agent-ecommerce", split="train", streaming=True
-    )
+    """Populate the database with sample data.
+
+    Both datasets are streamed and imported concurrently. Set BRANDS_DATASET
+    and ECOMMERCE_DATASET to local .jsonl/.parquet files to run offline.
+    """
+    brands_source = os.environ.get("BRANDS_DATASET", "weaviate/agents:query-agent-brands")
+    ecommerce_source = os.environ.get("ECOMMERCE_DATASET", "weaviate/agents:query-agent-ecommerce")
 
     brands_collection = client.collections.get("Brands")
     ecommerce_collection = client.collections.get("ECommerce")
 
-    with brands_collection.batch.fixed_size(batch_size=200) as batch:
-        for item in brands_dataset:
-            batch.add_object(properties=item["properties"], vector=item["vector"])
-
-    with ecommerce_collection.batch.fixed_size(batch_size=200) as batch:
-        for item in ecommerce_dataset:
-            batch.add_object(properties=item["properties"], vector=item["vector"])
-
-    failed_objects = brands_collection.batch.failed_objects
-    if failed_objects:
-        print(f"Number of failed imports: {len(failed_objects)}")
-        print(f"First failed object: {failed_objects[0]}")
+    all_stats = import_sources(create_importer(), [
+        (brands_collection, vector_objects(iter_source(brands_source))),
+        (ecommerce_collection, vector_objects(iter_source(ecommerce_source))),
+    ])
+    for stats in all_stats:
+        if stats.dead_lettered:
+            print(f"Number of failed imports in {stats.collection_name}: {stats.dead_lettered}")
+    collection_versions.bump(["Brands", "ECommerce"], reason="import")
 
     print(f"Size of the ECommerce dataset: {len(ecommerce_collection)}")
     print(f"Size of the Brands dataset: {len(brands_collection)}")
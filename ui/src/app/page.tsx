@@ -37,6 +37,8 @@ export default function ChatPage() {
   const [loading, setLoading] = useState(false);
   const [loadingPhase, setLoadingPhase] = useState<'retrieving' | 'creating' | null>(null);
   const [devMode, setDevMode] = useState(false);
+  // Server-side conversation session, so follow-up questions reuse earlier answers
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement | null>(null);
 
   // Scroll to bottom when messages change
@@ -71,10 +73,11 @@ export default function ChatPage() {
       const res = await fetch('http://localhost:8000/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: userMessage }),
+        body: JSON.stringify({ message: userMessage, session_id: sessionId }),
       });
       if (!res.ok) throw new Error('Network response was not ok');
       const data = await res.json();
+      if (data.session_id) setSessionId(data.session_id);
       
       const finalAnswer = parseFinalAnswer(data.response);
       